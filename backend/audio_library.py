@@ -0,0 +1,161 @@
+"""
+Audio library - manifest of combined audio files, so listings never scan the audio directory
+"""
+
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from mp3_concat import mp3_duration
+
+BATCH_NAME = re.compile(r'batch_\d+_chapters_(\d+)_to_(\d+)', re.I)
+
+SORT_COLUMNS = {
+    "created": "created",
+    "filename": "filename",
+    "size": "size",
+    "duration": "duration",
+    "chapter": "first_chapter",
+    "novel": "novel",
+}
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+class AudioLibrary:
+    """SQLite manifest (output/audio_library.db) of the MP3s in the audio directory.
+    
+    Entries are added when a batch is written and removed when a file is
+    deleted through the API, each with its size, creation time, duration,
+    novel and chapter span. sync() reconciles the manifest with the directory
+    (files added or removed by hand) and runs once at startup.
+    """
+    
+    def __init__(self, db_path: Path, audio_dir: Path):
+        self.audio_dir = Path(audio_dir)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS files (
+                filename TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                duration REAL,
+                novel TEXT,
+                first_chapter INTEGER,
+                last_chapter INTEGER,
+                chapters INTEGER,
+                job_id TEXT
+            );
+            CREATE INDEX IF NOT EXISTS files_created ON files (created);
+            CREATE INDEX IF NOT EXISTS files_novel ON files (novel);
+            CREATE INDEX IF NOT EXISTS files_chapter ON files (first_chapter, last_chapter);
+        """)
+        self._conn.commit()
+    
+    def add(self, path: Path, duration: Optional[float] = None, novel: Optional[str] = None,
+            first_chapter: Optional[int] = None, last_chapter: Optional[int] = None,
+            chapters: Optional[int] = None, job_id: Optional[str] = None):
+        """Record (or replace) a file; unknown chapter span and duration are read from the name and file"""
+        path = Path(path)
+        stat_result = path.stat()
+        if first_chapter is None:
+            match = BATCH_NAME.search(path.name)
+            if match:
+                first_chapter, last_chapter = int(match.group(1)), int(match.group(2))
+        if chapters is None and first_chapter is not None:
+            chapters = last_chapter - first_chapter + 1
+        if duration is None:
+            try:
+                duration = mp3_duration(path)
+            except OSError:
+                duration = None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (path.name, stat_result.st_size, stat_result.st_mtime, duration, novel,
+                 first_chapter, last_chapter, chapters, job_id),
+            )
+            self._conn.commit()
+    
+    def remove(self, filename: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM files WHERE filename = ?", (filename,))
+            self._conn.commit()
+    
+    def sync(self) -> dict:
+        """Add untracked files and drop entries whose file is gone"""
+        on_disk = {path.name: path for path in self.audio_dir.glob("*.mp3")}
+        with self._lock:
+            known = {row[0] for row in self._conn.execute("SELECT filename FROM files")}
+        added = [on_disk[name] for name in on_disk.keys() - known]
+        removed = known - on_disk.keys()
+        for path in added:
+            try:
+                self.add(path)
+            except OSError:
+                pass
+        with self._lock:
+            self._conn.executemany("DELETE FROM files WHERE filename = ?", [(name,) for name in removed])
+            self._conn.commit()
+        return {"added": len(added), "removed": len(removed)}
+    
+    def list_files(self, page: int = 1, page_size: Optional[int] = DEFAULT_PAGE_SIZE, sort: str = "created", order: str = "desc",
+                   novel: Optional[str] = None, chapter_from: Optional[int] = None, chapter_to: Optional[int] = None,
+                   job_id: Optional[str] = None) -> dict:
+        """One page of entries (every entry when page_size is None); novel matches a substring,
+        the chapter range matches files overlapping it"""
+        conditions = []
+        params: list = []
+        if novel:
+            conditions.append("novel LIKE ?")
+            params.append(f"%{novel}%")
+        if chapter_from is not None:
+            conditions.append("last_chapter >= ?")
+            params.append(chapter_from)
+        if chapter_to is not None:
+            conditions.append("first_chapter <= ?")
+            params.append(chapter_to)
+        if job_id:
+            conditions.append("job_id = ?")
+            params.append(job_id)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        column = SORT_COLUMNS.get(sort, "created")
+        direction = "ASC" if order.lower() == "asc" else "DESC"
+        page = max(1, page)
+        limit = -1 if page_size is None else min(max(1, page_size), MAX_PAGE_SIZE)  # SQLite: -1 = no limit
+        
+        with self._lock:
+            total = self._conn.execute(f"SELECT COUNT(*) FROM files {where}", params).fetchone()[0]
+            rows = self._conn.execute(
+                f"SELECT filename, size, created, duration, novel, first_chapter, last_chapter, chapters, job_id "
+                f"FROM files {where} ORDER BY {column} {direction}, filename LIMIT ? OFFSET ?",
+                params + [limit, (page - 1) * max(limit, 0)],
+            ).fetchall()
+        
+        return {
+            "files": [self._entry(row) for row in rows],
+            "total": total,
+            "page": page,
+            "page_size": total if page_size is None else limit,
+        }
+    
+    @staticmethod
+    def _entry(row) -> dict:
+        filename, size, created, duration, novel, first_chapter, last_chapter, chapters, job_id = row
+        return {
+            "filename": filename,
+            "size": f"{size / (1024*1024):.2f} MB",
+            "size_bytes": size,
+            "created": datetime.fromtimestamp(created).isoformat(),
+            "duration": round(duration, 2) if duration is not None else None,
+            "novel": novel,
+            "first_chapter": first_chapter,
+            "last_chapter": last_chapter,
+            "chapters": chapters,
+            "job_id": job_id,
+        }
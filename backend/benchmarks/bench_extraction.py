@@ -0,0 +1,64 @@
+"""
+Extraction benchmark - selector cascade vs learned site profile, on saved chapter pages
+
+Usage (from backend/):
+    python benchmarks/bench_extraction.py [--iterations 50]
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bs4 import BeautifulSoup
+
+from extraction import FAST_PARSER, extract_chapter_content
+from site_profiles import SiteProfileStore
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+# Saved page -> the URL it was served from
+FIXTURES = {
+    "novelbin_chapter.html": "https://novelbin.com/b/the-long-road-home/chapter-12-the-river",
+    "article_chapter.html": "https://lanternreads.example/novel/ashes-of-spring/chapter-5",
+    "wordpress_chapter.html": "https://quiettranslations.example/iron-vow-chapter-31/",
+}
+
+def time_per_call(func, iterations: int) -> float:
+    """Average milliseconds per call"""
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - started) * 1000 / iterations
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+    
+    print(f"Fast-path parser: {FAST_PARSER}, {args.iterations} iterations per page\n")
+    print(f"{'fixture':<26} {'cascade ms':>11} {'profile ms':>11} {'speedup':>8}  path")
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SiteProfileStore(Path(tmp) / "site_profiles.json")
+        for name, url in FIXTURES.items():
+            html = (FIXTURES_DIR / name).read_bytes()
+            
+            expected = extract_chapter_content(BeautifulSoup(html, 'html.parser'), url)
+            # First page on a site runs the cascade and learns the profile
+            store.extract(html, url)
+            hits_before = store.fast_path_hits
+            result = store.extract(html, url)
+            path = "fast path" if store.fast_path_hits > hits_before else "cascade (no profile)"
+            if result[0] != expected[0]:
+                print(f"  warning: {name} content differs between cascade and profile path")
+            
+            cascade_ms = time_per_call(lambda: extract_chapter_content(BeautifulSoup(html, 'html.parser'), url), args.iterations)
+            profile_ms = time_per_call(lambda: store.extract(html, url), args.iterations)
+            print(f"{name:<26} {cascade_ms:>11.2f} {profile_ms:>11.2f} {cascade_ms / profile_ms:>7.2f}x  {path}")
+
+if __name__ == "__main__":
+    main()
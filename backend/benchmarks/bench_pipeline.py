@@ -0,0 +1,196 @@
+"""
+Pipeline benchmark - /api/get-chapter-urls, /api/scrape and the all-in-one pipeline against a local fixture site
+
+Everything runs offline: chapters come from fixture_site (with injected
+latency, 403s and server errors) and Edge TTS is replaced by fake_tts, which
+streams valid MP3 frames. The API runs in-process on a scratch output
+directory, so nothing under backend/output is touched.
+
+Usage (from backend/):
+    python benchmarks/bench_pipeline.py [--chapters 40] [--pipeline-chapters 10] [--forbidden-rate 0.02]
+                                        [--latency 0.05 0.2] [--host-interval 1.0 0.25] [--json results.json]
+"""
+
+import argparse
+import importlib
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+import fake_tts
+from fixture_site import FixtureSite
+
+# Stage -> histogram name in the metrics module
+STAGES = {
+    "fetch": "SCRAPE_FETCH_SECONDS",
+    "extract": "EXTRACTION_SECONDS",
+    "tts": "TTS_SECONDS",
+    "combine": "COMBINE_SECONDS",
+}
+
+def rss_mb() -> float:
+    """Peak resident set size of this process so far (MB), or 0 where unavailable"""
+    if resource is None:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+class Benchmark:
+    def __init__(self, api, site: FixtureSite):
+        self.api = api
+        self.site = site
+        self.results = []
+    
+    def stage_totals(self) -> dict:
+        return {stage: getattr(self.api.metrics, name).summary() for stage, name in STAGES.items()}
+    
+    def measure(self, name: str, run):
+        """Run run() -> chapters processed, and record throughput, memory peak and per-stage time"""
+        stages_before = self.stage_totals()
+        served_before = dict(self.site.served)
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        
+        started = time.perf_counter()
+        chapters = run()
+        elapsed = time.perf_counter() - started
+        
+        stages = {}
+        for stage, (total, count) in self.stage_totals().items():
+            before_total, before_count = stages_before[stage]
+            if count > before_count:
+                stages[stage] = {"seconds": round(total - before_total, 3), "count": count - before_count}
+        result = {
+            "name": name,
+            "chapters": chapters,
+            "seconds": round(elapsed, 3),
+            "chapters_per_min": round(chapters * 60 / elapsed, 1) if elapsed else 0.0,
+            "peak_traced_mb": round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 1) if tracemalloc.is_tracing() else None,
+            "peak_rss_mb": round(rss_mb(), 1),
+            "responses": {str(status): count - served_before.get(status, 0) for status, count in sorted(self.site.served.items())
+                          if count > served_before.get(status, 0)},
+            "stages": stages,
+        }
+        self.results.append(result)
+        self.print_result(result)
+        return result
+    
+    @staticmethod
+    def print_result(result: dict):
+        peak = f"{result['peak_traced_mb']} MB traced, " if result["peak_traced_mb"] is not None else ""
+        print(f"\n{result['name']}")
+        print(f"  {result['chapters']} chapters in {result['seconds']:.2f}s = {result['chapters_per_min']} chapters/min")
+        print(f"  memory peak: {peak}{result['peak_rss_mb']} MB RSS (process)")
+        print(f"  responses: {', '.join(f'{status}: {count}' for status, count in result['responses'].items()) or 'none'}")
+        for stage, timing in result["stages"].items():
+            print(f"  {stage:<8} {timing['seconds']:>9.2f}s busy over {timing['count']} calls "
+                  f"({timing['seconds'] * 1000 / timing['count']:.1f} ms each)")
+    
+    def get_chapter_urls(self, client, slug: str):
+        def run():
+            response = client.post("/api/get-chapter-urls", json={"url": self.site.toc_url("novelbin", slug),
+                                                                "base_url": self.site.base_url})
+            response.raise_for_status()
+            return response.json()["count"]
+        return self.measure(f"/api/get-chapter-urls (novelbin, {self.site.chapters} chapters, paginated TOC)", run)
+    
+    def scrape(self, client, layout: str, slug: str, chapters: int, concurrency: int):
+        urls = [self.site.chapter_url(layout, slug, number) for number in range(1, chapters + 1)]
+        
+        def run():
+            response = client.post("/api/scrape", json={"url": urls[0], "chapter_urls": urls, "concurrency": concurrency})
+            response.raise_for_status()
+            return sum(1 for chapter in response.json() if chapter["content"])
+        return self.measure(f"/api/scrape ({layout}, {chapters} chapters, concurrency {concurrency})", run)
+    
+    def all_in_one(self, client, slug: str, chapters: int, batch_size: int):
+        def run():
+            response = client.post("/api/process-all-in-one", json={
+                "start_url": self.site.toc_url("novelbin", slug),
+                "base_url": self.site.base_url,
+                "num_chapters": chapters,
+                "batch_size": batch_size,
+            })
+            response.raise_for_status()
+            job_id = response.json()["job_id"]
+            while True:
+                status = client.get(f"/api/jobs/{job_id}").json()
+                if status["status"] in ("completed", "stopped", "error"):
+                    break
+                time.sleep(0.2)
+            if status["status"] != "completed":
+                print(f"  job {job_id} ended with status {status['status']}: {status.get('error')}")
+            files = client.get("/api/list-audio-files", params={"job_id": job_id, "page_size": 1000}).json()["files"]
+            return sum(entry["chapters"] or 0 for entry in files)
+        return self.measure(f"all-in-one pipeline (novelbin, {chapters} chapters, batches of {batch_size})", run)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--chapters", type=int, default=40, help="chapters per scenario")
+    parser.add_argument("--pipeline-chapters", type=int, default=10,
+                        help="chapters for the all-in-one scenario (synthesis and combining dominate)")
+    parser.add_argument("--toc-chapters", type=int, default=500, help="chapters listed in the paginated TOC")
+    parser.add_argument("--paragraphs", type=int, default=30, help="paragraphs per chapter")
+    parser.add_argument("--latency", type=float, nargs=2, default=(0.05, 0.2), metavar=("MIN", "MAX"),
+                        help="response latency range in seconds")
+    parser.add_argument("--forbidden-rate", type=float, default=0.0, help="share of chapter requests answered 403")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of chapter requests answered 500")
+    parser.add_argument("--host-interval", type=float, nargs=2, default=(0.0, 0.0), metavar=("START", "MIN"),
+                        help="adaptive per-host pacing: starting and fastest interval (production uses 1.0 0.25)")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=10)
+    parser.add_argument("--tts-first-byte", type=float, default=fake_tts.FakeCommunicate.first_byte)
+    parser.add_argument("--tts-realtime-factor", type=float, default=fake_tts.FakeCommunicate.realtime_factor)
+    parser.add_argument("--no-tracemalloc", action="store_true", help="skip Python allocation tracing (it slows parsing down)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", type=Path, help="also write the results to this file")
+    args = parser.parse_args()
+    
+    json_path = args.json.resolve() if args.json else None
+    fake_tts.install(first_byte=args.tts_first_byte, realtime_factor=args.tts_realtime_factor)
+    if not args.no_tracemalloc:
+        tracemalloc.start()
+    
+    with tempfile.TemporaryDirectory() as workdir:
+        # The API keeps its databases and audio under ./output
+        os.chdir(workdir)
+        api = importlib.import_module("main")
+        api.host_limiter.initial_interval, api.host_limiter.min_interval = args.host_interval
+        
+        from fastapi.testclient import TestClient
+        
+        site = FixtureSite(chapters=max(args.chapters, args.pipeline_chapters, args.toc_chapters), paragraphs=args.paragraphs,
+                           latency=tuple(args.latency), forbidden_rate=args.forbidden_rate,
+                           error_rate=args.error_rate, seed=args.seed)
+        with site, TestClient(api.app) as client:
+            print(f"Fixture site at {site.base_url}: latency {args.latency[0]}-{args.latency[1]}s, "
+                  f"403 rate {args.forbidden_rate}, 500 rate {args.error_rate}")
+            bench = Benchmark(api, site)
+            # Each scenario uses its own novel, so no scenario is served from another one's caches
+            bench.get_chapter_urls(client, "toc-bench")
+            for layout in ("novelbin", "article"):
+                bench.scrape(client, layout, f"scrape-bench-{layout}", args.chapters, args.concurrency)
+            bench.all_in_one(client, "pipeline-bench", args.pipeline_chapters, args.batch_size)
+        
+        os.chdir(BACKEND_DIR)
+    
+    if json_path:
+        json_path.write_text(json.dumps({"settings": {key: value if not isinstance(value, Path) else str(value)
+                                                      for key, value in vars(args).items()},
+                                         "results": bench.results}, indent=2))
+        print(f"\nResults written to {json_path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Fake TTS - stand-in for edge_tts.Communicate that streams valid silent MP3 frames after realistic delays
+"""
+
+import asyncio
+import math
+import re
+
+import edge_tts
+
+# Edge TTS default output: MPEG-2 Layer III, 48 kbps, 24 kHz, mono -> 144-byte frames of 24 ms
+FRAME_HEADER = bytes([0xFF, 0xF3, 0x64, 0xC4])
+FRAME_BYTES = 144
+FRAME_SECONDS = 576 / 24000
+SILENT_FRAME = FRAME_HEADER + bytes(FRAME_BYTES - len(FRAME_HEADER))
+
+# Frames per streamed message (Edge sends audio in small messages)
+FRAMES_PER_MESSAGE = 32
+
+TAG = re.compile(r'<[^>]+>')
+
+class FakeCommunicate:
+    """Same interface as edge_tts.Communicate(text, voice).stream()
+    
+    Audio length follows the text (speaking_rate characters per second) and
+    arrives after first_byte seconds, then at realtime_factor x real time.
+    """
+    
+    speaking_rate = 15.0
+    first_byte = 0.3
+    realtime_factor = 20.0
+    
+    def __init__(self, text: str, voice: str = "", **kwargs):
+        self.text = text
+        self.voice = voice
+    
+    async def stream(self):
+        characters = len(TAG.sub("", self.text))
+        frames = max(1, math.ceil(characters / self.speaking_rate / FRAME_SECONDS))
+        await asyncio.sleep(self.first_byte)
+        message_seconds = FRAMES_PER_MESSAGE * FRAME_SECONDS / self.realtime_factor
+        for start in range(0, frames, FRAMES_PER_MESSAGE):
+            count = min(FRAMES_PER_MESSAGE, frames - start)
+            await asyncio.sleep(message_seconds * count / FRAMES_PER_MESSAGE)
+            yield {"type": "audio", "data": SILENT_FRAME * count}
+
+def install(first_byte: float = FakeCommunicate.first_byte, realtime_factor: float = FakeCommunicate.realtime_factor,
+            speaking_rate: float = FakeCommunicate.speaking_rate):
+    """Route every edge_tts.Communicate in this process to FakeCommunicate"""
+    FakeCommunicate.first_byte = first_byte
+    FakeCommunicate.realtime_factor = realtime_factor
+    FakeCommunicate.speaking_rate = speaking_rate
+    edge_tts.Communicate = FakeCommunicate
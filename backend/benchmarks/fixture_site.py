@@ -0,0 +1,180 @@
+"""
+Fixture site - local HTTP server with generated novels in several layouts and injected latency/faults
+
+Layouts (the first path segment):
+    /novelbin/{slug}             NovelBin-style TOC (paginated with ?page=n), chapters in #chr-content
+    /novelbin/{slug}/chapter-{n}
+    /article/{slug}              single-page TOC, chapters in a generic <article>
+    /article/{slug}/chapter-{n}
+"""
+
+import random
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+LAYOUTS = ("novelbin", "article")
+
+# Chapters listed per TOC page on the paginated layout
+TOC_PAGE_SIZE = 50
+
+WORDS = (
+    "the road river night village sword spirit master disciple ancient sect mountain cloud heart "
+    "silence lantern storm winter letter promise shadow temple ember gate harbor voice memory "
+    "walked turned whispered remembered carried waited answered smiled followed listened slowly "
+    "again quietly before beneath across toward under between without because although while"
+).split()
+
+CHAPTER_PATH = re.compile(r'^/(\w+)/([\w-]+)/chapter-(\d+)/?$')
+TOC_PATH = re.compile(r'^/(\w+)/([\w-]+)/?$')
+
+def chapter_paragraphs(slug: str, number: int, paragraphs: int) -> list:
+    """Deterministic filler text, different for every chapter (so nothing is dropped as a duplicate)"""
+    rng = random.Random(f"{slug}:{number}")
+    result = []
+    for _ in range(paragraphs):
+        sentences = []
+        for _ in range(rng.randint(3, 6)):
+            words = [rng.choice(WORDS) for _ in range(rng.randint(8, 18))]
+            sentences.append(" ".join(words).capitalize() + ".")
+        result.append(" ".join(sentences))
+    return result
+
+def novel_title(slug: str) -> str:
+    return slug.replace("-", " ").title()
+
+def page(title: str, body: str) -> bytes:
+    # Scripts and navigation around the text, like the real sites
+    return (
+        f'<!DOCTYPE html><html lang="en"><head><meta charset="utf-8"><title>{title}</title>'
+        f'<script>window.__cfg = {{"k": "{"x" * 400}"}};</script></head><body>'
+        f'<header><nav><a href="/">Home</a> <a href="/genres">Genres</a></nav></header>'
+        f'{body}<footer><p>Read the latest chapters first on our site.</p></footer></body></html>'
+    ).encode("utf-8")
+
+class FixtureSite:
+    """Serves generated novels from a background thread
+    
+    Every response is delayed by a random latency in [latency_min, latency_max]
+    seconds. Chapter pages answer 403 with probability forbidden_rate and 500
+    with probability error_rate. Request counts by status are kept in `served`.
+    """
+    
+    def __init__(self, chapters: int = 100, paragraphs: int = 30, latency: Tuple[float, float] = (0.05, 0.2),
+                 forbidden_rate: float = 0.0, error_rate: float = 0.0, seed: int = 0):
+        self.chapters = chapters
+        self.paragraphs = paragraphs
+        self.latency = latency
+        self.forbidden_rate = forbidden_rate
+        self.error_rate = error_rate
+        self.served = {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+    
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    def toc_url(self, layout: str, slug: str) -> str:
+        return f"{self.base_url}/{layout}/{slug}"
+    
+    def chapter_url(self, layout: str, slug: str, number: int) -> str:
+        return f"{self.base_url}/{layout}/{slug}/chapter-{number}"
+    
+    def start(self):
+        site = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            
+            def do_GET(self):
+                status, body = site.respond(self.path)
+                self.send_response(status)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, format, *args):
+                pass
+        
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, *exc_info):
+        self.stop()
+    
+    def respond(self, path: str) -> Tuple[int, bytes]:
+        with self._lock:
+            delay = self._rng.uniform(*self.latency)
+            roll = self._rng.random()
+        threading.Event().wait(delay)
+        
+        status, body = self.render(path, roll)
+        with self._lock:
+            self.served[status] = self.served.get(status, 0) + 1
+        return status, body
+    
+    def render(self, path: str, roll: float) -> Tuple[int, bytes]:
+        parts = urlsplit(path)
+        match = CHAPTER_PATH.match(parts.path)
+        if match and match.group(1) in LAYOUTS and 1 <= int(match.group(3)) <= self.chapters:
+            if roll < self.forbidden_rate:
+                return 403, page("Just a moment...", "<p>Checking your browser before accessing the site.</p>")
+            if roll < self.forbidden_rate + self.error_rate:
+                return 500, page("Server Error", "<p>Internal server error</p>")
+            return 200, self.chapter_page(match.group(1), match.group(2), int(match.group(3)))
+        
+        match = TOC_PATH.match(parts.path)
+        if match and match.group(1) in LAYOUTS:
+            page_number = int(parse_qs(parts.query).get("page", ["1"])[0])
+            return 200, self.toc_page(match.group(1), match.group(2), page_number)
+        
+        return 404, page("Not Found", "<p>Page not found</p>")
+    
+    def chapter_page(self, layout: str, slug: str, number: int) -> bytes:
+        title = f"Chapter {number}: {novel_title(slug)} Part {number}"
+        paragraphs = "".join(f"<p>{text}</p>" for text in chapter_paragraphs(slug, number, self.paragraphs))
+        nav = (f'<div class="chapter-nav"><a href="/{layout}/{slug}/chapter-{max(1, number - 1)}">Prev</a> '
+               f'<a href="/{layout}/{slug}">Index</a> <a href="/{layout}/{slug}/chapter-{number + 1}">Next</a></div>')
+        if layout == "novelbin":
+            body = (f'<div id="chapter"><a class="novel-title" href="/novelbin/{slug}">{novel_title(slug)}</a>'
+                    f'<h2><a class="chr-title" href="#"><span class="chr-text">{title}</span></a></h2>{nav}'
+                    f'<div id="chr-content" class="chr-c">{paragraphs}'
+                    f'<div class="ads"><script>loadAd();</script></div></div>{nav}</div>')
+        else:
+            body = f'<main><article class="post"><h1 class="entry-title">{title}</h1>{paragraphs}</article>{nav}</main>'
+        return page(f"{novel_title(slug)} {title}", body)
+    
+    def toc_page(self, layout: str, slug: str, page_number: int) -> bytes:
+        if layout == "novelbin":
+            pages = max(1, (self.chapters + TOC_PAGE_SIZE - 1) // TOC_PAGE_SIZE)
+            first = (page_number - 1) * TOC_PAGE_SIZE + 1
+            numbers = range(first, min(self.chapters, first + TOC_PAGE_SIZE - 1) + 1)
+            pagination = "".join(f'<li><a href="/novelbin/{slug}?page={n}">{n}</a></li>' for n in range(1, pages + 1))
+            if page_number < pages:
+                pagination += f'<li class="next"><a href="/novelbin/{slug}?page={page_number + 1}">Next</a></li>'
+            footer = f'<ul class="pagination">{pagination}</ul>'
+        else:
+            numbers = range(1, self.chapters + 1)
+            footer = ""
+        links = "".join(f'<li><a href="/{layout}/{slug}/chapter-{n}">Chapter {n}</a></li>' for n in numbers)
+        body = f'<h3 class="title">{novel_title(slug)}</h3><ul class="list-chapter">{links}</ul>{footer}'
+        return page(novel_title(slug), body)
@@ -0,0 +1,198 @@
+"""
+Boilerplate index - per-novel fingerprints of paragraphs/sentences that sites repeat in every chapter
+"""
+
+import hashlib
+import math
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from bs4 import BeautifulSoup
+
+from extraction import FAST_PARSER, clean_text
+from tts_chunking import PARAGRAPH_BREAK, split_sentences
+
+# A segment counts as boilerplate once it has appeared in at least this many different chapters...
+DEFAULT_BOILERPLATE_MIN_CHAPTERS = 3
+
+# ...and in at least this share of the novel's indexed chapters (watermarks are on nearly every
+# chapter; a story's refrains, oaths or system messages recur, but not in half of them)
+DEFAULT_BOILERPLATE_MIN_RATIO = 0.5
+
+# Shorter segments are never fingerprinted ("Yes.", "He nodded." repeat naturally)
+MIN_SEGMENT_CHARS = 25
+
+# SQLite's limit on host parameters per statement is 999
+QUERY_BATCH = 900
+
+CHAPTER_SEGMENT = re.compile(r'/[^/]*chapter[_-]?\d+[^/]*$', re.I)
+NON_WORD = re.compile(r'[\W_]+', re.UNICODE)
+EXTRA_SPACES = re.compile(r'[ \t]{2,}')
+EXTRA_BREAKS = re.compile(r'[ \t]*\n\s*\n\s*')
+
+def boilerplate_scope_key(chapter_url: str) -> str:
+    """Which chapters share a boilerplate index: the URL up to its chapter segment (or its parent path)"""
+    url = chapter_url.split('#')[0].split('?')[0].rstrip('/')
+    match = CHAPTER_SEGMENT.search(url)
+    if match:
+        return url[:match.start()]
+    return url.rsplit('/', 1)[0]
+
+def split_paragraphs(html: bytes, text: str) -> List[str]:
+    """The page's paragraphs that make up text (the chapter as extracted from that page), in page order
+    
+    Extracted chapter text has its whitespace collapsed, so paragraphs can only
+    be told apart on the page itself. Returns [] when the page doesn't split
+    text into at least two paragraphs.
+    """
+    soup = BeautifulSoup(html, FAST_PARSER)
+    paragraphs = []
+    for element in soup.find_all(['p', 'div']):
+        if element.find(['p', 'div']) is not None:
+            continue
+        paragraph = clean_text(element.get_text(strip=True))
+        if len(paragraph) > 20 and paragraph in text:
+            paragraphs.append(paragraph)
+    return paragraphs if len(paragraphs) > 1 else []
+
+def segment(text: str) -> List[str]:
+    """Split text into paragraphs, or into sentences when it has no paragraph breaks"""
+    paragraphs = [part.strip() for part in PARAGRAPH_BREAK.split(text) if part.strip()]
+    if len(paragraphs) > 1:
+        return paragraphs
+    return split_sentences(text)
+
+def remove_segments(text: str, segments: List[str]) -> str:
+    """text without the given segments (first occurrence of each), spacing tidied up"""
+    for part in segments:
+        text = text.replace(part, '', 1)
+    return EXTRA_SPACES.sub(' ', EXTRA_BREAKS.sub('\n\n', text)).strip()
+
+def fingerprint(segment_text: str) -> Optional[str]:
+    """Case/punctuation-insensitive hash of a segment, or None if it is too short to judge"""
+    normalized = NON_WORD.sub(' ', segment_text.lower()).strip()
+    if len(normalized) < MIN_SEGMENT_CHARS:
+        return None
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:16]
+
+class BoilerplateIndex:
+    """SQLite index (output/boilerplate.db) of segment fingerprints per novel.
+    
+    Every chapter passed to strip() is added to the index first (once per
+    chapter, so re-processing is harmless), then every segment seen in at
+    least min_chapters chapters of the same novel, and in at least min_ratio of
+    the chapters indexed for it, is removed. The index grows as chapters stream
+    in, so the first chapters of a new novel keep their boilerplate until it
+    has repeated often enough to be recognized.
+    """
+    
+    def __init__(self, db_path: Path, min_chapters: int = DEFAULT_BOILERPLATE_MIN_CHAPTERS,
+                 min_ratio: float = DEFAULT_BOILERPLATE_MIN_RATIO):
+        self.min_chapters = max(2, min_chapters)
+        self.min_ratio = min(1.0, max(0.0, min_ratio))
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS segments (
+                novel_key TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                chapters INTEGER NOT NULL,
+                sample TEXT NOT NULL,
+                PRIMARY KEY (novel_key, fingerprint)
+            );
+            CREATE TABLE IF NOT EXISTS chapters (
+                novel_key TEXT NOT NULL,
+                chapter_key TEXT NOT NULL,
+                characters INTEGER NOT NULL,
+                saved INTEGER NOT NULL,
+                PRIMARY KEY (novel_key, chapter_key)
+            );
+        """)
+        self._conn.commit()
+    
+    def _threshold(self, chapters: int) -> int:
+        """Chapters a segment must appear in to be boilerplate, for a novel with this many chapters indexed"""
+        return max(self.min_chapters, math.ceil(self.min_ratio * chapters))
+    
+    def _chapter_count(self, novel: str) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM chapters WHERE novel_key = ?", (novel,)).fetchone()[0]
+    
+    def _counts(self, novel: str, fingerprints: List[str]) -> Dict[str, int]:
+        counts = {}
+        for start in range(0, len(fingerprints), QUERY_BATCH):
+            batch = fingerprints[start:start + QUERY_BATCH]
+            rows = self._conn.execute(
+                f"SELECT fingerprint, chapters FROM segments WHERE novel_key = ? AND fingerprint IN ({','.join('?' * len(batch))})",
+                [novel, *batch],
+            )
+            counts.update(rows)
+        return counts
+    
+    def strip(self, novel: str, chapter_key: str, text: str, paragraphs: Optional[List[str]] = None) -> Tuple[str, int]:
+        """Index one chapter and return (text without boilerplate, characters removed)
+        
+        paragraphs are the chapter's paragraphs from split_paragraphs(); without
+        them, text is split by segment(). A chapter that would be left empty is
+        returned unchanged.
+        """
+        segments = paragraphs or segment(text)
+        prints = [fingerprint(part) for part in segments]
+        distinct = sorted({fp for fp in prints if fp})
+        
+        with self._lock:
+            known_chapter = self._conn.execute(
+                "SELECT 1 FROM chapters WHERE novel_key = ? AND chapter_key = ?", (novel, chapter_key)
+            ).fetchone()
+            if not known_chapter and distinct:
+                samples = {fp: part for fp, part in zip(prints, segments) if fp}
+                self._conn.executemany(
+                    "INSERT INTO segments VALUES (?, ?, 1, ?) "
+                    "ON CONFLICT (novel_key, fingerprint) DO UPDATE SET chapters = chapters + 1",
+                    [(novel, fp, samples[fp][:500]) for fp in distinct],
+                )
+            counts = self._counts(novel, distinct)
+            threshold = self._threshold(self._chapter_count(novel) + (0 if known_chapter else 1))
+            
+            removed = [part for part, fp in zip(segments, prints) if fp and counts.get(fp, 0) >= threshold]
+            result = remove_segments(text, removed) or text
+            saved = len(text) - len(result)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO chapters VALUES (?, ?, ?, ?)", (novel, chapter_key, len(text), saved)
+            )
+            self._conn.commit()
+        return result, saved
+    
+    def stats(self, novel: Optional[str] = None, samples: int = 10) -> List[dict]:
+        """Per novel: chapters indexed, characters seen and saved, and the most repeated boilerplate segments"""
+        with self._lock:
+            query = "SELECT novel_key, COUNT(*), SUM(characters), SUM(saved) FROM chapters"
+            params: list = []
+            if novel:
+                query += " WHERE novel_key = ?"
+                params.append(novel)
+            novels = self._conn.execute(query + " GROUP BY novel_key ORDER BY novel_key", params).fetchall()
+            result = []
+            for key, chapters, characters, saved in novels:
+                threshold = self._threshold(chapters)
+                repeated = self._conn.execute(
+                    "SELECT sample, chapters FROM segments WHERE novel_key = ? AND chapters >= ? "
+                    "ORDER BY chapters DESC LIMIT ?",
+                    (key, threshold, samples),
+                ).fetchall()
+                boilerplate = self._conn.execute(
+                    "SELECT COUNT(*) FROM segments WHERE novel_key = ? AND chapters >= ?", (key, threshold)
+                ).fetchone()[0]
+                result.append({
+                    "novel": key,
+                    "chapters": chapters,
+                    "boilerplate_threshold": threshold,
+                    "characters": characters,
+                    "characters_saved": saved,
+                    "boilerplate_segments": boilerplate,
+                    "top_segments": [{"text": sample, "chapters": count} for sample, count in repeated],
+                })
+        return result
@@ -0,0 +1,170 @@
+"""
+Chapter export - batch text files written in one streaming pass, plus the spool of scrape results they can be built from
+"""
+
+import gzip
+import importlib.util
+import json
+import os
+import re
+import time
+import uuid
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional
+
+# Output compression: file suffix per format
+COMPRESSIONS = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+
+# Spooled scrape results older than this are deleted (exports are expected right after the scrape)
+DEFAULT_SCRAPE_SPOOL_TTL = 24 * 60 * 60
+
+SCRAPE_ID = re.compile(r'^[0-9a-f]{12}$')
+
+def compression_unavailable_reason(compression: str) -> Optional[str]:
+    """Why this compression cannot be used (unknown, missing optional dependency), or None"""
+    if compression not in COMPRESSIONS:
+        return f"unknown compression '{compression}' (available: {', '.join(COMPRESSIONS)})"
+    if compression == "zstd" and importlib.util.find_spec("zstandard") is None:
+        return "zstd needs the optional zstandard package (pip install zstandard)"
+    return None
+
+def open_text_writer(path: Path, compression: str = "none"):
+    """Text-mode (UTF-8) file object for path, compressed on the fly"""
+    if compression == "gzip":
+        return gzip.open(path, 'wt', encoding='utf-8', compresslevel=6)
+    if compression == "zstd":
+        import zstandard
+        return zstandard.open(path, 'wt', encoding='utf-8')
+    return open(path, 'w', encoding='utf-8')
+
+def write_chapter_batches(chapters: Iterable[dict], output_path: Path, batch_size: int = 10,
+                          compression: str = "none") -> List[dict]:
+    """Write chapters into chapters_{first}_to_{last}.txt files of batch_size chapters each
+    
+    Chapters are consumed one at a time and written straight to the current
+    file, so only one chapter's text is in memory whatever the total size. Each
+    file is written under a temporary name and renamed once complete, so a
+    reader never sees a partial file. Returns one summary dict per file.
+    """
+    output_path.mkdir(parents=True, exist_ok=True)
+    batch_size = max(1, batch_size)
+    suffix = COMPRESSIONS[compression]
+    saved_files = []
+    writer = None
+    part_file = None
+    chunk_start = 0
+    chapters_in_file = 0
+    characters = 0
+    
+    def finish():
+        writer.close()
+        chunk_end = chunk_start + chapters_in_file
+        filename = f"chapters_{chunk_start + 1}_to_{chunk_end}.txt{suffix}"
+        filepath = output_path / filename
+        os.replace(part_file, filepath)
+        saved_files.append({
+            "filename": filename,
+            "path": str(filepath),
+            "chapters_count": chapters_in_file,
+            "characters": characters,
+            "bytes": filepath.stat().st_size,
+        })
+    
+    try:
+        for index, chapter in enumerate(chapters):
+            if writer is None:
+                chunk_start = index
+                chapters_in_file = 0
+                characters = 0
+                part_file = output_path / f".chapters_{index + 1}.{uuid.uuid4().hex[:8]}.part"
+                writer = open_text_writer(part_file, compression)
+            
+            pieces = [f"=== Chapter {chapter.get('chapter_number') or index + 1} ===\n\n"]
+            if chapter.get('title'):
+                pieces.append(f"{chapter['title']}\n\n")
+            pieces.append(chapter.get('content') or '')
+            pieces.append("\n\n")
+            for piece in pieces:
+                writer.write(piece)
+                characters += len(piece)
+            chapters_in_file += 1
+            
+            if chapters_in_file >= batch_size:
+                finish()
+                writer = None
+        if writer is not None:
+            finish()
+            writer = None
+    finally:
+        if writer is not None:
+            writer.close()
+            part_file.unlink(missing_ok=True)
+    return saved_files
+
+class ScrapeSpool:
+    """Scrape results kept on disk as NDJSON (output/scrapes/<scrape_id>.ndjson)
+    
+    Lets a client export what it just scraped by id instead of posting every
+    chapter's text back. A spool only gets its final name once the scrape has
+    finished; the spool of a scrape that failed partway is deleted.
+    """
+    
+    def __init__(self, spool_dir: Path, ttl: float = DEFAULT_SCRAPE_SPOOL_TTL):
+        self.spool_dir = Path(spool_dir)
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+    
+    def path(self, scrape_id: str) -> Optional[Path]:
+        """File of a finished spool, or None for unknown/malformed ids"""
+        if not SCRAPE_ID.match(scrape_id):
+            return None
+        path = self.spool_dir / f"{scrape_id}.ndjson"
+        return path if path.exists() else None
+    
+    def create(self) -> "SpoolWriter":
+        self.prune()
+        return SpoolWriter(self.spool_dir, uuid.uuid4().hex[:12])
+    
+    def prune(self):
+        cutoff = time.time() - self.ttl
+        for path in self.spool_dir.iterdir():
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+            except OSError:
+                pass
+    
+    def iter_chapters(self, scrape_id: str) -> Iterator[dict]:
+        """Chapters of a finished spool, read one line at a time"""
+        path = self.path(scrape_id)
+        if path is None:
+            return
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+class SpoolWriter:
+    """Appends results to <scrape_id>.ndjson.part; close() publishes it as <scrape_id>.ndjson, abort() drops it"""
+    
+    def __init__(self, spool_dir: Path, scrape_id: str):
+        self.scrape_id = scrape_id
+        self.path = spool_dir / f"{scrape_id}.ndjson"
+        self._part = self.path.with_name(self.path.name + ".part")
+        self._file = open(self._part, 'w', encoding='utf-8')
+    
+    def write(self, result: dict):
+        self._file.write(json.dumps(result, ensure_ascii=False) + "\n")
+    
+    def close(self):
+        """Publish the spool (only call once the scrape has finished)"""
+        if self._file.closed:
+            return
+        self._file.close()
+        os.replace(self._part, self.path)
+    
+    def abort(self):
+        """Drop the spool of a scrape that failed or was abandoned, so a partial result is never exported"""
+        if not self._file.closed:
+            self._file.close()
+        self._part.unlink(missing_ok=True)
@@ -0,0 +1,300 @@
+"""
+Chapter extraction - turn a chapter page into clean text and a title
+"""
+
+import re
+import time
+from typing import List, Optional, Tuple
+
+from bs4 import BeautifulSoup
+
+# lxml is much faster than html.parser; it is optional and only used on the profile fast path
+try:
+    import lxml  # noqa: F401
+    FAST_PARSER = 'lxml'
+except ImportError:
+    FAST_PARSER = 'html.parser'
+
+def clean_text(text: str) -> str:
+    """Clean and format the scraped text (replica of original scraper)"""
+    if not text:
+        return ""
+    
+    # Remove extra whitespace
+    text = re.sub(r'\s+', ' ', text)
+    
+    # Remove common webnovel site elements
+    text = re.sub(r'Chapter \d+', '', text, flags=re.IGNORECASE)
+    text = re.sub(r'Next Chapter|Previous Chapter|Table of Contents|Advertisement', '', text, flags=re.IGNORECASE)
+    text = re.sub(r'Please enable JavaScript', '', text, flags=re.IGNORECASE)
+    
+    # Remove URLs
+    text = re.sub(r'http\S+', '', text)
+    
+    # Remove email addresses
+    text = re.sub(r'\S+@\S+', '', text)
+    
+    # Clean up multiple newlines
+    text = re.sub(r'\n\s*\n\s*\n+', '\n\n', text)
+    
+    # Remove HTML entities
+    text = text.replace('&nbsp;', ' ')
+    text = text.replace('&quot;', '"')
+    text = text.replace('&amp;', '&')
+    
+    # Strip and return
+    return text.strip()
+
+def get_novel_title(soup: BeautifulSoup, url: str) -> Optional[str]:
+    """Extract novel title from the page"""
+    try:
+        # Method 1: Look for title in meta tags
+        title_tag = soup.find('meta', property='og:title')
+        if title_tag and title_tag.get('content'):
+            title = title_tag.get('content')
+            title = re.sub(r'\s*-\s*NovelBin.*$', '', title, flags=re.I)
+            title = re.sub(r'\s*-\s*Read.*$', '', title, flags=re.I)
+            if title:
+                return title.strip()
+        
+        # Method 2: Look for h1 with novel title
+        h1 = soup.find('h1')
+        if h1:
+            title = h1.get_text(strip=True)
+            if title and len(title) < 200:
+                return title
+        
+        # Method 3: Extract from URL
+        match = re.search(r'/b/([^/]+)', url)
+        if match:
+            title = match.group(1).replace('-', ' ').title()
+            return title
+        
+        # Method 4: Page title tag
+        title_tag = soup.find('title')
+        if title_tag:
+            title = title_tag.get_text(strip=True)
+            title = re.sub(r'\s*-\s*NovelBin.*$', '', title, flags=re.I)
+            title = re.sub(r'\s*-\s*Read.*$', '', title, flags=re.I)
+            if title:
+                return title.strip()
+        
+        return None
+    except:
+        return None
+
+# Selector cascades, most specific first
+TITLE_SELECTORS = [
+    'h1.chapter-title', 'h1#chapter-title', 'h2.chapter-title',
+    'div.chapter-title h1', 'div.chapter-title h2',
+    'h1.chr-title', 'h1#chr-title',
+    'h2.chapter-heading', 'div.chapter-heading',
+    'div.chr-title h1', 'div.chr-title h2',
+    'div.chapter-header h1', 'div.chapter-header h2',
+]
+
+CONTENT_SELECTORS = [
+    'div.chapter-content', 'div#chapter-content', 'div.chapter-body',
+    'div#chapter-body', 'div.content', 'div#content', 'div.text-content',
+    'article', 'div.read-content', 'div.chapter-text',
+    'div#chr-content', 'div.chr-c', 'div#chaptercontent'
+]
+
+# For novelbin.com, these win over the generic content selectors
+NOVELBIN_CONTENT_SELECTOR = 'div#chr-content, div.chr-c, div#chaptercontent, div.chapter-content'
+
+def find_chapter_title(soup: BeautifulSoup, novel_title: Optional[str] = None,
+                       title_selectors: Optional[List[str]] = None) -> Tuple[Optional[str], Optional[str]]:
+    """Run the chapter title cascade and return (title, winning selector)
+    
+    The winning selector is None when the title came from the heading fallbacks.
+    """
+    chapter_title = None
+    
+    # Try various selectors for chapter title
+    if title_selectors is None:
+        title_selectors = TITLE_SELECTORS
+    
+    for selector in title_selectors:
+        title_elem = soup.select_one(selector)
+        if title_elem:
+            title_text = title_elem.get_text(strip=True)
+            if title_text and len(title_text) < 200:
+                if novel_title and title_text.lower() == novel_title.lower():
+                    continue
+                if not re.search(r'novelbin|read online|table of contents|home|novel$|^novel\s', title_text, re.I):
+                    title_text = re.sub(r'^Chapter\s+\d+[:\s]+', '', title_text, flags=re.I)
+                    if title_text and len(title_text) > 2:
+                        return title_text, selector
+    
+    # If still no title, look for h1/h2 within content area
+    if not chapter_title:
+        content_area = soup.select_one('div.chapter-content, div#chapter-content, div.chapter-body, div#chapter-body, div#chr-content, div.chr-c, article, div.read-content')
+        if content_area:
+            for heading in content_area.find_all(['h1', 'h2', 'h3'], limit=3):
+                title_text = heading.get_text(strip=True)
+                if title_text and len(title_text) < 200 and len(title_text) > 2:
+                    if novel_title and title_text.lower() == novel_title.lower():
+                        continue
+                    if re.search(r'chapter|episode|part', title_text, re.I) or len(title_text) < 100:
+                        title_text = re.sub(r'^Chapter\s+\d+[:\s]+', '', title_text, flags=re.I)
+                        if title_text:
+                            chapter_title = title_text
+                            break
+    
+    # If still no title, try all h1/h2 but exclude novel title
+    if not chapter_title:
+        for heading in soup.find_all(['h1', 'h2'], limit=5):
+            title_text = heading.get_text(strip=True)
+            if title_text and len(title_text) < 200 and len(title_text) > 2:
+                if novel_title and title_text.lower() == novel_title.lower():
+                    continue
+                if not re.search(r'novelbin|read online|table of contents|home|menu|navigation|^novel\s', title_text, re.I):
+                    if re.search(r'chapter\s+\d+|episode\s+\d+', title_text, re.I) or \
+                       (heading.find_parent(['div', 'article'], class_=re.compile('content|chapter|read', re.I))):
+                        title_text = re.sub(r'^Chapter\s+\d+[:\s]+', '', title_text, flags=re.I)
+                        if title_text:
+                            chapter_title = title_text
+                            break
+    
+    return chapter_title, None
+
+def extract_chapter_title(soup: BeautifulSoup, novel_title: Optional[str] = None) -> Optional[str]:
+    """Extract chapter title from soup object (replica of original)"""
+    return find_chapter_title(soup, novel_title)[0]
+
+def title_from_url(url: str) -> Optional[str]:
+    """Chapter title from a URL like .../chapter-12-the-title"""
+    match = re.search(r'chapter[_-]\d+[_-](.+)', url, re.I)
+    if match:
+        title_from_url = match.group(1).replace('-', ' ').title()
+        if len(title_from_url) > 3 and not re.match(r'^\d+$', title_from_url):
+            return title_from_url
+    return None
+
+def find_content_element(soup: BeautifulSoup):
+    """Run the content selector cascade and return (element, winning selector)
+    
+    The selector is None when the element came from the class-regex or <body> fallbacks.
+    """
+    content = None
+    winner = None
+    for selector in CONTENT_SELECTORS:
+        content = soup.select_one(selector)
+        if content:
+            winner = selector
+            break
+    
+    if not content:
+        content = soup.find('div', class_=re.compile('content|chapter|text', re.I))
+    
+    if not content:
+        content = soup.find('body')
+    
+    if content:
+        # For novelbin.com, try specific selectors
+        novelbin_content = soup.select_one(NOVELBIN_CONTENT_SELECTOR)
+        if novelbin_content:
+            content = novelbin_content
+            winner = NOVELBIN_CONTENT_SELECTOR
+    
+    return content, winner
+
+def content_text(content) -> str:
+    """Paragraph text of a content element, filtered and cleaned"""
+    paragraphs = content.find_all(['p', 'div'])
+    text_parts = []
+    
+    for p in paragraphs:
+        text = p.get_text(strip=True)
+        if text and len(text) > 20:
+            if not re.search(r'previous|next|chapter|table of contents|advertisement', text, re.I):
+                text_parts.append(text)
+    
+    # If no paragraphs found, try getting all text
+    if not text_parts:
+        text = content.get_text(separator='\n', strip=True)
+        if text and len(text) > 50:
+            lines = [line.strip() for line in text.split('\n') if line.strip() and len(line.strip()) > 20]
+            text_parts = lines
+    
+    full_text = '\n\n'.join(text_parts)
+    return clean_text(full_text)
+
+def extract_chapter_content(soup: BeautifulSoup, url: str) -> tuple[str, Optional[str]]:
+    """Extract chapter content and title from soup object (replica of original)"""
+    content, chapter_title, _ = extract_with_cascade(soup, url)
+    return content, chapter_title
+
+def extract_with_cascade(soup: BeautifulSoup, url: str, novel_title: Optional[str] = None) -> Tuple[str, Optional[str], dict]:
+    """Full selector cascade; returns (content, title, profile) where profile records what won"""
+    if novel_title is None:
+        novel_title = get_novel_title(soup, url)
+    chapter_title, title_selector = find_chapter_title(soup, novel_title)
+    
+    # Try to extract from URL if no title found
+    if not chapter_title:
+        chapter_title = title_from_url(url)
+    
+    content, content_selector = find_content_element(soup)
+    profile = {
+        "title_selector": title_selector,
+        "content_selector": content_selector,
+        "novel_title": novel_title,
+    }
+    
+    if content:
+        return content_text(content), chapter_title, profile
+    
+    return "", chapter_title, profile
+
+def extract_with_profile(soup: BeautifulSoup, url: str, profile: dict, novel_title: Optional[str]) -> Optional[Tuple[str, Optional[str]]]:
+    """Fast path: use a site's learned selectors; None when the profile doesn't fit this page"""
+    content_selector = profile.get("content_selector")
+    if not content_selector:
+        return None
+    content = soup.select_one(content_selector)
+    if not content:
+        return None
+    text = content_text(content)
+    if not text:
+        return None
+    
+    # Only the learned title selector; the full title cascade runs if it misses
+    title_selector = profile.get("title_selector")
+    if title_selector:
+        chapter_title, winner = find_chapter_title(soup, novel_title, [title_selector])
+        if not winner:
+            chapter_title, _ = find_chapter_title(soup, novel_title)
+    else:
+        chapter_title, _ = find_chapter_title(soup, novel_title, [])
+    if not chapter_title:
+        chapter_title = title_from_url(url)
+    
+    return text, chapter_title
+
+def extract_page(html: bytes, url: str, profile: Optional[dict] = None,
+                 novel_title: Optional[str] = None) -> Tuple[str, Optional[str], dict]:
+    """Extract (content, title, info) from raw page bytes
+    
+    With a site profile the page is parsed with FAST_PARSER and only the learned
+    selectors are tried; if they miss, the page is re-parsed with html.parser and
+    the full cascade runs. info says which path was taken and carries what the
+    cascade learned (selectors, novel title) so the caller can update its profiles,
+    plus the time spent parsing and extracting ("seconds").
+    """
+    started = time.perf_counter()
+    if profile:
+        soup = BeautifulSoup(html, FAST_PARSER)
+        if novel_title is None:
+            novel_title = get_novel_title(soup, url)
+        result = extract_with_profile(soup, url, profile, novel_title)
+        if result:
+            content, chapter_title = result
+            return content, chapter_title, {"fast_path": True, "novel_title": novel_title,
+                                            "seconds": time.perf_counter() - started}
+    
+    soup = BeautifulSoup(html, 'html.parser')
+    content, chapter_title, learned = extract_with_cascade(soup, url, novel_title)
+    return content, chapter_title, {"fast_path": False, "profile_missed": bool(profile), **learned,
+                                    "seconds": time.perf_counter() - started}
@@ -0,0 +1,74 @@
+"""
+Extraction pool - run HTML parsing and text extraction in worker processes
+"""
+
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Tuple
+
+from extraction import extract_page
+from fetch_engine import host_of
+import metrics
+from site_profiles import SiteProfileStore
+
+# Worker processes for extraction (0 = extract inline in the calling thread)
+DEFAULT_EXTRACTION_WORKERS = os.cpu_count() or 1
+
+class ExtractionPool:
+    """Parses chapter pages in a process pool so extraction runs on every core.
+    
+    BeautifulSoup, the selector cascade and clean_text's regex passes are CPU
+    bound and hold the GIL; in worker processes they no longer stall the event
+    loop or the fetch threads. Site profiles stay in this process: each job is
+    sent the domain's current profile and the result tells us what to record.
+    The pool is created on first use and rebuilt if a worker dies.
+    """
+    
+    def __init__(self, profiles: SiteProfileStore, workers: int = DEFAULT_EXTRACTION_WORKERS):
+        self.profiles = profiles
+        self.workers = max(0, workers)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+    
+    def _get_executor(self) -> Optional[ProcessPoolExecutor]:
+        if not self.workers:
+            return None
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._executor
+    
+    def _reset_executor(self, executor: ProcessPoolExecutor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+    
+    def extract(self, html: bytes, url: str) -> Tuple[str, Optional[str]]:
+        """Extract (content, title) from raw response bytes; blocks the calling thread, not the GIL"""
+        profile, novel_title = self.profiles.lookup(url)
+        executor = self._get_executor()
+        result = None
+        if executor is not None:
+            try:
+                result = executor.submit(extract_page, html, url, profile, novel_title).result()
+            except BrokenProcessPool:
+                print("Extraction worker died, restarting the pool")
+                self._reset_executor(executor)
+        if result is None:
+            result = extract_page(html, url, profile, novel_title)
+        
+        content, chapter_title, info = result
+        host = host_of(url)
+        metrics.EXTRACTION_SECONDS.observe(info["seconds"], host=host, path="fast_path" if info.get("fast_path") else "cascade")
+        metrics.EXTRACTION_CHARACTERS.inc(len(content or ""), host=host)
+        self.profiles.record(url, content, info)
+        return content, chapter_title
+    
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
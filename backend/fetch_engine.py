@@ -0,0 +1,210 @@
+"""
+Async fetch engine - bounded concurrency with adaptive per-host politeness
+"""
+
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+# Defaults used by the scrape endpoints and the all-in-one worker
+DEFAULT_CONCURRENCY = 4
+
+# Adaptive per-host pacing: gap between request starts on the same host (seconds)
+DEFAULT_HOST_INTERVAL = 1.0  # Where every host starts
+MIN_HOST_INTERVAL = 0.25  # Fastest pace, however healthy the host looks
+MAX_HOST_INTERVAL = 60.0
+RATE_STEP = 0.05  # Requests/second added after each healthy response (additive increase)
+BACKOFF_FACTOR = 2.0  # Interval multiplier on 403/429/503/timeouts (multiplicative decrease)
+SLOW_FACTOR = 1.25  # Interval multiplier when a response is much slower than usual
+SLOW_RESPONSE_RATIO = 3.0  # "Much slower": this many times the host's average latency
+BACKOFF_STATUSES = (403, 429, 503)
+MAX_RETRY_AFTER = 600.0
+JITTER = 0.25  # Each gap is randomized by +/- this fraction
+
+def host_of(url: str) -> str:
+    """Return the lowercase host of a URL (empty string if none)"""
+    return (urlsplit(url).hostname or "").lower()
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), capped at MAX_RETRY_AFTER"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return max(0.0, min(seconds, MAX_RETRY_AFTER))
+
+class HostPace:
+    """Pacing state of one host"""
+    
+    __slots__ = ("interval", "next_slot", "blocked_until", "latency", "samples", "backoffs")
+    
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.next_slot = 0.0
+        self.blocked_until = 0.0
+        self.latency = 0.0  # Moving average of response times
+        self.samples = 0
+        self.backoffs = 0
+
+class AdaptiveRateLimiter:
+    """Spaces out request starts per host, adapting the pace to how the host responds (AIMD).
+    
+    Each healthy response adds RATE_STEP requests/second to the host's rate, down
+    to MIN_HOST_INTERVAL between requests. A 403, 429, 503 or timeout doubles
+    the interval, a response much slower than the host's average stretches it a
+    little, and a Retry-After header blocks the host until it has passed.
+    
+    Reserving a slot is a short critical section guarded by a threading lock,
+    so one limiter can be shared by several event loops and worker threads at
+    once; the actual waiting happens outside the lock.
+    """
+    
+    def __init__(self, initial_interval: float = DEFAULT_HOST_INTERVAL, min_interval: float = MIN_HOST_INTERVAL,
+                 max_interval: float = MAX_HOST_INTERVAL):
+        self.initial_interval = initial_interval
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        self._hosts: Dict[str, HostPace] = {}
+        self._lock = threading.Lock()
+    
+    def _pace(self, host: str) -> HostPace:
+        pace = self._hosts.get(host)
+        if pace is None:
+            pace = self._hosts[host] = HostPace(max(self.min_interval, self.initial_interval))
+        return pace
+    
+    def reserve(self, host: str) -> float:
+        """Reserve the next slot for host and return how long to wait for it"""
+        with self._lock:
+            pace = self._pace(host)
+            now = time.monotonic()
+            slot = max(now, pace.next_slot, pace.blocked_until)
+            pace.next_slot = slot + pace.interval * random.uniform(1 - JITTER, 1 + JITTER)
+            return slot - now
+    
+    def blocked_for(self, host: str) -> float:
+        """Seconds left of a Retry-After/backoff block on host"""
+        with self._lock:
+            pace = self._hosts.get(host)
+            return max(0.0, pace.blocked_until - time.monotonic()) if pace else 0.0
+    
+    async def wait(self, host: str):
+        """Wait (without blocking the event loop) until host may be hit again"""
+        delay = self.reserve(host)
+        while delay > 0:
+            await asyncio.sleep(delay)
+            # A Retry-After received while we slept pushes this request back too
+            delay = self.blocked_for(host)
+    
+    def wait_blocking(self, host: str):
+        """Blocking variant of wait() for plain worker threads"""
+        delay = self.reserve(host)
+        while delay > 0:
+            time.sleep(delay)
+            delay = self.blocked_for(host)
+    
+    def record(self, host: str, status: Optional[int] = None, latency: Optional[float] = None,
+               retry_after: Optional[str] = None, timed_out: bool = False):
+        """Feed back the outcome of one request to host (status None with timed_out=False: connection error)"""
+        with self._lock:
+            pace = self._pace(host)
+            now = time.monotonic()
+            if timed_out or status in BACKOFF_STATUSES:
+                pace.interval = min(self.max_interval, max(pace.interval, DEFAULT_HOST_INTERVAL / 2) * BACKOFF_FACTOR)
+                pace.backoffs += 1
+                pace.next_slot = max(pace.next_slot, now + pace.interval)
+            elif status is not None and status < 500:
+                if latency is not None and pace.samples >= 5 and latency > pace.latency * SLOW_RESPONSE_RATIO:
+                    pace.interval = min(self.max_interval, pace.interval * SLOW_FACTOR)
+                elif pace.interval > 0:
+                    pace.interval = max(self.min_interval, 1 / (1 / pace.interval + RATE_STEP))
+                if latency is not None:
+                    pace.latency = latency if not pace.samples else pace.latency * 0.8 + latency * 0.2
+                    pace.samples += 1
+            
+            wait = parse_retry_after(retry_after)
+            if wait:
+                pace.blocked_until = max(pace.blocked_until, now + wait)
+    
+    def status(self, host: str) -> dict:
+        """Current pace of host, as shown in job status"""
+        with self._lock:
+            pace = self._hosts.get(host)
+            interval = pace.interval if pace else max(self.min_interval, self.initial_interval)
+            blocked = max(0.0, pace.blocked_until - time.monotonic()) if pace else 0.0
+            return {
+                "host": host,
+                "requests_per_minute": round(60 / interval, 1) if interval > 0 else None,
+                "interval": round(interval, 3),
+                "blocked_for": round(blocked, 1),
+                "backoffs": pace.backoffs if pace else 0,
+                "avg_latency": round(pace.latency, 3) if pace and pace.samples else None,
+            }
+    
+    def hosts(self) -> List[str]:
+        with self._lock:
+            return sorted(self._hosts)
+
+# Shared by every endpoint and job so concurrent callers can't multiply the load on a host
+host_limiter = AdaptiveRateLimiter()
+
+async def fetch_in_order(
+    items: Iterable[Any],
+    fetch_one: Callable[[Any], Any],
+    concurrency: int = DEFAULT_CONCURRENCY,
+    limiter: Optional[AdaptiveRateLimiter] = host_limiter,
+    url_of: Callable[[Any], str] = lambda item: item,
+    lookahead: Optional[int] = None,
+    skip_wait: Optional[Callable[[Any], bool]] = None,
+) -> AsyncIterator[Tuple[Any, Any]]:
+    """Run the blocking fetch_one(item) in threads and yield (item, result) in input order.
+    
+    At most `concurrency` fetches run at the same time and at most `lookahead`
+    items (default 2 x concurrency) are in flight or buffered, so a slow
+    consumer applies backpressure instead of letting results pile up.
+    Items for which skip_wait(item) is true (e.g. already cached) bypass the
+    per-host politeness delay; like fetch_one, skip_wait may block (a cache
+    lookup) and runs in a thread.
+    """
+    concurrency = max(1, concurrency)
+    lookahead = max(concurrency, lookahead or concurrency * 2)
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def run(item):
+        async with semaphore:
+            if limiter is not None and not (skip_wait and await asyncio.to_thread(skip_wait, item)):
+                await limiter.wait(host_of(url_of(item)))
+            return await asyncio.to_thread(fetch_one, item)
+    
+    iterator = iter(items)
+    pending: deque = deque()
+    
+    def fill():
+        while len(pending) < lookahead:
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            pending.append((item, asyncio.ensure_future(run(item))))
+    
+    try:
+        fill()
+        while pending:
+            item, task = pending.popleft()
+            result = await task
+            fill()
+            yield item, result
+    finally:
+        for _, task in pending:
+            task.cancel()
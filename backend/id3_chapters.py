@@ -0,0 +1,47 @@
+"""
+ID3 chapters - build an ID3v2.3 tag with CHAP/CTOC frames (ID3v2 Chapter Frame Addendum)
+"""
+
+import struct
+from typing import List, Optional, Tuple
+
+# CTOC entry count is a single byte
+MAX_TOC_ENTRIES = 255
+
+# "No byte offset" marker for CHAP start/end offsets (players use the times)
+NO_OFFSET = 0xFFFFFFFF
+
+def syncsafe(value: int) -> bytes:
+    return bytes([(value >> 21) & 0x7F, (value >> 14) & 0x7F, (value >> 7) & 0x7F, value & 0x7F])
+
+def frame(frame_id: bytes, body: bytes) -> bytes:
+    """An ID3v2.3 frame (plain 32-bit size, no flags)"""
+    return frame_id + struct.pack(">IH", len(body), 0) + body
+
+def text_frame(frame_id: bytes, text: str) -> bytes:
+    """A text frame in UTF-16 with BOM, which every ID3v2.3 reader handles"""
+    return frame(frame_id, b"\x01" + text.encode("utf-16"))
+
+def chapter_tag(chapters: List[Tuple[str, int, int]], title: Optional[str] = None, size: int = 0) -> bytes:
+    """ID3v2.3 tag with one CHAP frame per (title, start_ms, end_ms) and a CTOC listing them in order
+    
+    The size depends only on the titles, so a tag built with placeholder
+    times can be written first and overwritten in place once the times are known.
+    With size, the tag is padded (inside the tag) to exactly that many bytes.
+    """
+    frames = []
+    if title:
+        frames.append(text_frame(b"TIT2", title))
+    
+    element_ids = [f"ch{index}".encode("ascii") for index in range(len(chapters))]
+    toc_entries = element_ids[:MAX_TOC_ENTRIES]
+    frames.append(frame(b"CTOC", b"toc\x00" + bytes([0x03, len(toc_entries)])
+                        + b"".join(element_id + b"\x00" for element_id in toc_entries)))
+    
+    for element_id, (chapter_title, start_ms, end_ms) in zip(element_ids, chapters):
+        body = element_id + b"\x00" + struct.pack(">IIII", start_ms, end_ms, NO_OFFSET, NO_OFFSET)
+        frames.append(frame(b"CHAP", body + text_frame(b"TIT2", chapter_title)))
+    
+    payload = b"".join(frames)
+    payload += bytes(max(0, size - 10 - len(payload)))
+    return b"ID3\x03\x00\x00" + syncsafe(len(payload)) + payload
@@ -0,0 +1,239 @@
+"""
+Job journal - durable per-chapter checkpoints for all-in-one jobs, so they can resume after a restart
+"""
+
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from url_templates import content_digest
+
+# Job statuses a job can be resumed from
+RESUMABLE_STATUSES = ("interrupted", "stopped", "error")
+
+class JobJournal:
+    """SQLite journal of all-in-one jobs (output/jobs.db) plus their intermediate files.
+    
+    For every chapter position the journal records whether it was scraped (the
+    text is kept in output/jobs/<job_id>/), synthesized (the chapter MP3 lives
+    next to it) and which batch it went into. Batches are only marked done once
+    the combined file is in place, so a job killed at any point picks up from
+    the last finished step. Jobs that were queued or running when the process
+    died are marked "interrupted" on startup.
+    """
+    
+    def __init__(self, db_path: Path, jobs_dir: Path):
+        self.jobs_dir = Path(jobs_dir)
+        self.jobs_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                request TEXT NOT NULL,
+                status TEXT NOT NULL,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS chapters (
+                job_id TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                url TEXT NOT NULL,
+                chapter_number INTEGER,
+                title TEXT,
+                scrape_status TEXT NOT NULL DEFAULT 'pending',
+                content_hash TEXT,
+                text_file TEXT,
+                tts_status TEXT NOT NULL DEFAULT 'pending',
+                audio_file TEXT,
+                batch_num INTEGER,
+                PRIMARY KEY (job_id, position)
+            );
+            CREATE TABLE IF NOT EXISTS batches (
+                job_id TEXT NOT NULL,
+                batch_num INTEGER NOT NULL,
+                file TEXT NOT NULL,
+                status TEXT NOT NULL,
+                PRIMARY KEY (job_id, batch_num)
+            );
+        """)
+        self._conn.execute(
+            "UPDATE jobs SET status = 'interrupted', updated_at = ? WHERE status IN ('queued', 'processing', 'paused')",
+            (time.time(),),
+        )
+        self._conn.commit()
+    
+    def _execute(self, sql: str, params=()):
+        with self._lock:
+            self._conn.execute(sql, params)
+            self._conn.commit()
+    
+    def _query(self, sql: str, params=()) -> list:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+    
+    def job_dir(self, job_id: str) -> Path:
+        return self.jobs_dir / job_id
+    
+    def create_job(self, request: dict) -> str:
+        """Register a queued job; its chapter list is added once discovered (set_chapters)"""
+        job_id = uuid.uuid4().hex[:12]
+        now = time.time()
+        self.job_dir(job_id).mkdir(parents=True, exist_ok=True)
+        self._execute(
+            "INSERT INTO jobs VALUES (?, ?, 'queued', NULL, ?, ?)",
+            (job_id, json.dumps(request), now, now),
+        )
+        return job_id
+    
+    def set_chapters(self, job_id: str, chapter_urls: List[str]):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO chapters (job_id, position, url) VALUES (?, ?, ?)",
+                [(job_id, position, url) for position, url in enumerate(chapter_urls)],
+            )
+            self._conn.commit()
+    
+    def has_chapters(self, job_id: str) -> bool:
+        return bool(self._query("SELECT 1 FROM chapters WHERE job_id = ? LIMIT 1", (job_id,)))
+    
+    def get_job(self, job_id: str) -> Optional[dict]:
+        rows = self._query(
+            "SELECT request, status, error, created_at, updated_at FROM jobs WHERE job_id = ?", (job_id,)
+        )
+        if not rows:
+            return None
+        request, status, error, created_at, updated_at = rows[0]
+        return {
+            "job_id": job_id,
+            "request": json.loads(request),
+            "status": status,
+            "error": error,
+            "created_at": created_at,
+            "updated_at": updated_at,
+        }
+    
+    def list_jobs(self) -> List[dict]:
+        rows = self._query("""
+            SELECT j.job_id, j.status, j.error, j.created_at, j.updated_at, COUNT(c.position),
+                   SUM(c.scrape_status = 'scraped'), SUM(c.tts_status = 'done'),
+                   (SELECT COUNT(*) FROM batches b WHERE b.job_id = j.job_id AND b.status = 'done')
+            FROM jobs j LEFT JOIN chapters c ON c.job_id = j.job_id
+            GROUP BY j.job_id ORDER BY j.created_at DESC
+        """)
+        return [{
+            "job_id": r[0],
+            "status": r[1],
+            "error": r[2],
+            "created_at": r[3],
+            "updated_at": r[4],
+            "chapters": r[5],
+            "scraped": r[6] or 0,
+            "synthesized": r[7] or 0,
+            "completed_batches": r[8],
+            "resumable": r[1] in RESUMABLE_STATUSES,
+        } for r in rows]
+    
+    def set_status(self, job_id: str, status: str, error: Optional[str] = None):
+        self._execute(
+            "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE job_id = ?",
+            (status, error, time.time(), job_id),
+        )
+    
+    def chapters(self, job_id: str) -> List[dict]:
+        rows = self._query("""
+            SELECT position, url, chapter_number, title, scrape_status, content_hash, text_file,
+                   tts_status, audio_file, batch_num
+            FROM chapters WHERE job_id = ? ORDER BY position
+        """, (job_id,))
+        keys = ("position", "url", "chapter_number", "title", "scrape_status", "content_hash", "text_file",
+                "tts_status", "audio_file", "batch_num")
+        return [dict(zip(keys, row)) for row in rows]
+    
+    def reset_unfinished_batches(self, job_id: str) -> int:
+        """Release chapters of batches that never finished combining; return the next batch number"""
+        with self._lock:
+            self._conn.execute("""
+                UPDATE chapters SET batch_num = NULL WHERE job_id = ? AND batch_num IN
+                (SELECT batch_num FROM batches WHERE job_id = ? AND status != 'done')
+            """, (job_id, job_id))
+            self._conn.execute("DELETE FROM batches WHERE job_id = ? AND status != 'done'", (job_id,))
+            self._conn.commit()
+            row = self._conn.execute("SELECT MAX(batch_num) FROM batches WHERE job_id = ?", (job_id,)).fetchone()
+        return (row[0] or 0) + 1
+    
+    def record_scrape(self, job_id: str, position: int, chapter_number: int, title: Optional[str], content: str):
+        """Keep the chapter text on disk and mark the position scraped"""
+        text_file = self.job_dir(job_id) / f"chapter_{position:05d}.txt"
+        tmp_file = text_file.with_suffix('.tmp')
+        tmp_file.write_text(content, encoding='utf-8')
+        os.replace(tmp_file, text_file)
+        self._execute("""
+            UPDATE chapters SET scrape_status = 'scraped', chapter_number = ?, title = ?, content_hash = ?, text_file = ?
+            WHERE job_id = ? AND position = ?
+        """, (chapter_number, title, content_digest(content), str(text_file), job_id, position))
+    
+    def record_scrape_status(self, job_id: str, position: int, status: str):
+        """Mark a position 'missing' (retried on resume) or 'duplicate' (skipped on resume)"""
+        self._execute(
+            "UPDATE chapters SET scrape_status = ? WHERE job_id = ? AND position = ?", (status, job_id, position)
+        )
+    
+    def load_text(self, chapter: dict) -> Optional[str]:
+        if chapter["scrape_status"] != 'scraped' or not chapter["text_file"]:
+            return None
+        try:
+            return Path(chapter["text_file"]).read_text(encoding='utf-8')
+        except OSError:
+            return None
+    
+    def record_audio(self, job_id: str, position: int, audio_file: Optional[Path]):
+        """Mark a position synthesized (audio_file) or failed (None, retried on resume)"""
+        self._execute(
+            "UPDATE chapters SET tts_status = ?, audio_file = ? WHERE job_id = ? AND position = ?",
+            ('done' if audio_file else 'failed', str(audio_file) if audio_file else None, job_id, position),
+        )
+    
+    def start_batch(self, job_id: str, batch_num: int, positions: List[int], combined_file: Path):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO batches VALUES (?, ?, ?, 'combining')", (job_id, batch_num, str(combined_file))
+            )
+            self._conn.executemany(
+                "UPDATE chapters SET batch_num = ? WHERE job_id = ? AND position = ?",
+                [(batch_num, job_id, position) for position in positions],
+            )
+            self._conn.commit()
+    
+    def finish_batch(self, job_id: str, batch_num: int):
+        self._execute(
+            "UPDATE batches SET status = 'done' WHERE job_id = ? AND batch_num = ?", (job_id, batch_num)
+        )
+    
+    def fail_batch(self, job_id: str, batch_num: int):
+        """Mark a batch whose combine step failed (its chapters are released again on resume)"""
+        self._execute(
+            "UPDATE batches SET status = 'failed' WHERE job_id = ? AND batch_num = ?", (job_id, batch_num)
+        )
+    
+    def failures(self, job_id: str) -> Dict[str, int]:
+        """Chapters whose TTS failed and batches that failed to combine in the last run"""
+        tts_failed = self._query(
+            "SELECT COUNT(*) FROM chapters WHERE job_id = ? AND tts_status = 'failed'", (job_id,)
+        )[0][0]
+        failed_batches = self._query(
+            "SELECT COUNT(*) FROM batches WHERE job_id = ? AND status = 'failed'", (job_id,)
+        )[0][0]
+        return {"tts_failed": tts_failed, "failed_batches": failed_batches}
+    
+    def remove_job_files(self, job_id: str):
+        """Drop a finished job's intermediate files (the journal rows stay)"""
+        shutil.rmtree(self.job_dir(job_id), ignore_errors=True)
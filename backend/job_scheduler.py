@@ -0,0 +1,143 @@
+"""
+Job scheduler - run several all-in-one jobs at once, by priority, without doubling up on a host
+"""
+
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+# Jobs running at the same time, overall and per host
+DEFAULT_MAX_CONCURRENT_JOBS = 2
+DEFAULT_MAX_JOBS_PER_HOST = 1
+
+# Statuses of a job that has left the scheduler
+FINISHED_STATUSES = ("completed", "stopped", "error")
+
+class JobState:
+    """Live progress and controls of one job (what the global processing_state used to hold)"""
+    
+    def __init__(self, job_id: str, request, host: str, priority: int = 0):
+        self.job_id = job_id
+        self.request = request
+        self.host = host
+        self.priority = priority
+        self.submitted_at = time.time()
+        self.status = "queued"  # queued, processing, paused, completed, stopped, error
+        self.current = 0
+        self.total = 0
+        self.current_chapter = None
+        self.completed_batches = 0
+        self.total_batches = 0
+        self.boilerplate_chars_saved = 0  # Characters not narrated because they were site boilerplate
+        self.duplicates = 0  # Chapters skipped because their text was the same as an earlier chapter's
+        self.error = None
+        self.lock = threading.Lock()
+        self.pause_event = threading.Event()
+        self.stop_event = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+    
+    def update(self, **fields):
+        with self.lock:
+            for name, value in fields.items():
+                setattr(self, name, value)
+    
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {
+                "job_id": self.job_id,
+                "status": self.status,
+                "priority": self.priority,
+                "host": self.host,
+                "current": self.current,
+                "total": self.total,
+                "current_chapter": self.current_chapter,
+                "completed_batches": self.completed_batches,
+                "total_batches": self.total_batches,
+                "boilerplate_chars_saved": self.boilerplate_chars_saved,
+                "duplicates": self.duplicates,
+                "error": self.error,
+            }
+
+class JobScheduler:
+    """Priority queue of jobs, each run in its own worker thread.
+    
+    Up to max_concurrent jobs run at once, and at most max_per_host of them on
+    the same site: a job whose host is busy waits while lower-priority jobs for
+    other hosts go ahead. Ties in priority run in submission order. Requests of
+    jobs sharing a host still go through the one per-host rate limiter.
+    """
+    
+    def __init__(self, run_job: Callable[[JobState], None],
+                 max_concurrent: int = DEFAULT_MAX_CONCURRENT_JOBS,
+                 max_per_host: int = DEFAULT_MAX_JOBS_PER_HOST):
+        self.run_job = run_job
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_per_host = max(1, max_per_host)
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, JobState] = {}
+        self._queue: List[JobState] = []
+        self._running: Dict[str, JobState] = {}
+        self.latest_job_id: Optional[str] = None
+    
+    def submit(self, state: JobState):
+        with self._lock:
+            self._jobs[state.job_id] = state
+            self._queue.append(state)
+            self.latest_job_id = state.job_id
+        self._dispatch()
+    
+    def get(self, job_id: Optional[str]) -> Optional[JobState]:
+        with self._lock:
+            return self._jobs.get(job_id) if job_id else None
+    
+    def is_active(self, job_id: str) -> bool:
+        state = self.get(job_id)
+        return state is not None and state.status not in FINISHED_STATUSES
+    
+    def jobs(self) -> List[JobState]:
+        with self._lock:
+            return list(self._jobs.values())
+    
+    def cancel(self, job_id: str) -> bool:
+        """Drop a job that has not started yet; returns False if it is not queued"""
+        with self._lock:
+            state = self._jobs.get(job_id)
+            if state is None or state not in self._queue:
+                return False
+            self._queue.remove(state)
+        state.update(status="stopped")
+        return True
+    
+    def queue_position(self, job_id: str) -> Optional[int]:
+        with self._lock:
+            ordered = sorted(self._queue, key=lambda s: (-s.priority, s.submitted_at))
+            for position, state in enumerate(ordered):
+                if state.job_id == job_id:
+                    return position
+        return None
+    
+    def _dispatch(self):
+        """Start queued jobs while there are free slots, highest priority first"""
+        with self._lock:
+            for state in sorted(self._queue, key=lambda s: (-s.priority, s.submitted_at)):
+                if len(self._running) >= self.max_concurrent:
+                    break
+                on_host = sum(1 for running in self._running.values() if running.host == state.host)
+                if on_host >= self.max_per_host:
+                    continue
+                self._queue.remove(state)
+                self._running[state.job_id] = state
+                state.update(status="processing")
+                state.thread = threading.Thread(target=self._run, args=(state,), daemon=True)
+                state.thread.start()
+    
+    def _run(self, state: JobState):
+        try:
+            self.run_job(state)
+        except Exception as e:
+            print(f"Job {state.job_id} failed: {e}")
+            state.update(status="error", error=str(e))
+        finally:
+            with self._lock:
+                self._running.pop(state.job_id, None)
+            self._dispatch()
@@ -2,26 +2,40 @@
 Backend API - TTS and Web Scraper
 """
 
-from fastapi import FastAPI, HTTPException, UploadFile, File
+from fastapi import FastAPI, HTTPException, Response, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import Optional, List
-import edge_tts
+from typing import Optional, List, AsyncIterator
 import asyncio
-import html
 import uuid
 from pathlib import Path
 import requests
-from bs4 import BeautifulSoup
 import cloudscraper
 import re
 import time
-import random
 import json
-import threading
+import os
 from typing import Dict
-from datetime import datetime
+from fetch_engine import fetch_in_order, host_limiter, host_of, DEFAULT_CONCURRENCY
+from tts_chunking import split_text_into_chunks, synthesize_chunks, stream_chunks, DEFAULT_CHUNK_CHARS, DEFAULT_CHUNK_CONCURRENCY
+from tts_cache import TTSCache
+from tts_backends import TTSBackend, EdgeBackend, LocalBackend, DEFAULT_TTS_BACKEND, DEFAULT_LOCAL_TTS_WORKERS
+from page_cache import PageCache, CachedSession, TOC_PAGE_TTL
+from session_pool import SessionPool, PooledScraper, DEFAULT_SESSIONS_PER_HOST
+from voice_catalog import VoiceCatalog
+from site_profiles import SiteProfileStore
+from extraction_pool import ExtractionPool, DEFAULT_EXTRACTION_WORKERS
+from url_templates import generate_chapter_urls, ChapterDeduper
+from toc_crawler import ChapterIndex, crawl_toc, toc_key
+from job_journal import JobJournal, RESUMABLE_STATUSES
+from mp3_concat import concat_mp3
+from range_file import RangeFileResponse
+from audio_library import AudioLibrary, DEFAULT_PAGE_SIZE
+import metrics
+from chapter_export import ScrapeSpool, write_chapter_batches, compression_unavailable_reason
+from boilerplate import BoilerplateIndex, boilerplate_scope_key, split_paragraphs, DEFAULT_BOILERPLATE_MIN_CHAPTERS, DEFAULT_BOILERPLATE_MIN_RATIO
+from job_scheduler import JobScheduler, JobState, DEFAULT_MAX_CONCURRENT_JOBS, DEFAULT_MAX_JOBS_PER_HOST
 
 app = FastAPI(title="Audiobook Creator API")
 
@@ -31,64 +45,266 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Audio-File", "X-Scrape-Id"],
 )
 
 # Output directory
 OUTPUT_DIR = Path("output")
 OUTPUT_DIR.mkdir(exist_ok=True)
 
+# Synthesized audio cache (size cap in MB, configurable via TTS_CACHE_MAX_MB)
+TTS_CACHE_MAX_MB = int(os.environ.get("TTS_CACHE_MAX_MB", "2048"))
+tts_cache = TTSCache(OUTPUT_DIR / "tts_cache", TTS_CACHE_MAX_MB * 1024 * 1024)
+
+# Scraped page cache (size cap in MB, configurable via PAGE_CACHE_MAX_MB)
+PAGE_CACHE_MAX_MB = int(os.environ.get("PAGE_CACHE_MAX_MB", "512"))
+page_cache = PageCache(OUTPUT_DIR / "page_cache.db", PAGE_CACHE_MAX_MB * 1024 * 1024)
+
+# TTS engines, selectable per request (default via TTS_BACKEND; local engine workers via LOCAL_TTS_WORKERS)
+TTS_BACKEND = os.environ.get("TTS_BACKEND", DEFAULT_TTS_BACKEND)
+LOCAL_TTS_WORKERS = int(os.environ.get("LOCAL_TTS_WORKERS", str(DEFAULT_LOCAL_TTS_WORKERS)))
+tts_backends: Dict[str, TTSBackend] = {
+    "edge": EdgeBackend(),
+    "local": LocalBackend(LOCAL_TTS_WORKERS),
+}
+
+def get_tts_backend(name: Optional[str] = None) -> TTSBackend:
+    """Backend by name (None = TTS_BACKEND); 400 if it is unknown or its dependencies are missing"""
+    name = name or TTS_BACKEND
+    backend = tts_backends.get(name)
+    if backend is None:
+        raise HTTPException(status_code=400, detail=f"Unknown TTS backend '{name}' (available: {', '.join(tts_backends)})")
+    reason = backend.unavailable_reason()
+    if reason:
+        raise HTTPException(status_code=400, detail=f"TTS backend '{name}' is not available: {reason}")
+    return backend
+
+# Edge voice list, cached in memory and in output/voices.json
+voice_catalog = VoiceCatalog(tts_backends["edge"].list_voices, OUTPUT_DIR / "voices.json")
+
+# Extraction selectors learned per site
+site_profiles = SiteProfileStore(OUTPUT_DIR / "site_profiles.json")
+
+# Process pool for HTML parsing/extraction (worker count configurable via EXTRACTION_WORKERS, 0 = inline)
+EXTRACTION_WORKERS = int(os.environ.get("EXTRACTION_WORKERS", str(DEFAULT_EXTRACTION_WORKERS)))
+extraction_pool = ExtractionPool(site_profiles, EXTRACTION_WORKERS)
+
+# Per-novel chapter index built from paginated TOCs
+chapter_index = ChapterIndex(OUTPUT_DIR / "chapter_index.db")
+
+# Paragraphs repeated across a novel's chapters (site watermarks, "read on ..." lines), stripped before TTS
+# once they appear in BOILERPLATE_MIN_CHAPTERS chapters and in BOILERPLATE_MIN_RATIO of the novel's chapters
+BOILERPLATE_MIN_CHAPTERS = int(os.environ.get("BOILERPLATE_MIN_CHAPTERS", str(DEFAULT_BOILERPLATE_MIN_CHAPTERS)))
+BOILERPLATE_MIN_RATIO = float(os.environ.get("BOILERPLATE_MIN_RATIO", str(DEFAULT_BOILERPLATE_MIN_RATIO)))
+boilerplate_index = BoilerplateIndex(OUTPUT_DIR / "boilerplate.db", BOILERPLATE_MIN_CHAPTERS, BOILERPLATE_MIN_RATIO)
+
+# Scrape results spooled to output/scrapes/ so they can be exported by id
+scrape_spool = ScrapeSpool(OUTPUT_DIR / "scrapes")
+
+def strip_boilerplate(chapter_url: str, content: str) -> tuple:
+    """(content without the novel's repeated boilerplate, characters removed); indexes the chapter
+    
+    Segments are the paragraphs of the chapter's page when it is still in the
+    page cache (it was just scraped, or scraped by an earlier run), else sentences.
+    """
+    cached = page_cache.lookup(chapter_url)
+    paragraphs = split_paragraphs(cached["body"], content) if cached else None
+    return boilerplate_index.strip(boilerplate_scope_key(chapter_url), chapter_url, content, paragraphs)
+
 class TTSRequest(BaseModel):
     text: str
     voice: str = "en-US-AndrewNeural"
-    rate: int = 0
-    pitch: int = 0
-    volume: int = 0
-
-def build_ssml(text: str, rate: int = 0, pitch: int = 0, volume: int = 0) -> str:
-    """Build SSML with voice controls"""
-    if rate == 0 and pitch == 0 and volume == 0:
-        return text
-    
-    prosody_attrs = []
-    if rate != 0:
-        prosody_attrs.append(f'rate="{rate:+.0f}%"')
-    if pitch != 0:
-        prosody_attrs.append(f'pitch="{pitch:+.0f}%"')
-    if volume != 0:
-        prosody_attrs.append(f'volume="{volume:+.0f}%"')
-    
-    escaped_text = html.escape(text)
-    ssml = f'<speak><prosody {" ".join(prosody_attrs)}>{escaped_text}</prosody></speak>'
-    return ssml
+    rate: int = 0  # Percent change in speaking rate
+    pitch: int = 0  # Percent change in pitch, like rate and volume (Edge gets it in Hz, see edge_pitch)
+    volume: int = 0  # Percent change in volume
+    chunk_concurrency: int = DEFAULT_CHUNK_CONCURRENCY  # Text chunks synthesized at the same time
+    use_cache: bool = True  # Reuse previously synthesized audio for identical text/voice settings
+    stream: bool = False  # Send MP3 data as it is synthesized instead of after the whole file is done
+    save_copy: bool = False  # In stream mode, also write the audio to OUTPUT_DIR
+    backend: Optional[str] = None  # TTS engine ("edge" or "local"), default TTS_BACKEND
+
+async def stream_chunk(text: str, voice: str, rate: int = 0, pitch: int = 0, volume: int = 0,
+                       backend: Optional[TTSBackend] = None) -> AsyncIterator[bytes]:
+    """Synthesize one chunk of text with the given backend (default TTS_BACKEND), yielding MP3 data as it arrives"""
+    backend = backend or get_tts_backend()
+    started = time.perf_counter()
+    try:
+        async for data in backend.stream(text, voice, rate, pitch, volume):
+            yield data
+    except Exception:
+        metrics.TTS_CHUNK_ERRORS.inc(backend=backend.name, voice=voice)
+        raise
+    metrics.TTS_CHUNK_SECONDS.observe(time.perf_counter() - started, backend=backend.name, voice=voice)
+
+async def synthesize_chunk(text: str, voice: str, rate: int = 0, pitch: int = 0, volume: int = 0,
+                           backend: Optional[TTSBackend] = None) -> bytes:
+    """Synthesize one chunk of text and return the MP3 bytes"""
+    audio = bytearray()
+    async for data in stream_chunk(text, voice, rate, pitch, volume, backend):
+        audio.extend(data)
+    return bytes(audio)
+
+async def cached_stream_chunk(text: str, voice: str, rate: int = 0, pitch: int = 0, volume: int = 0,
+                              backend: Optional[TTSBackend] = None) -> AsyncIterator[bytes]:
+    """stream_chunk() behind the TTS cache (a completed stream is stored)"""
+    backend = backend or get_tts_backend()
+    key = TTSCache.make_key(text, voice, rate, pitch, volume, backend.name)
+    audio = await asyncio.to_thread(tts_cache.get, key)
+    metrics.TTS_CACHE_LOOKUPS.inc(voice=voice, result="hit" if audio is not None else "miss")
+    if audio is not None:
+        yield audio
+        return
+    
+    parts = []
+    async for data in stream_chunk(text, voice, rate, pitch, volume, backend):
+        parts.append(data)
+        yield data
+    await asyncio.to_thread(tts_cache.put, key, b''.join(parts))
+
+async def cached_synthesize_chunk(text: str, voice: str, rate: int = 0, pitch: int = 0, volume: int = 0,
+                                  backend: Optional[TTSBackend] = None) -> bytes:
+    """synthesize_chunk() behind the content-addressed TTS cache"""
+    backend = backend or get_tts_backend()
+    key = TTSCache.make_key(text, voice, rate, pitch, volume, backend.name)
+    audio = await asyncio.to_thread(tts_cache.get, key)
+    metrics.TTS_CACHE_LOOKUPS.inc(voice=voice, result="hit" if audio is not None else "miss")
+    if audio is not None:
+        return audio
+    
+    audio = await synthesize_chunk(text, voice, rate, pitch, volume, backend)
+    if audio:
+        await asyncio.to_thread(tts_cache.put, key, audio)
+    return audio
+
+async def synthesize_text(text: str, voice: str, rate: int = 0, pitch: int = 0, volume: int = 0,
+                          concurrency: int = DEFAULT_CHUNK_CONCURRENCY, max_chars: int = DEFAULT_CHUNK_CHARS,
+                          use_cache: bool = True, backend: Optional[TTSBackend] = None) -> bytes:
+    """Synthesize text of any length: chunk at sentence/paragraph boundaries, synthesize in parallel, stitch in order"""
+    backend = backend or get_tts_backend()
+    chunks = split_text_into_chunks(text, max_chars)
+    synthesize = cached_synthesize_chunk if use_cache else synthesize_chunk
+    try:
+        with metrics.TTS_SECONDS.time(voice=voice):
+            audio_parts = await synthesize_chunks(
+                chunks,
+                lambda chunk: synthesize(chunk, voice, rate, pitch, volume, backend),
+                concurrency=concurrency,
+            )
+    except Exception:
+        metrics.TTS_FAILURES.inc(voice=voice)
+        raise
+    # Backends return headerless MP3 frames, so the parts can be joined directly
+    audio = b''.join(audio_parts)
+    metrics.TTS_CHARACTERS.inc(len(text), voice=voice)
+    metrics.TTS_AUDIO_BYTES.inc(len(audio), voice=voice)
+    return audio
 
 @app.get("/")
 async def root():
     return {"message": "TTS API", "status": "running"}
 
 @app.get("/api/voices")
-async def get_voices(locale: Optional[str] = None):
-    """Get list of available voices"""
+async def get_voices(locale: Optional[str] = None, backend: Optional[str] = None):
+    """Get list of available voices (of the given TTS backend)"""
+    tts_backend = get_tts_backend(backend)
     try:
-        voices = await edge_tts.list_voices()
-        if locale:
-            # If "en-US", "en-GB", or "en", include all English voices
-            if locale == "en-US" or locale == "en-GB" or locale == "en":
-                voices = [v for v in voices if v["Locale"].startswith("en-")]
-            else:
-                voices = [v for v in voices if v["Locale"] == locale]
+        if tts_backend.name != "edge":
+            voices = await tts_backend.list_voices()
+            if locale:
+                voices = [voice for voice in voices if voice["Locale"].lower().startswith(locale.split('-', 1)[0].lower())]
+            return {"voices": voices}
+        # If "en-US", "en-GB", or "en", includes all English voices
+        voices = await voice_catalog.get_voices(locale)
         return {"voices": voices}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/tts-backends")
+async def get_tts_backends():
+    """TTS backends, whether each can be used here and the default"""
+    return {
+        "default": TTS_BACKEND,
+        "backends": [{"name": name, "available": backend.unavailable_reason() is None, "reason": backend.unavailable_reason()}
+                     for name, backend in tts_backends.items()]
+    }
+
+async def stream_text(text: str, voice: str, rate: int = 0, pitch: int = 0, volume: int = 0,
+                      concurrency: int = DEFAULT_CHUNK_CONCURRENCY, max_chars: int = DEFAULT_CHUNK_CHARS,
+                      use_cache: bool = True, backend: Optional[TTSBackend] = None) -> AsyncIterator[bytes]:
+    """Like synthesize_text(), but yields MP3 data in order as soon as it is available"""
+    backend = backend or get_tts_backend()
+    chunks = split_text_into_chunks(text, max_chars)
+    stream = cached_stream_chunk if use_cache else stream_chunk
+    synthesize = cached_synthesize_chunk if use_cache else synthesize_chunk
+    started = time.perf_counter()
+    try:
+        async for data in stream_chunks(
+            chunks,
+            lambda chunk: stream(chunk, voice, rate, pitch, volume, backend),
+            lambda chunk: synthesize(chunk, voice, rate, pitch, volume, backend),
+            concurrency=concurrency,
+        ):
+            metrics.TTS_AUDIO_BYTES.inc(len(data), voice=voice)
+            yield data
+    except Exception:
+        metrics.TTS_FAILURES.inc(voice=voice)
+        raise
+    metrics.TTS_SECONDS.observe(time.perf_counter() - started, voice=voice)
+    metrics.TTS_CHARACTERS.inc(len(text), voice=voice)
+
+async def stream_audio_response(request: TTSRequest) -> StreamingResponse:
+    """Stream synthesized MP3 to the client, optionally teeing a copy to OUTPUT_DIR"""
+    audio_stream = stream_text(request.text, request.voice, request.rate, request.pitch, request.volume,
+                               concurrency=request.chunk_concurrency, use_cache=request.use_cache,
+                               backend=get_tts_backend(request.backend))
+    # Pull the first piece before answering so synthesis errors still become a 500
+    try:
+        first = await audio_stream.__anext__()
+    except StopAsyncIteration:
+        first = b''
+    
+    output_file = OUTPUT_DIR / f"{uuid.uuid4()}.mp3" if request.save_copy else None
+    
+    async def body():
+        partial_file = output_file.with_suffix('.part') if output_file else None
+        copy = open(partial_file, 'wb') if partial_file else None
+        completed = False
+        try:
+            if first:
+                if copy:
+                    copy.write(first)
+                yield first
+            async for data in audio_stream:
+                if copy:
+                    copy.write(data)
+                yield data
+            completed = True
+        finally:
+            await audio_stream.aclose()
+            if copy:
+                copy.close()
+                # Only keep the copy if the whole text was synthesized
+                if completed:
+                    os.replace(partial_file, output_file)
+                else:
+                    partial_file.unlink(missing_ok=True)
+    
+    headers = {"X-Audio-File": output_file.name} if output_file else None
+    return StreamingResponse(body(), media_type="audio/mpeg", headers=headers)
+
 @app.post("/api/generate")
 async def generate_audio(request: TTSRequest):
     """Generate audio from text"""
+    backend = get_tts_backend(request.backend)
     try:
+        if request.stream:
+            return await stream_audio_response(request)
+        
         output_file = OUTPUT_DIR / f"{uuid.uuid4()}.mp3"
         
-        ssml_text = build_ssml(request.text, request.rate, request.pitch, request.volume)
-        communicate = edge_tts.Communicate(text=ssml_text, voice=request.voice)
-        await communicate.save(str(output_file))
+        audio = await synthesize_text(request.text, request.voice, request.rate, request.pitch, request.volume,
+                                      concurrency=request.chunk_concurrency, use_cache=request.use_cache, backend=backend)
+        output_file.write_bytes(audio)
         
         return FileResponse(
             path=str(output_file),
@@ -98,6 +314,42 @@ async def generate_audio(request: TTSRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/page-cache")
+async def get_page_cache_stats():
+    """Scraped page cache counters and disk usage"""
+    return page_cache.stats()
+
+@app.get("/api/throttle")
+async def get_throttle():
+    """Current adaptive request rate per host"""
+    return {"hosts": [host_limiter.status(host) for host in host_limiter.hosts()]}
+
+@app.get("/api/boilerplate")
+async def get_boilerplate_stats(novel: Optional[str] = None):
+    """Boilerplate index per novel: chapters indexed, characters stripped, most repeated segments"""
+    return {"novels": await asyncio.to_thread(boilerplate_index.stats, novel)}
+
+@app.get("/api/session-pool")
+async def get_session_pool_stats():
+    """Pooled scraper sessions per host (idle, in use, created, rotated after a block)"""
+    return session_pool.stats()
+
+@app.get("/api/site-profiles")
+async def get_site_profiles():
+    """Learned extraction profiles and fast-path counters"""
+    return {"profiles": site_profiles.profiles, **site_profiles.stats()}
+
+@app.get("/api/tts-cache")
+async def get_tts_cache_stats():
+    """TTS cache hit/miss counters and disk usage"""
+    return tts_cache.stats()
+
+@app.delete("/api/tts-cache")
+async def clear_tts_cache():
+    """Empty the TTS cache"""
+    await asyncio.to_thread(tts_cache.clear)
+    return {"message": "TTS cache cleared", **tts_cache.stats()}
+
 # Scraper endpoints
 class ScrapeRequest(BaseModel):
     url: str
@@ -108,6 +360,8 @@ class ScrapeRequest(BaseModel):
     num_chapters: Optional[int] = None
     batch_size: Optional[int] = 10
     chapter_urls: Optional[List[str]] = None  # For importing URLs
+    concurrency: Optional[int] = DEFAULT_CONCURRENCY  # Parallel chapter fetches (politeness is enforced per host)
+    strip_boilerplate: bool = False  # Remove paragraphs repeated across the novel's chapters (off: text as scraped)
 
 class ChapterResult(BaseModel):
     chapter_number: int
@@ -115,391 +369,330 @@ class ChapterResult(BaseModel):
     content: str
     url: str
 
-def clean_text(text: str) -> str:
-    """Clean and format the scraped text (replica of original scraper)"""
-    if not text:
-        return ""
-    
-    # Remove extra whitespace
-    text = re.sub(r'\s+', ' ', text)
-    
-    # Remove common webnovel site elements
-    text = re.sub(r'Chapter \d+', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'Next Chapter|Previous Chapter|Table of Contents|Advertisement', '', text, flags=re.IGNORECASE)
-    text = re.sub(r'Please enable JavaScript', '', text, flags=re.IGNORECASE)
-    
-    # Remove URLs
-    text = re.sub(r'http\S+', '', text)
-    
-    # Remove email addresses
-    text = re.sub(r'\S+@\S+', '', text)
-    
-    # Clean up multiple newlines
-    text = re.sub(r'\n\s*\n\s*\n+', '\n\n', text)
-    
-    # Remove HTML entities
-    text = text.replace('&nbsp;', ' ')
-    text = text.replace('&quot;', '"')
-    text = text.replace('&amp;', '&')
-    
-    # Strip and return
-    return text.strip()
+# Long-lived cloudscraper sessions per host, shared by every endpoint and job (SESSIONS_PER_HOST per host)
+SESSIONS_PER_HOST = int(os.environ.get("SESSIONS_PER_HOST", str(DEFAULT_SESSIONS_PER_HOST)))
+session_pool = SessionPool(cloudscraper.create_scraper, SESSIONS_PER_HOST)
+
+# GETs go through the page cache, then through a pooled session for the URL's host
+# and report each response to the adaptive per-host rate limiter
+shared_scraper = CachedSession(PooledScraper(session_pool, host_limiter), page_cache)
 
-def get_novel_title(soup: BeautifulSoup, url: str) -> Optional[str]:
-    """Extract novel title from the page"""
+def fetch_chapter_page(scraper, chapter_url: str, host: str):
+    """GET a chapter page, recording latency, status and bytes; returns None on network errors"""
+    started = time.perf_counter()
     try:
-        # Method 1: Look for title in meta tags
-        title_tag = soup.find('meta', property='og:title')
-        if title_tag and title_tag.get('content'):
-            title = title_tag.get('content')
-            title = re.sub(r'\s*-\s*NovelBin.*$', '', title, flags=re.I)
-            title = re.sub(r'\s*-\s*Read.*$', '', title, flags=re.I)
-            if title:
-                return title.strip()
-        
-        # Method 2: Look for h1 with novel title
-        h1 = soup.find('h1')
-        if h1:
-            title = h1.get_text(strip=True)
-            if title and len(title) < 200:
-                return title
-        
-        # Method 3: Extract from URL
-        match = re.search(r'/b/([^/]+)', url)
-        if match:
-            title = match.group(1).replace('-', ' ').title()
-            return title
-        
-        # Method 4: Page title tag
-        title_tag = soup.find('title')
-        if title_tag:
-            title = title_tag.get_text(strip=True)
-            title = re.sub(r'\s*-\s*NovelBin.*$', '', title, flags=re.I)
-            title = re.sub(r'\s*-\s*Read.*$', '', title, flags=re.I)
-            if title:
-                return title.strip()
-        
+        # Only cached once extraction accepts the page (see scrape_single_chapter_url)
+        response = scraper.get(chapter_url, timeout=20, allow_redirects=True, store=False)
+    except requests.exceptions.Timeout:
+        metrics.SCRAPE_RESPONSES.inc(host=host, status="timeout")
         return None
-    except:
+    except requests.exceptions.RequestException:
+        metrics.SCRAPE_RESPONSES.inc(host=host, status="connection_error")
         return None
+    finally:
+        metrics.SCRAPE_FETCH_SECONDS.observe(time.perf_counter() - started, host=host)
+    metrics.SCRAPE_RESPONSES.inc(host=host, status=str(response.status_code))
+    metrics.SCRAPE_BYTES.inc(len(response.content), host=host)
+    return response
 
-def extract_chapter_title(soup: BeautifulSoup, novel_title: Optional[str] = None) -> Optional[str]:
-    """Extract chapter title from soup object (replica of original)"""
-    chapter_title = None
-    
-    # Try various selectors for chapter title
-    title_selectors = [
-        'h1.chapter-title', 'h1#chapter-title', 'h2.chapter-title',
-        'div.chapter-title h1', 'div.chapter-title h2',
-        'h1.chr-title', 'h1#chr-title',
-        'h2.chapter-heading', 'div.chapter-heading',
-        'div.chr-title h1', 'div.chr-title h2',
-        'div.chapter-header h1', 'div.chapter-header h2',
-    ]
-    
-    for selector in title_selectors:
-        title_elem = soup.select_one(selector)
-        if title_elem:
-            title_text = title_elem.get_text(strip=True)
-            if title_text and len(title_text) < 200:
-                if novel_title and title_text.lower() == novel_title.lower():
-                    continue
-                if not re.search(r'novelbin|read online|table of contents|home|novel$|^novel\s', title_text, re.I):
-                    title_text = re.sub(r'^Chapter\s+\d+[:\s]+', '', title_text, flags=re.I)
-                    if title_text and len(title_text) > 2:
-                        chapter_title = title_text
-                        break
+def scrape_single_chapter_url(chapter_url: str, scraper, delay: bool = True) -> tuple[Optional[str], Optional[str]]:
+    """Scrape a single chapter from URL (replica of original)
     
-    # If still no title, look for h1/h2 within content area
-    if not chapter_title:
-        content_area = soup.select_one('div.chapter-content, div#chapter-content, div.chapter-body, div#chapter-body, div#chr-content, div.chr-c, article, div.read-content')
-        if content_area:
-            for heading in content_area.find_all(['h1', 'h2', 'h3'], limit=3):
-                title_text = heading.get_text(strip=True)
-                if title_text and len(title_text) < 200 and len(title_text) > 2:
-                    if novel_title and title_text.lower() == novel_title.lower():
-                        continue
-                    if re.search(r'chapter|episode|part', title_text, re.I) or len(title_text) < 100:
-                        title_text = re.sub(r'^Chapter\s+\d+[:\s]+', '', title_text, flags=re.I)
-                        if title_text:
-                            chapter_title = title_text
-                            break
-    
-    # If still no title, try all h1/h2 but exclude novel title
-    if not chapter_title:
-        for heading in soup.find_all(['h1', 'h2'], limit=5):
-            title_text = heading.get_text(strip=True)
-            if title_text and len(title_text) < 200 and len(title_text) > 2:
-                if novel_title and title_text.lower() == novel_title.lower():
-                    continue
-                if not re.search(r'novelbin|read online|table of contents|home|menu|navigation|^novel\s', title_text, re.I):
-                    if re.search(r'chapter\s+\d+|episode\s+\d+', title_text, re.I) or \
-                       (heading.find_parent(['div', 'article'], class_=re.compile('content|chapter|read', re.I))):
-                        title_text = re.sub(r'^Chapter\s+\d+[:\s]+', '', title_text, flags=re.I)
-                        if title_text:
-                            chapter_title = title_text
-                            break
-    
-    return chapter_title
-
-def extract_chapter_content(soup: BeautifulSoup, url: str) -> tuple[str, Optional[str]]:
-    """Extract chapter content and title from soup object (replica of original)"""
-    novel_title = get_novel_title(soup, url)
-    chapter_title = extract_chapter_title(soup, novel_title)
-    
-    # Try to extract from URL if no title found
-    if not chapter_title:
-        match = re.search(r'chapter[_-]\d+[_-](.+)', url, re.I)
-        if match:
-            title_from_url = match.group(1).replace('-', ' ').title()
-            if len(title_from_url) > 3 and not re.match(r'^\d+$', title_from_url):
-                chapter_title = title_from_url
-    
-    # Content selectors (prioritize specific ones)
-    content_selectors = [
-        'div.chapter-content', 'div#chapter-content', 'div.chapter-body',
-        'div#chapter-body', 'div.content', 'div#content', 'div.text-content',
-        'article', 'div.read-content', 'div.chapter-text',
-        'div#chr-content', 'div.chr-c', 'div#chaptercontent'
-    ]
-    
-    content = None
-    for selector in content_selectors:
-        content = soup.select_one(selector)
-        if content:
-            break
-    
-    if not content:
-        content = soup.find('div', class_=re.compile('content|chapter|text', re.I))
-    
-    if not content:
-        content = soup.find('body')
-    
-    if content:
-        # For novelbin.com, try specific selectors
-        novelbin_content = soup.select_one('div#chr-content, div.chr-c, div#chaptercontent, div.chapter-content')
-        if novelbin_content:
-            content = novelbin_content
-        
-        paragraphs = content.find_all(['p', 'div'])
-        text_parts = []
-        
-        for p in paragraphs:
-            text = p.get_text(strip=True)
-            if text and len(text) > 20:
-                if not re.search(r'previous|next|chapter|table of contents|advertisement', text, re.I):
-                    text_parts.append(text)
-        
-        # If no paragraphs found, try getting all text
-        if not text_parts:
-            text = content.get_text(separator='\n', strip=True)
-            if text and len(text) > 50:
-                lines = [line.strip() for line in text.split('\n') if line.strip() and len(line.strip()) > 20]
-                text_parts = lines
-        
-        full_text = '\n\n'.join(text_parts)
-        cleaned_content = clean_text(full_text)
-        return cleaned_content, chapter_title
-    
-    return "", chapter_title
-
-def scrape_single_chapter_url(chapter_url: str, scraper) -> tuple[Optional[str], Optional[str]]:
-    """Scrape a single chapter from URL (replica of original)"""
+    With delay=False the caller is responsible for politeness (see fetch_engine).
+    """
+    host = host_of(chapter_url)
     try:
-        # Add random delay to be more human-like
-        time.sleep(random.uniform(1.5, 3.0))
+        # Wait for the host's current pace (adapts to how the site responds)
+        if delay and not page_cache.is_fresh(chapter_url):
+            host_limiter.wait_blocking(host)
         
-        try:
-            response = scraper.get(chapter_url, timeout=20, allow_redirects=True)
-        except requests.exceptions.Timeout:
-            return None, None
-        except requests.exceptions.ConnectionError:
-            return None, None
-        except requests.exceptions.RequestException:
+        response = fetch_chapter_page(scraper, chapter_url, host)
+        if response is None:
+            metrics.SCRAPE_FAILURES.inc(host=host, reason="network")
             return None, None
         
         if response.status_code == 403:
-            # Try again with longer delay
-            time.sleep(random.uniform(3, 5))
-            scraper = cloudscraper.create_scraper()
-            try:
-                response = scraper.get(chapter_url, timeout=20, allow_redirects=True)
-            except Exception:
+            # Try again once the host's backed-off pace allows (the pool has retired the blocked session)
+            metrics.SCRAPE_RETRIES.inc(host=host, reason="403")
+            host_limiter.wait_blocking(host)
+            response = fetch_chapter_page(scraper, chapter_url, host)
+            if response is None:
+                metrics.SCRAPE_FAILURES.inc(host=host, reason="network")
                 return None, None
         
         if response.status_code != 200:
+            metrics.SCRAPE_FAILURES.inc(host=host, reason=f"http_{response.status_code}")
             return None, None
         
-        soup = BeautifulSoup(response.content, 'html.parser')
-        content, chapter_title = extract_chapter_content(soup, chapter_url)
+        # Parsed in the extraction process pool: learned per-site selectors first, full cascade as fallback
+        content, chapter_title = extraction_pool.extract(response.content, chapter_url)
         
         if not content:
+            metrics.SCRAPE_FAILURES.inc(host=host, reason="no_content")
             return None, None
         
+        # A page with chapter text is worth keeping; challenge or interstitial pages (also 200) are not
+        scraper.store_response(chapter_url, response)
         return content, chapter_title
     
     except Exception:
+        metrics.SCRAPE_FAILURES.inc(host=host, reason="error")
         return None, None
 
-@app.post("/api/get-chapter-urls")
-async def get_chapter_urls(request: ScrapeRequest):
-    """Get list of chapter URLs from a webnovel (replica of original)"""
-    try:
-        scraper = cloudscraper.create_scraper()
-        start_url = request.start_url or request.url
-        base_url = request.base_url or (start_url.rsplit('/', 1)[0] if '/' in start_url else start_url)
-        
-        time.sleep(random.uniform(2, 4))
-        response = scraper.get(start_url, timeout=20, allow_redirects=True)
+CHAPTER_HREF = re.compile(rb'href=["\'][^"\']*chapter', re.I)
+
+def make_toc_fetcher(scraper, start_url: str, base_url: str):
+    """fetch_page callable for crawl_toc: cached for TOC_PAGE_TTL, polite, and retried once on 403"""
+    def fetch_page(url: str) -> Optional[bytes]:
+        if not page_cache.is_fresh(url):
+            host_limiter.wait_blocking(host_of(url))
+        response = scraper.get(url, timeout=20, allow_redirects=True, ttl=TOC_PAGE_TTL, store=False)
         
         if response.status_code == 403:
-            # Try accessing base URL first
+            # Try accessing base URL first (on a fresh session: the pool has retired the blocked one)
             try:
-                scraper.get(base_url, timeout=20)
-                time.sleep(random.uniform(2, 3))
-                scraper = cloudscraper.create_scraper()
-                response = scraper.get(start_url, timeout=20, allow_redirects=True)
+                scraper.get(base_url, timeout=20, cache=False)
+                host_limiter.wait_blocking(host_of(url))
+                response = scraper.get(url, timeout=20, allow_redirects=True, ttl=TOC_PAGE_TTL, store=False)
             except Exception:
                 pass
         
         if response.status_code != 200:
-            raise HTTPException(status_code=response.status_code, detail=f"Failed to fetch: HTTP {response.status_code}")
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
-        novel_title = get_novel_title(soup, start_url)
-        
-        chapter_links = []
-        seen_urls = set()
+            if url == start_url:
+                raise HTTPException(status_code=response.status_code, detail=f"Failed to fetch: HTTP {response.status_code}")
+            return None
+        # Only TOC pages that list chapters are cached (not challenge or interstitial pages)
+        if CHAPTER_HREF.search(response.content):
+            scraper.store_response(url, response, TOC_PAGE_TTL)
+        return response.content
+    
+    return fetch_page
+
+@app.post("/api/get-chapter-urls")
+def get_chapter_urls(request: ScrapeRequest):
+    """Get list of chapter URLs from a webnovel, following TOC pagination
+    
+    Chapters are kept in a per-novel index, so asking again only fetches the
+    TOC pages that can hold chapters released since the last crawl.
+    """
+    try:
+        start_url = request.start_url or request.url
+        base_url = request.base_url or (start_url.rsplit('/', 1)[0] if '/' in start_url else start_url)
         
-        # Find chapter links
-        links = soup.find_all('a', href=True)
-        for link in links:
-            href = link.get('href', '')
-            text = link.get_text(strip=True)
-            
-            is_chapter = False
-            if re.search(r'chapter|ch\.|episode', href, re.I) or \
-               re.search(r'chapter|ch\.|episode', text, re.I):
-                is_chapter = True
-            
-            if re.search(r'/chapter[_-]?\d+', href, re.I):
-                is_chapter = True
-            
-            if is_chapter:
-                if href.startswith('/'):
-                    full_url = base_url + href
-                elif href.startswith('http'):
-                    full_url = href
-                elif not href.startswith('#'):
-                    full_url = base_url + '/' + href.lstrip('/')
-                else:
-                    continue
-                
-                full_url = full_url.split('#')[0].split('?')[0]
-                if full_url not in seen_urls and 'chapter' in full_url.lower():
-                    seen_urls.add(full_url)
-                    chapter_links.append(full_url)
+        result = crawl_toc(make_toc_fetcher(shared_scraper, start_url, base_url), start_url, base_url, chapter_index)
+        chapter_links = [chapter["url"] for chapter in result["chapters"]]
         
         return {
-            "novel_title": novel_title,
+            "novel_title": result["novel_title"],
             "chapter_urls": chapter_links,
-            "count": len(chapter_links)
+            "count": len(chapter_links),
+            "chapters": result["chapters"],
+            "new_chapters": result["new_chapters"],
+            "pages_fetched": result["pages_fetched"]
         }
-        
+    
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting chapter URLs: {str(e)}")
 
+def resolve_scrape_urls(request: ScrapeRequest) -> List[str]:
+    """Work out which URLs a scrape request covers (imported list filtered by range, or probed/generated URLs)"""
+    # If chapter_urls provided, use them directly
+    if request.chapter_urls:
+        chapter_urls = request.chapter_urls
+        # Extract chapter numbers from URLs
+        def extract_chapter_num(url):
+            match = re.search(r'chapter[_-]?(\d+)', url, re.I)
+            return int(match.group(1)) if match else 9999
+        
+        # Sort by chapter number
+        chapter_urls_with_nums = [(extract_chapter_num(url), url) for url in chapter_urls]
+        chapter_urls_with_nums.sort(key=lambda x: x[0])
+        chapter_urls = [url for _, url in chapter_urls_with_nums]
+        
+        # Apply range filters if specified
+        if request.start_chapter or request.end_chapter or request.num_chapters:
+            filtered_urls = []
+            for url in chapter_urls:
+                ch_num = extract_chapter_num(url)
+                if ch_num == 9999:
+                    continue
+                
+                if request.start_chapter and ch_num < request.start_chapter:
+                    continue
+                if request.end_chapter and ch_num > request.end_chapter:
+                    continue
+                if request.num_chapters:
+                    if len(filtered_urls) >= request.num_chapters:
+                        break
+                
+                filtered_urls.append(url)
+            chapter_urls = filtered_urls
+    else:
+        # Generate URLs based on range (finds which URL pattern gives real chapter pages first;
+        # the probed pages land in the page cache, so the scrape itself doesn't fetch them again)
+        base_url = request.url.rsplit('/', 1)[0] if '/' in request.url else request.url
+        end_chapter = request.end_chapter or (request.start_chapter + (request.num_chapters or 10) - 1)
+        chapter_urls = generate_chapter_urls(lambda url: scrape_single_chapter_url(url, shared_scraper),
+                                             request.url, base_url, request.start_chapter, end_chapter)
+    
+    return chapter_urls
+
+def build_chapter_result(position: int, chapter_url: str, content: Optional[str], chapter_title: Optional[str],
+                         boilerplate_removed: int = 0, duplicate_of: Optional[str] = None) -> dict:
+    """Result dict for one scraped URL (position is 1-based, used when the URL has no chapter number)
+    
+    A URL whose text was already returned for another URL (duplicate_of) keeps
+    its entry, without the text, so there is still one result per URL.
+    """
+    chapter_num = position
+    match = re.search(r'chapter[_-]?(\d+)', chapter_url, re.I)
+    if match:
+        chapter_num = int(match.group(1))
+    
+    if duplicate_of:
+        return {
+            "chapter_number": chapter_num,
+            "title": f"Chapter {chapter_num} (Duplicate)",
+            "content": "",
+            "url": chapter_url,
+            "duplicate_of": duplicate_of,
+            "error": f"Same content as {duplicate_of}"
+        }
+    if content:
+        return {
+            "chapter_number": chapter_num,
+            "title": chapter_title or f"Chapter {chapter_num}",
+            "content": content,
+            "url": chapter_url,
+            "boilerplate_chars_removed": boilerplate_removed
+        }
+    return {
+        "chapter_number": chapter_num,
+        "title": f"Chapter {chapter_num} (Not Found)",
+        "content": "",
+        "url": chapter_url,
+        "error": "Could not extract content"
+    }
+
+def iter_scrape_results(request: ScrapeRequest, chapter_urls: List[str]) -> AsyncIterator:
+    """Fetch chapter_urls concurrently (rate-limited per host), yielding ((position, url), (content, title)) in order"""
+    return fetch_in_order(
+        list(enumerate(chapter_urls, 1)),
+        lambda item: scrape_single_chapter_url(item[1], shared_scraper, delay=False),
+        concurrency=request.concurrency or DEFAULT_CONCURRENCY,
+        url_of=lambda item: item[1],
+        skip_wait=lambda item: page_cache.is_fresh(item[1]),
+    )
+
 @app.post("/api/scrape", response_model=List[dict])
-async def scrape_chapters(request: ScrapeRequest):
-    """Scrape chapters from URLs (replica of original scraper logic)"""
+async def scrape_chapters(request: ScrapeRequest, response: Response):
+    """Scrape chapters from URLs (replica of original scraper logic)
+    
+    The results are also spooled; the X-Scrape-Id header is the id to pass to
+    /api/save-chapters-batch instead of the chapters themselves.
+    """
     try:
-        scraper = cloudscraper.create_scraper()
-        results = []
+        chapter_urls = await asyncio.to_thread(resolve_scrape_urls, request)
         
-        # If chapter_urls provided, use them directly
-        if request.chapter_urls:
-            chapter_urls = request.chapter_urls
-            # Extract chapter numbers from URLs
-            def extract_chapter_num(url):
-                match = re.search(r'chapter[_-]?(\d+)', url, re.I)
-                return int(match.group(1)) if match else 9999
-            
-            # Sort by chapter number
-            chapter_urls_with_nums = [(extract_chapter_num(url), url) for url in chapter_urls]
-            chapter_urls_with_nums.sort(key=lambda x: x[0])
-            chapter_urls = [url for _, url in chapter_urls_with_nums]
-            
-            # Apply range filters if specified
-            if request.start_chapter or request.end_chapter or request.num_chapters:
-                filtered_urls = []
-                for url in chapter_urls:
-                    ch_num = extract_chapter_num(url)
-                    if ch_num == 9999:
-                        continue
-                    
-                    if request.start_chapter and ch_num < request.start_chapter:
-                        continue
-                    if request.end_chapter and ch_num > request.end_chapter:
-                        continue
-                    if request.num_chapters:
-                        if len(filtered_urls) >= request.num_chapters:
-                            break
-                    
-                    filtered_urls.append(url)
-                chapter_urls = filtered_urls
-        else:
-            # Generate URLs based on range
-            base_url = request.url.rsplit('/', 1)[0] if '/' in request.url else request.url
-            end_chapter = request.end_chapter or (request.start_chapter + (request.num_chapters or 10) - 1)
-            
-            chapter_urls = []
-            for chapter_num in range(request.start_chapter, end_chapter + 1):
-                urls_to_try = [
-                    f"{request.url}/{chapter_num}",
-                    f"{request.url}-{chapter_num}",
-                    f"{request.url}-chapter-{chapter_num}",
-                    f"{request.url}/chapter-{chapter_num}",
-                    f"{base_url}/{chapter_num}",
-                    f"{base_url}/chapter-{chapter_num}",
-                ]
-                chapter_urls.extend(urls_to_try)
-        
-        # Scrape each chapter
-        for i, chapter_url in enumerate(chapter_urls, 1):
-            chapter_num = i
-            match = re.search(r'chapter[_-]?(\d+)', chapter_url, re.I)
-            if match:
-                chapter_num = int(match.group(1))
-            
-            content, chapter_title = scrape_single_chapter_url(chapter_url, scraper)
-            
-            if content:
-                results.append({
-                    "chapter_number": chapter_num,
-                    "title": chapter_title or f"Chapter {chapter_num}",
-                    "content": content,
-                    "url": chapter_url
-                })
-            else:
-                results.append({
-                    "chapter_number": chapter_num,
-                    "title": f"Chapter {chapter_num} (Not Found)",
-                    "content": "",
-                    "url": chapter_url,
-                    "error": "Could not extract content"
-                })
+        # Scrape chapters concurrently, results keep chapter order
+        results = []
+        deduper = ChapterDeduper()
+        spool = await asyncio.to_thread(scrape_spool.create)
+        try:
+            async for (position, chapter_url), (content, chapter_title) in iter_scrape_results(request, chapter_urls):
+                duplicate_of = deduper.duplicate_of(content, chapter_url)
+                removed = 0
+                if content and not duplicate_of and request.strip_boilerplate:
+                    content, removed = await asyncio.to_thread(strip_boilerplate, chapter_url, content)
+                result = build_chapter_result(position, chapter_url, content, chapter_title, removed, duplicate_of)
+                results.append(result)
+                spool.write(result)
+        except BaseException:
+            await asyncio.to_thread(spool.abort)
+            raise
+        await asyncio.to_thread(spool.close)
         
+        response.headers["X-Scrape-Id"] = spool.scrape_id
         return results
-        
+    
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Scraping error: {str(e)}")
 
+@app.post("/api/scrape-stream")
+async def scrape_chapters_stream(request: ScrapeRequest, format: str = "ndjson"):
+    """Scrape chapters, sending each result as soon as it is extracted
+    
+    format=ndjson sends one JSON object per line, format=sse sends Server-Sent
+    Events. Every chapter is a {"event": "chapter", "data": {...}} record (the
+    same dict /api/scrape returns), followed by one "summary" record. Results are
+    only fetched as fast as the client reads them, so memory stays flat. They are
+    also spooled under the summary's scrape_id for /api/save-chapters-batch.
+    """
+    if format not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'sse'")
+    
+    chapter_urls = await asyncio.to_thread(resolve_scrape_urls, request)
+    
+    def encode(event: str, data: dict) -> str:
+        if format == "sse":
+            return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+        return json.dumps({"event": event, "data": data}, ensure_ascii=False) + "\n"
+    
+    async def body():
+        started = time.time()
+        processed = 0
+        found = 0
+        characters = 0
+        duplicates = 0
+        boilerplate_removed = 0
+        error = None
+        deduper = ChapterDeduper()
+        spool = await asyncio.to_thread(scrape_spool.create)
+        finished = False
+        try:
+            async for (position, chapter_url), (content, chapter_title) in iter_scrape_results(request, chapter_urls):
+                duplicate_of = deduper.duplicate_of(content, chapter_url)
+                removed = 0
+                if content and not duplicate_of and request.strip_boilerplate:
+                    content, removed = await asyncio.to_thread(strip_boilerplate, chapter_url, content)
+                    boilerplate_removed += removed
+                result = build_chapter_result(position, chapter_url, content, chapter_title, removed, duplicate_of)
+                processed += 1
+                if duplicate_of:
+                    duplicates += 1
+                elif content:
+                    found += 1
+                    characters += len(content)
+                spool.write(result)
+                yield encode("chapter", result)
+            finished = True
+        except Exception as e:
+            error = f"Scraping error: {str(e)}"
+        finally:
+            # Only a scrape that ran to the end is published; a failed or abandoned one leaves no spool
+            await asyncio.to_thread(spool.close if finished else spool.abort)
+        
+        yield encode("summary", {
+            "scrape_id": spool.scrape_id if finished else None,
+            "total": len(chapter_urls),
+            "processed": processed,
+            "found": found,
+            "not_found": processed - found - duplicates,
+            "duplicates": duplicates,
+            "characters": characters,
+            "boilerplate_chars_removed": boilerplate_removed,
+            "elapsed_seconds": round(time.time() - started, 2),
+            "error": error,
+        })
+    
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(body(), media_type=media_type, headers={"Cache-Control": "no-cache"})
+
 @app.post("/api/scrape-single")
-async def scrape_single_chapter(request: ScrapeRequest):
+def scrape_single_chapter(request: ScrapeRequest):
     """Scrape a single chapter from URL"""
     try:
-        scraper = cloudscraper.create_scraper()
-        content, chapter_title = scrape_single_chapter_url(request.url, scraper)
+        content, chapter_title = scrape_single_chapter_url(request.url, shared_scraper)
         
         if not content:
             raise HTTPException(status_code=400, detail="Could not extract chapter content")
@@ -509,74 +702,76 @@ async def scrape_single_chapter(request: ScrapeRequest):
             "content": content,
             "url": request.url
         }
-        
+    
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+class SaveChaptersRequest(BaseModel):
+    chapters: Optional[List[dict]] = None  # Chapter dicts as /api/scrape returns them...
+    scrape_id: Optional[str] = None  # ...or the id of a finished scrape (X-Scrape-Id / stream summary)...
+    job_id: Optional[str] = None  # ...or an all-in-one job whose scraped text is still kept
+    batch_size: int = 10
+    output_folder: str = "scraped_chapters"
+    compression: str = "none"  # "none", "gzip" or "zstd" (needs the zstandard package)
+
+def job_export_chapters(job_id: str):
+    """Scraped chapters of a job, each text loaded from the journal only when it is written"""
+    for chapter in job_journal.chapters(job_id):
+        content = job_journal.load_text(chapter)
+        if content is not None:
+            yield {"chapter_number": chapter["chapter_number"], "title": chapter["title"], "content": content}
+
 @app.post("/api/save-chapters-batch")
-async def save_chapters_batch(chapters: List[dict], batch_size: int = 10, output_folder: str = "scraped_chapters"):
-    """Save chapters in batches (replica of original)"""
+async def save_chapters_batch(request: SaveChaptersRequest):
+    """Save chapters in batches of batch_size per text file
+    
+    The chapters come from the request, a spooled scrape or a job's journal;
+    the last two are streamed from disk, so nothing but the ids goes over the
+    wire and only one chapter is held in memory at a time.
+    """
+    sources = [source for source in (request.chapters, request.scrape_id, request.job_id) if source is not None]
+    if len(sources) != 1:
+        raise HTTPException(status_code=400, detail="Give exactly one of chapters, scrape_id or job_id")
+    reason = compression_unavailable_reason(request.compression)
+    if reason:
+        raise HTTPException(status_code=400, detail=reason)
+    
+    if request.scrape_id is not None:
+        if scrape_spool.path(request.scrape_id) is None:
+            raise HTTPException(status_code=404, detail="Scrape not found (spooled results are kept for a day)")
+        chapters = scrape_spool.iter_chapters(request.scrape_id)
+    elif request.job_id is not None:
+        if job_journal.get_job(request.job_id) is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        chapters = job_export_chapters(request.job_id)
+    else:
+        chapters = request.chapters
+    
     try:
-        output_path = Path(output_folder)
-        output_path.mkdir(exist_ok=True)
-        
-        saved_files = []
-        
-        for chunk_start in range(0, len(chapters), batch_size):
-            chunk_end = min(chunk_start + batch_size, len(chapters))
-            chunk = chapters[chunk_start:chunk_end]
-            
-            # Create filename for this chunk
-            filename = f"chapters_{chunk_start+1}_to_{chunk_end}.txt"
-            filepath = output_path / filename
-            
-            # Combine all chapters in this chunk
-            combined_text = []
-            for chapter in chunk:
-                combined_text.append(f"=== Chapter {chapter.get('chapter_number', chunk_start + chunk.index(chapter) + 1)} ===\n\n")
-                if chapter.get('title'):
-                    combined_text.append(f"{chapter['title']}\n\n")
-                combined_text.append(chapter.get('content', ''))
-                combined_text.append("\n\n")
-            
-            # Write to file
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(''.join(combined_text))
-            
-            saved_files.append({
-                "filename": filename,
-                "path": str(filepath),
-                "chapters_count": len(chunk),
-                "characters": len(''.join(combined_text))
-            })
-        
-        return {
-            "saved_files": saved_files,
-            "total_chapters": len(chapters),
-            "total_files": len(saved_files)
-        }
-        
+        saved_files = await asyncio.to_thread(write_chapter_batches, chapters, Path(request.output_folder),
+                                              request.batch_size, request.compression)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error saving chapters: {str(e)}")
-
-# All-in-One Processing State
-processing_state = {
-    "status": "idle",  # idle, processing, paused, completed, error
-    "current": 0,
-    "total": 0,
-    "current_chapter": None,
-    "completed_batches": 0,
-    "total_batches": 0,
-    "error": None,
-    "lock": threading.Lock(),
-    "pause_event": threading.Event(),
-    "stop_event": threading.Event(),
-    "thread": None
-}
+    
+    if not saved_files and request.job_id is not None:
+        raise HTTPException(status_code=404, detail="No scraped text left for this job (completed jobs drop it)")
+    
+    return {
+        "saved_files": saved_files,
+        "total_chapters": sum(file["chapters_count"] for file in saved_files),
+        "total_files": len(saved_files)
+    }
 
 AUDIO_OUTPUT_DIR = Path("output/audio")
 AUDIO_OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
+# Durable per-chapter checkpoints for all-in-one jobs (intermediate files under output/jobs/)
+job_journal = JobJournal(OUTPUT_DIR / "jobs.db", OUTPUT_DIR / "jobs")
+
+# Manifest of the combined audio files (reconciled with the directory once at startup)
+audio_library = AudioLibrary(OUTPUT_DIR / "audio_library.db", AUDIO_OUTPUT_DIR)
+audio_library.sync()
+
 class AllInOneRequest(BaseModel):
     base_url: Optional[str] = None
     start_url: str
@@ -585,22 +780,269 @@ class AllInOneRequest(BaseModel):
     num_chapters: Optional[int] = None
     batch_size: int = 10
     voice: str = "en-US-AndrewNeural"
-    rate: int = 0
-    pitch: int = 0
-    volume: int = 0
+    rate: int = 0  # Percent change in speaking rate
+    pitch: int = 0  # Percent change in pitch, like rate and volume (Edge gets it in Hz, see edge_pitch)
+    volume: int = 0  # Percent change in volume
+    scrape_concurrency: int = DEFAULT_CONCURRENCY  # Parallel chapter fetches
+    prefetch_chapters: int = 8  # How far the scrape stage may run ahead of TTS
+    tts_concurrency: int = 2  # Chapters synthesized at the same time
+    chunk_concurrency: int = DEFAULT_CHUNK_CONCURRENCY  # Text chunks synthesized at the same time per chapter
+    use_cache: bool = True  # Reuse previously synthesized audio for identical text/voice settings
+    tts_backend: Optional[str] = None  # TTS engine ("edge" or "local"), default TTS_BACKEND
+    strip_boilerplate: bool = True  # Don't narrate paragraphs repeated across the novel's chapters
+    resume_job_id: Optional[str] = None  # Continue an interrupted/stopped job (its saved settings are used)
+    priority: int = 0  # Higher-priority jobs start first when the scheduler is full
 
-def process_all_in_one_worker(request: AllInOneRequest):
-    """Worker thread to process chapters in batch"""
-    global processing_state
+def discover_chapter_urls(request: AllInOneRequest, scraper, base_url: str, total_chapters: int) -> List[str]:
+    """Find the chapter URLs for an all-in-one job (TOC links first, generated candidates as fallback)"""
+    start_url = request.start_url
     
+    # Try to get all chapter URLs from the (incrementally refreshed) chapter index
     try:
-        with processing_state["lock"]:
-            processing_state["status"] = "processing"
-            processing_state["error"] = None
-            processing_state["stop_event"].clear()
-            processing_state["pause_event"].clear()
+        result = crawl_toc(make_toc_fetcher(scraper, start_url, base_url), start_url, base_url, chapter_index)
+        chapters = [chapter for chapter in result["chapters"]
+                    if chapter["number"] is not None and chapter["number"] >= request.start_chapter]
         
-        scraper = cloudscraper.create_scraper()
+        if request.end_chapter:
+            chapters = [chapter for chapter in chapters if chapter["number"] <= request.end_chapter]
+        elif request.num_chapters:
+            chapters = chapters[:request.num_chapters]
+        chapter_urls = [chapter["url"] for chapter in chapters]
+    except Exception as e:
+        print(f"Error getting chapter URLs: {e}")
+        chapter_urls = []
+    
+    # If no URLs found, generate them (probing which URL pattern the site uses first)
+    if not chapter_urls:
+        chapter_urls = generate_chapter_urls(lambda url: scrape_single_chapter_url(url, scraper), start_url, base_url,
+                                             request.start_chapter,
+                                             request.start_chapter + total_chapters - 1)
+    
+    return chapter_urls
+
+def combine_batch(current_batch: List[dict], combined_audio: Path) -> dict:
+    """Combine the chapter MP3s of a batch into one file (written under a temporary name, then renamed)
+    
+    Frames are copied as they are (no decode/re-encode), see mp3_concat. The
+    file gets ID3 chapter markers with the chapter titles.
+    """
+    part_file = combined_audio.with_name(combined_audio.name + ".part")
+    try:
+        with metrics.COMBINE_SECONDS.time():
+            result = concat_mp3([item["audio_file"] for item in current_batch], part_file,
+                                chapter_titles=[item["title"] for item in current_batch],
+                                title=f"Chapters {current_batch[0]['chapter_number']}-{current_batch[-1]['chapter_number']}")
+    except Exception:
+        part_file.unlink(missing_ok=True)
+        raise
+    os.replace(part_file, combined_audio)
+    metrics.COMBINE_BYTES.inc(combined_audio.stat().st_size)
+    metrics.COMBINE_FRAMES.inc(result["frames"])
+    return result
+
+def novel_name(start_url: str) -> str:
+    """Novel title from the chapter index, or a readable form of the URL's last path segment"""
+    novel = chapter_index.get_novel(toc_key(start_url))
+    if novel and novel["title"]:
+        return novel["title"]
+    slug = start_url.split('#')[0].rstrip('/').rsplit('/', 1)[-1]
+    return slug.replace('-', ' ').replace('_', ' ').title()
+
+class PipelineStopped(Exception):
+    """Raised inside the all-in-one pipeline when the stop event is set"""
+
+async def wait_if_paused(state: JobState):
+    """Block the calling pipeline stage while the job is paused; raise PipelineStopped on stop"""
+    while state.pause_event.is_set() and not state.stop_event.is_set():
+        await asyncio.sleep(0.5)
+    if state.stop_event.is_set():
+        raise PipelineStopped()
+
+async def run_all_in_one_pipeline(request: AllInOneRequest, state: JobState, scraper):
+    """Scrape -> TTS -> combine, as three overlapping stages joined by bounded queues
+    
+    The scrape stage prefetches up to `prefetch_chapters` chapters ahead, the TTS
+    stage synthesizes up to `tts_concurrency` chapters at once and the combine
+    stage encodes finished batches in a thread, so network waits for scraping,
+    synthesis and batch encoding all overlap. Chapter order is preserved because
+    the TTS queue carries one task per chapter in scrape order.
+    
+    Every step is checkpointed in the job journal: chapters in finished batches
+    are skipped, and scraped text or synthesized audio from an earlier run is
+    reused instead of fetched or synthesized again.
+    """
+    job_id = state.job_id
+    backend = get_tts_backend(request.tts_backend)
+    next_batch_num = job_journal.reset_unfinished_batches(job_id)
+    chapters = job_journal.chapters(job_id)
+    pending = [chapter for chapter in chapters if chapter["batch_num"] is None and chapter["scrape_status"] != "duplicate"]
+    job_dir = job_journal.job_dir(job_id)
+    job_dir.mkdir(parents=True, exist_ok=True)
+    novel = novel_name(request.start_url)
+    
+    state.update(completed_batches=next_batch_num - 1,
+                 duplicates=sum(1 for chapter in chapters if chapter["scrape_status"] == "duplicate"))
+    
+    tts_semaphore = asyncio.Semaphore(max(1, request.tts_concurrency))
+    tts_queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, request.tts_concurrency) * 2)
+    combine_queue: asyncio.Queue = asyncio.Queue(maxsize=2)
+    
+    async def synthesize(chapter: dict, chapter_num: int, chapter_title: Optional[str], content: str) -> Optional[dict]:
+        item = {
+            "position": chapter["position"],
+            "chapter_number": chapter_num,
+            "title": chapter_title or f"Chapter {chapter_num}",
+            "audio_file": job_dir / f"chapter_{chapter['position']:05d}.mp3"
+        }
+        if chapter["tts_status"] == "done" and item["audio_file"].exists():
+            return item
+        
+        async with tts_semaphore:
+            await wait_if_paused(state)
+            try:
+                audio = await synthesize_text(content, request.voice, request.rate, request.pitch, request.volume,
+                                              concurrency=request.chunk_concurrency, use_cache=request.use_cache,
+                                              backend=backend)
+                await asyncio.to_thread(item["audio_file"].write_bytes, audio)
+                await asyncio.to_thread(job_journal.record_audio, job_id, chapter["position"], item["audio_file"])
+                return item
+            except Exception as e:
+                print(f"Error generating audio for chapter {chapter_num}: {e}")
+                await asyncio.to_thread(job_journal.record_audio, job_id, chapter["position"], None)
+                return None
+    
+    def load_or_scrape(chapter: dict) -> tuple:
+        """(content, title, from_journal): text saved by an earlier run, or a fresh scrape"""
+        content = job_journal.load_text(chapter)
+        if content is not None:
+            return content, chapter["title"], True
+        content, chapter_title = scrape_single_chapter_url(chapter["url"], scraper, delay=False)
+        return content, chapter_title, False
+    
+    async def scrape_stage():
+        # Chapters kept by an earlier run count as seen, so their duplicates are still skipped
+        deduper = ChapterDeduper((chapter["content_hash"], chapter["url"]) for chapter in chapters
+                                 if chapter["content_hash"])
+        async for chapter, (content, chapter_title, from_journal) in fetch_in_order(
+            pending,
+            load_or_scrape,
+            concurrency=request.scrape_concurrency,
+            url_of=lambda chapter: chapter["url"],
+            lookahead=request.prefetch_chapters,
+            skip_wait=lambda chapter: chapter["scrape_status"] == "scraped" or page_cache.is_fresh(chapter["url"]),
+        ):
+            await wait_if_paused(state)
+            position = chapter["position"]
+            
+            if not content:
+                await asyncio.to_thread(job_journal.record_scrape_status, job_id, position, "missing")
+                continue
+            
+            if from_journal:
+                chapter_num = chapter["chapter_number"]
+            else:
+                duplicate_of = deduper.duplicate_of(content, chapter["url"])
+                if duplicate_of:
+                    # Not narrated twice; the journal keeps the chapter marked, and the job counts it
+                    print(f"Chapter {chapter['url']} has the same content as {duplicate_of}, skipping it")
+                    await asyncio.to_thread(job_journal.record_scrape_status, job_id, position, "duplicate")
+                    state.update(duplicates=state.duplicates + 1)
+                    continue
+                
+                chapter_num = position + request.start_chapter
+                match = re.search(r'chapter[_-]?(\d+)', chapter["url"], re.I)
+                if match:
+                    chapter_num = int(match.group(1))
+                await asyncio.to_thread(job_journal.record_scrape, job_id, position, chapter_num, chapter_title, content)
+            
+            state.update(current=position + 1, current_chapter={
+                "chapter_number": chapter_num,
+                "title": chapter_title or f"Chapter {chapter_num}",
+                "url": chapter["url"]
+            })
+            
+            # The journal keeps the text as scraped; only what gets narrated is stripped
+            if request.strip_boilerplate:
+                content, removed = await asyncio.to_thread(strip_boilerplate, chapter["url"], content)
+                if removed:
+                    state.update(boilerplate_chars_saved=state.boilerplate_chars_saved + removed)
+            
+            # Bounded queue: scraping stalls here once it is far enough ahead of TTS
+            await tts_queue.put(asyncio.ensure_future(synthesize(chapter, chapter_num, chapter_title, content)))
+        
+        await tts_queue.put(None)
+    
+    async def batch_stage():
+        current_batch = []
+        while True:
+            task = await tts_queue.get()
+            if task is None:
+                break
+            item = await task
+            if item is None:
+                continue
+            
+            current_batch.append(item)
+            if len(current_batch) >= request.batch_size:
+                await combine_queue.put(current_batch)
+                current_batch = []
+        
+        if current_batch:
+            await combine_queue.put(current_batch)
+        await combine_queue.put(None)
+    
+    async def combine_stage():
+        batch_num = next_batch_num - 1
+        while True:
+            current_batch = await combine_queue.get()
+            if current_batch is None:
+                break
+            
+            batch_num += 1
+            try:
+                # Jobs run side by side in the same directory: the job id keeps their batch files apart
+                combined_audio = AUDIO_OUTPUT_DIR / f"{job_id}_batch_{batch_num}_chapters_{current_batch[0]['chapter_number']}_to_{current_batch[-1]['chapter_number']}.mp3"
+                await asyncio.to_thread(job_journal.start_batch, job_id, batch_num,
+                                        [item["position"] for item in current_batch], combined_audio)
+                result = await asyncio.to_thread(combine_batch, current_batch, combined_audio)
+                await asyncio.to_thread(job_journal.finish_batch, job_id, batch_num)
+                await asyncio.to_thread(
+                    audio_library.add, combined_audio, duration=result["duration"], novel=novel,
+                    first_chapter=current_batch[0]["chapter_number"], last_chapter=current_batch[-1]["chapter_number"],
+                    chapters=sum(1 for source in result["sources"] if source["frames"]), job_id=job_id
+                )
+                
+                # Chapter files are only dropped once the batch is recorded as done
+                for item in current_batch:
+                    item["audio_file"].unlink(missing_ok=True)
+                
+                state.update(completed_batches=batch_num)
+            
+            except Exception as e:
+                metrics.COMBINE_FAILURES.inc()
+                print(f"Error combining batch {batch_num}: {e}")
+                # Its chapter files stay in place; the job ends as an error and resuming retries the batch
+                await asyncio.to_thread(job_journal.fail_batch, job_id, batch_num)
+    
+    stages = [asyncio.ensure_future(stage()) for stage in (scrape_stage, batch_stage, combine_stage)]
+    try:
+        await asyncio.gather(*stages)
+    finally:
+        for stage in stages:
+            stage.cancel()
+        # Drop any synthesis still queued after a stop or failure
+        while not tts_queue.empty():
+            task = tts_queue.get_nowait()
+            if task is not None:
+                task.cancel()
+
+def process_all_in_one_worker(state: JobState):
+    """Run one scheduled job (new, or resumed from the journal) in its worker thread"""
+    request = state.request
+    job_id = state.job_id
+    try:
+        job_journal.set_status(job_id, "processing")
+        scraper = shared_scraper
         
         # Calculate total chapters
         if request.end_chapter:
@@ -611,286 +1053,261 @@ def process_all_in_one_worker(request: AllInOneRequest):
             total_chapters = 1
         
         total_batches = (total_chapters + request.batch_size - 1) // request.batch_size
+        state.update(total=total_chapters, total_batches=total_batches)
         
-        with processing_state["lock"]:
-            processing_state["total"] = total_chapters
-            processing_state["total_batches"] = total_batches
+        if not job_journal.has_chapters(job_id):
+            # Get chapter URLs first; the job's chapter list is fixed from here on
+            start_url = request.start_url
+            base_url = request.base_url or (start_url.rsplit('/', 1)[0] if '/' in start_url else start_url)
+            job_journal.set_chapters(job_id, discover_chapter_urls(request, scraper, base_url, total_chapters))
         
-        # Get chapter URLs first
-        start_url = request.start_url
-        base_url = request.base_url or (start_url.rsplit('/', 1)[0] if '/' in start_url else start_url)
-        
-        # Try to get all chapter URLs
+        # One event loop for the whole job; all three stages run on it
         try:
-            time.sleep(random.uniform(2, 4))
-            response = scraper.get(start_url, timeout=20, allow_redirects=True)
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.content, 'html.parser')
-                chapter_links = []
-                seen_urls = set()
-                
-                links = soup.find_all('a', href=True)
-                for link in links:
-                    href = link.get('href', '')
-                    if re.search(r'/chapter[_-]?\d+', href, re.I):
-                        if href.startswith('/'):
-                            full_url = base_url + href
-                        elif href.startswith('http'):
-                            full_url = href
-                        elif not href.startswith('#'):
-                            full_url = base_url + '/' + href.lstrip('/')
-                        else:
-                            continue
-                        
-                        full_url = full_url.split('#')[0].split('?')[0]
-                        if full_url not in seen_urls and 'chapter' in full_url.lower():
-                            seen_urls.add(full_url)
-                            chapter_links.append(full_url)
-                
-                # Extract chapter numbers and sort
-                def extract_chapter_num(url):
-                    match = re.search(r'chapter[_-]?(\d+)', url, re.I)
-                    return int(match.group(1)) if match else 9999
-                
-                chapter_urls_with_nums = [(extract_chapter_num(url), url) for url in chapter_links]
-                chapter_urls_with_nums.sort(key=lambda x: x[0])
-                chapter_urls = [url for _, url in chapter_urls_with_nums if 9999 > _ >= request.start_chapter]
-                
-                if request.end_chapter:
-                    chapter_urls = [url for url in chapter_urls if extract_chapter_num(url) <= request.end_chapter]
-                elif request.num_chapters:
-                    chapter_urls = chapter_urls[:request.num_chapters]
-        except Exception as e:
-            print(f"Error getting chapter URLs: {e}")
-            chapter_urls = []
+            asyncio.run(run_all_in_one_pipeline(request, state, scraper))
+        except PipelineStopped:
+            job_journal.set_status(job_id, "stopped")
+            state.update(status="stopped")
+            return
         
-        # If no URLs found, generate them
-        if not chapter_urls:
-            chapter_urls = []
-            for ch_num in range(request.start_chapter, request.start_chapter + total_chapters):
-                urls_to_try = [
-                    f"{start_url}/{ch_num}",
-                    f"{start_url}-{ch_num}",
-                    f"{start_url}-chapter-{ch_num}",
-                    f"{start_url}/chapter-{ch_num}",
-                    f"{base_url}/{ch_num}",
-                    f"{base_url}/chapter-{ch_num}",
-                ]
-                chapter_urls.extend(urls_to_try)
-        
-        # Process in batches
-        current_batch = []
-        batch_num = 0
+        # Chapters that failed TTS or sat in a batch that failed to combine are missing from the audio:
+        # keep the job's files and leave it resumable instead of completing it
+        failures = job_journal.failures(job_id)
+        if failures["tts_failed"] or failures["failed_batches"]:
+            error = (f"{failures['tts_failed']} chapter(s) failed TTS, {failures['failed_batches']} batch(es) "
+                     f"failed to combine; resume the job to retry them")
+            job_journal.set_status(job_id, "error", error)
+            state.update(status="error", error=error)
+            return
         
-        for i, chapter_url in enumerate(chapter_urls):
-            # Check for stop
-            if processing_state["stop_event"].is_set():
-                with processing_state["lock"]:
-                    processing_state["status"] = "idle"
-                return
-            
-            # Check for pause
-            if processing_state["pause_event"].is_set():
-                while processing_state["pause_event"].is_set() and not processing_state["stop_event"].is_set():
-                    time.sleep(0.5)
-            
-            if processing_state["stop_event"].is_set():
-                return
-            
-            # Scrape chapter
-            content, chapter_title = scrape_single_chapter_url(chapter_url, scraper)
-            
-            if not content:
-                continue
-            
-            chapter_num = i + request.start_chapter
-            match = re.search(r'chapter[_-]?(\d+)', chapter_url, re.I)
-            if match:
-                chapter_num = int(match.group(1))
-            
-            with processing_state["lock"]:
-                processing_state["current"] = i + 1
-                processing_state["current_chapter"] = {
-                    "chapter_number": chapter_num,
-                    "title": chapter_title or f"Chapter {chapter_num}",
-                    "url": chapter_url
-                }
-            
-            # Generate audio
-            try:
-                ssml_text = build_ssml(content, request.rate, request.pitch, request.volume)
-                communicate = edge_tts.Communicate(text=ssml_text, voice=request.voice)
-                audio_file = AUDIO_OUTPUT_DIR / f"chapter_{chapter_num}_{uuid.uuid4().hex[:8]}.mp3"
-                asyncio.run(communicate.save(str(audio_file)))
-                
-                current_batch.append({
-                    "chapter_number": chapter_num,
-                    "title": chapter_title or f"Chapter {chapter_num}",
-                    "audio_file": audio_file
-                })
-            except Exception as e:
-                print(f"Error generating audio for chapter {chapter_num}: {e}")
-                continue
-            
-            # When batch is complete, combine and save
-            if len(current_batch) >= request.batch_size or i == len(chapter_urls) - 1:
-                batch_num += 1
-                try:
-                    combined_audio = AUDIO_OUTPUT_DIR / f"batch_{batch_num}_chapters_{current_batch[0]['chapter_number']}_to_{current_batch[-1]['chapter_number']}.mp3"
-                    
-                    # Try to use pydub for combining, fallback to simple method
-                    try:
-                        from pydub import AudioSegment
-                        combined = AudioSegment.empty()
-                        for item in current_batch:
-                            if item["audio_file"].exists():
-                                audio = AudioSegment.from_mp3(str(item["audio_file"]))
-                                combined += audio
-                        combined.export(str(combined_audio), format="mp3")
-                    except ImportError:
-                        # Fallback: concatenate using binary append (simple but works)
-                        with open(combined_audio, 'wb') as outfile:
-                            for item in current_batch:
-                                if item["audio_file"].exists():
-                                    with open(item["audio_file"], 'rb') as infile:
-                                        outfile.write(infile.read())
-                    
-                    # Clean up individual chapter files
-                    for item in current_batch:
-                        if item["audio_file"].exists():
-                            item["audio_file"].unlink()
-                    
-                    with processing_state["lock"]:
-                        processing_state["completed_batches"] = batch_num
-                    
-                except Exception as e:
-                    print(f"Error combining batch {batch_num}: {e}")
-                
-                current_batch = []
-        
-        with processing_state["lock"]:
-            processing_state["status"] = "completed"
-            processing_state["current"] = total_chapters
+        job_journal.set_status(job_id, "completed")
+        job_journal.remove_job_files(job_id)
+        state.update(status="completed", current=total_chapters)
     
     except Exception as e:
-        with processing_state["lock"]:
-            processing_state["status"] = "error"
-            processing_state["error"] = str(e)
+        job_journal.set_status(job_id, "error", str(e))
+        state.update(status="error", error=str(e))
         print(f"Error in processing worker: {e}")
 
+# All-in-one jobs (MAX_CONCURRENT_JOBS at once, at most MAX_JOBS_PER_HOST on the same site)
+MAX_CONCURRENT_JOBS = int(os.environ.get("MAX_CONCURRENT_JOBS", str(DEFAULT_MAX_CONCURRENT_JOBS)))
+MAX_JOBS_PER_HOST = int(os.environ.get("MAX_JOBS_PER_HOST", str(DEFAULT_MAX_JOBS_PER_HOST)))
+job_scheduler = JobScheduler(process_all_in_one_worker, MAX_CONCURRENT_JOBS, MAX_JOBS_PER_HOST)
+
+def count_jobs_by_status() -> dict:
+    counts: Dict[tuple, int] = {}
+    for state in job_scheduler.jobs():
+        counts[(state.status,)] = counts.get((state.status,), 0) + 1
+    return counts
+
+metrics.registry.gauge_callback("jobs", "All-in-one jobs known to this process, by status", ["status"], count_jobs_by_status)
+metrics.registry.gauge_callback("scraper_sessions", "Pooled scraper sessions by host and state", ["host", "state"], lambda: {
+    (host, state): count
+    for host, stats in session_pool.stats().items()
+    for state, count in (("idle", stats["idle"]), ("in_use", stats["in_use"]))
+})
+metrics.registry.gauge_callback("host_requests_per_minute", "Adaptive request rate allowed per host", ["host"], lambda: {
+    (host,): 60 / status["interval"] if status["interval"] else 0
+    for host, status in ((host, host_limiter.status(host)) for host in host_limiter.hosts())
+})
+metrics.registry.gauge_callback("cache_size_bytes", "Bytes stored in each cache", ["cache"], lambda: {
+    ("tts",): tts_cache.stats()["size_bytes"],
+    ("page",): page_cache.stats()["size_bytes"],
+})
+metrics.registry.gauge_callback("cache_entries", "Entries stored in each cache", ["cache"], lambda: {
+    ("tts",): tts_cache.stats()["entries"],
+    ("page",): page_cache.stats()["entries"],
+})
+
+def get_job_state(job_id: str) -> JobState:
+    state = job_scheduler.get(job_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return state
+
+def job_status(state: JobState) -> dict:
+    status = state.snapshot()
+    status["queue_position"] = job_scheduler.queue_position(state.job_id)
+    # Current adaptive request rate on the job's site
+    status["throttle"] = host_limiter.status(state.host)
+    return status
+
+def pause_job(state: JobState) -> dict:
+    with state.lock:
+        if state.status != "processing":
+            raise HTTPException(status_code=400, detail="No processing in progress")
+        state.pause_event.set()
+        state.status = "paused"
+    return {"message": "Processing paused", "status": "paused", "job_id": state.job_id}
+
+def resume_job(state: JobState) -> dict:
+    with state.lock:
+        if state.status != "paused":
+            raise HTTPException(status_code=400, detail="Processing is not paused")
+        state.pause_event.clear()
+        state.status = "processing"
+    return {"message": "Processing resumed", "status": "processing", "job_id": state.job_id}
+
+def stop_job(state: JobState) -> dict:
+    if job_scheduler.cancel(state.job_id):
+        job_journal.set_status(state.job_id, "stopped")
+    else:
+        with state.lock:
+            state.stop_event.set()
+            state.pause_event.clear()
+    return {"message": "Processing stopped", "status": "stopped", "job_id": state.job_id}
+
 @app.post("/api/process-all-in-one")
 async def process_all_in_one(request: AllInOneRequest):
-    """Start all-in-one processing"""
-    global processing_state
+    """Queue an all-in-one job, or resume a journaled job when resume_job_id is set"""
+    get_tts_backend(request.tts_backend)
+    if request.resume_job_id:
+        job = job_journal.get_job(request.resume_job_id)
+        if not job:
+            raise HTTPException(status_code=404, detail="Job not found")
+        if job["status"] not in RESUMABLE_STATUSES or job_scheduler.is_active(request.resume_job_id):
+            raise HTTPException(status_code=400, detail=f"Job cannot be resumed (status: {job['status']})")
+        request = AllInOneRequest.model_validate({**job["request"], "resume_job_id": request.resume_job_id,
+                                                  "priority": request.priority})
+        job_id = request.resume_job_id
+        job_journal.set_status(job_id, "queued")
+    else:
+        job_id = job_journal.create_job(request.model_dump())
     
-    with processing_state["lock"]:
-        if processing_state["status"] == "processing":
-            raise HTTPException(status_code=400, detail="Processing already in progress")
-        
-        # Reset state
-        processing_state["status"] = "idle"
-        processing_state["current"] = 0
-        processing_state["total"] = 0
-        processing_state["current_chapter"] = None
-        processing_state["completed_batches"] = 0
-        processing_state["total_batches"] = 0
-        processing_state["error"] = None
-        processing_state["stop_event"].clear()
-        processing_state["pause_event"].clear()
-        
-        # Start worker thread
-        thread = threading.Thread(target=process_all_in_one_worker, args=(request,))
-        thread.daemon = True
-        thread.start()
-        processing_state["thread"] = thread
+    state = JobState(job_id, request, host_of(request.start_url), request.priority)
+    job_scheduler.submit(state)
     
-    return {"message": "Processing started", "status": "processing"}
+    return {
+        "message": "Processing resumed" if request.resume_job_id else "Processing started",
+        "status": state.status,
+        "job_id": job_id
+    }
+
+@app.get("/api/jobs")
+async def list_jobs():
+    """Jobs in the journal, with live progress for the ones this process has queued or run"""
+    jobs = job_journal.list_jobs()
+    for job in jobs:
+        state = job_scheduler.get(job["job_id"])
+        if state is not None:
+            job.update(job_status(state))
+    return {"jobs": jobs}
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status of one job (live while queued or running, from the journal otherwise)"""
+    state = job_scheduler.get(job_id)
+    if state is not None:
+        return job_status(state)
+    job = job_journal.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    job.pop("request")
+    return job
+
+@app.post("/api/jobs/{job_id}/pause")
+async def pause_job_endpoint(job_id: str):
+    """Pause one job"""
+    return pause_job(get_job_state(job_id))
+
+@app.post("/api/jobs/{job_id}/resume")
+async def resume_job_endpoint(job_id: str):
+    """Resume one paused job"""
+    return resume_job(get_job_state(job_id))
+
+@app.post("/api/jobs/{job_id}/stop")
+async def stop_job_endpoint(job_id: str):
+    """Stop one job (queued jobs are dropped from the queue)"""
+    return stop_job(get_job_state(job_id))
+
+# Legacy single-job endpoints: they act on the most recently submitted job
 
 @app.get("/api/process-status")
 async def get_process_status():
     """Get current processing status"""
-    global processing_state
-    
-    with processing_state["lock"]:
+    state = job_scheduler.get(job_scheduler.latest_job_id)
+    if state is None:
         return {
-            "status": processing_state["status"],
-            "current": processing_state["current"],
-            "total": processing_state["total"],
-            "current_chapter": processing_state["current_chapter"],
-            "completed_batches": processing_state["completed_batches"],
-            "total_batches": processing_state["total_batches"],
-            "error": processing_state["error"]
+            "status": "idle",
+            "current": 0,
+            "total": 0,
+            "current_chapter": None,
+            "completed_batches": 0,
+            "total_batches": 0,
+            "error": None,
+            "job_id": None
         }
+    
+    status = job_status(state)
+    if status["status"] == "stopped":
+        status["status"] = "idle"
+    return status
 
 @app.post("/api/process-pause")
 async def pause_process():
     """Pause processing"""
-    global processing_state
-    
-    with processing_state["lock"]:
-        if processing_state["status"] != "processing":
-            raise HTTPException(status_code=400, detail="No processing in progress")
-        
-        processing_state["pause_event"].set()
-        processing_state["status"] = "paused"
-    
-    return {"message": "Processing paused", "status": "paused"}
+    state = job_scheduler.get(job_scheduler.latest_job_id)
+    if state is None:
+        raise HTTPException(status_code=400, detail="No processing in progress")
+    return pause_job(state)
 
 @app.post("/api/process-resume")
 async def resume_process():
     """Resume processing"""
-    global processing_state
-    
-    with processing_state["lock"]:
-        if processing_state["status"] != "paused":
-            raise HTTPException(status_code=400, detail="Processing is not paused")
-        
-        processing_state["pause_event"].clear()
-        processing_state["status"] = "processing"
-    
-    return {"message": "Processing resumed", "status": "processing"}
+    state = job_scheduler.get(job_scheduler.latest_job_id)
+    if state is None:
+        raise HTTPException(status_code=400, detail="Processing is not paused")
+    return resume_job(state)
 
 @app.post("/api/process-stop")
 async def stop_process():
     """Stop processing"""
-    global processing_state
-    
-    with processing_state["lock"]:
-        processing_state["stop_event"].set()
-        processing_state["pause_event"].clear()
-        processing_state["status"] = "idle"
-    
+    state = job_scheduler.get(job_scheduler.latest_job_id)
+    if state is not None:
+        stop_job(state)
     return {"message": "Processing stopped", "status": "idle"}
 
+@app.get("/metrics")
+def get_metrics():
+    """Prometheus metrics: per-stage latency histograms and counters by host and voice"""
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/api/list-audio-files")
-async def list_audio_files():
-    """List generated audio files"""
+async def list_audio_files(page: Optional[int] = None, page_size: Optional[int] = None, sort: str = "created", order: str = "desc",
+                           novel: Optional[str] = None, chapter_from: Optional[int] = None,
+                           chapter_to: Optional[int] = None, job_id: Optional[str] = None):
+    """List generated audio files from the library manifest
+    
+    sort: created, filename, size, duration, chapter or novel; novel matches a
+    substring; chapter_from/chapter_to select files overlapping that range.
+    Without page/page_size every file is returned (as before pagination);
+    with either, pages hold page_size files (default DEFAULT_PAGE_SIZE).
+    """
     try:
-        files = []
-        for file_path in AUDIO_OUTPUT_DIR.glob("*.mp3"):
-            files.append({
-                "filename": file_path.name,
-                "size": f"{file_path.stat().st_size / (1024*1024):.2f} MB",
-                "created": datetime.fromtimestamp(file_path.stat().st_mtime).isoformat()
-            })
-        
-        files.sort(key=lambda x: x["created"], reverse=True)
-        return {"files": files}
+        if page is None and page_size is None:
+            return audio_library.list_files(1, None, sort, order, novel, chapter_from, chapter_to, job_id)
+        return audio_library.list_files(page or 1, page_size or DEFAULT_PAGE_SIZE, sort, order, novel,
+                                        chapter_from, chapter_to, job_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/download-audio/{filename}")
+@app.delete("/api/audio-files/{filename}")
+async def delete_audio_file(filename: str):
+    """Delete an audio file and its library entry"""
+    file_path = AUDIO_OUTPUT_DIR / filename
+    if not file_path.is_file():
+        raise HTTPException(status_code=404, detail="File not found")
+    file_path.unlink()
+    audio_library.remove(filename)
+    return {"message": "File deleted", "filename": filename}
+
+@app.api_route("/api/download-audio/{filename}", methods=["GET", "HEAD"])
 async def download_audio(filename: str):
-    """Download an audio file"""
+    """Download an audio file (supports Range requests and ETag revalidation)"""
     file_path = AUDIO_OUTPUT_DIR / filename
-    if not file_path.exists():
+    if not file_path.is_file():
         raise HTTPException(status_code=404, detail="File not found")
     
-    return FileResponse(
-        path=str(file_path),
-        media_type="audio/mpeg",
-        filename=filename
-    )
+    return RangeFileResponse(file_path, media_type="audio/mpeg", filename=filename)
 
 if __name__ == "__main__":
     import uvicorn
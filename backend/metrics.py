@@ -0,0 +1,196 @@
+"""
+Metrics - counters and latency histograms per pipeline stage, rendered in Prometheus text format
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Sequence, Tuple
+
+# Latency buckets in seconds (fetches and parses are sub-second, TTS and combining can take minutes)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+def escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def format_labels(names: Sequence[str], values: Sequence) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{escape_label(value)}"' for name, value in zip(names, values)) + "}"
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+class Counter:
+    """Monotonic counter, one series per label combination"""
+    
+    kind = "counter"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+    
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+    
+    def samples(self) -> List[Tuple[str, str, float]]:
+        with self._lock:
+            return [(self.name, format_labels(self.labelnames, key), value) for key, value in sorted(self._values.items())]
+
+class Histogram:
+    """Cumulative-bucket histogram, one series per label combination"""
+    
+    kind = "histogram"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._series: Dict[tuple, list] = {}  # key -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+    
+    def observe(self, value: float, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            series = self._series.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+    
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the with-block (also when it raises)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+    
+    def summary(self) -> Tuple[float, int]:
+        """(sum, count) over every label combination"""
+        with self._lock:
+            return sum(series[-2] for series in self._series.values()), sum(series[-1] for series in self._series.values())
+    
+    def samples(self) -> List[Tuple[str, str, float]]:
+        samples = []
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    samples.append((f"{self.name}_bucket", format_labels(self.labelnames + ("le",), key + (format_value(bound),)), cumulative))
+                labels = format_labels(self.labelnames, key)
+                samples.append((f"{self.name}_sum", labels, series[-2]))
+                samples.append((f"{self.name}_count", labels, series[-1]))
+        return samples
+
+class CallbackGauge:
+    """Gauge whose series are read from a callback at scrape time ({label values tuple: value})"""
+    
+    kind = "gauge"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str], callback: Callable[[], dict]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+    
+    def samples(self) -> List[Tuple[str, str, float]]:
+        try:
+            values = self.callback()
+        except Exception as e:
+            print(f"Metrics callback {self.name} failed: {e}")
+            return []
+        return [(self.name, format_labels(self.labelnames, key), value) for key, value in sorted(values.items())]
+
+class Registry:
+    def __init__(self):
+        self._metrics: list = []
+        self._lock = threading.Lock()
+    
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+    
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+    
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+    
+    def gauge_callback(self, name: str, documentation: str, labelnames: Sequence[str],
+                       callback: Callable[[], dict]) -> CallbackGauge:
+        return self.register(CallbackGauge(name, documentation, labelnames, callback))
+    
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics)
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+# Scraping
+SCRAPE_FETCH_SECONDS = registry.histogram(
+    "scrape_fetch_seconds", "Time to fetch a chapter page (including page-cache hits)", ["host"])
+SCRAPE_RESPONSES = registry.counter(
+    "scrape_responses_total", "Chapter page responses by HTTP status, or timeout/connection_error", ["host", "status"])
+SCRAPE_BYTES = registry.counter(
+    "scrape_bytes_total", "Bytes of chapter pages received", ["host"])
+SCRAPE_RETRIES = registry.counter(
+    "scrape_retries_total", "Chapter fetches retried, by reason", ["host", "reason"])
+SCRAPE_FAILURES = registry.counter(
+    "scrape_failures_total", "Chapters that could not be scraped, by reason", ["host", "reason"])
+
+# Extraction
+EXTRACTION_SECONDS = registry.histogram(
+    "extraction_seconds", "Time to parse a chapter page and extract its text", ["host", "path"])
+EXTRACTION_CHARACTERS = registry.counter(
+    "extraction_characters_total", "Characters of chapter text extracted", ["host"])
+
+# TTS
+TTS_SECONDS = registry.histogram(
+    "tts_synthesis_seconds", "Time to synthesize one text (all of its chunks)", ["voice"])
+TTS_CHUNK_SECONDS = registry.histogram(
+    "tts_chunk_seconds", "Time for one TTS backend request (one chunk)", ["backend", "voice"])
+TTS_CHARACTERS = registry.counter(
+    "tts_characters_total", "Characters of text synthesized", ["voice"])
+TTS_AUDIO_BYTES = registry.counter(
+    "tts_audio_bytes_total", "Bytes of MP3 audio produced", ["voice"])
+TTS_CACHE_LOOKUPS = registry.counter(
+    "tts_cache_lookups_total", "TTS cache lookups per chunk", ["voice", "result"])
+TTS_CHUNK_ERRORS = registry.counter(
+    "tts_chunk_errors_total", "Failed TTS backend requests (each is retried up to the chunk retry limit)",
+    ["backend", "voice"])
+TTS_FAILURES = registry.counter(
+    "tts_failures_total", "Texts whose synthesis failed after retries", ["voice"])
+
+# Batch combining
+COMBINE_SECONDS = registry.histogram(
+    "combine_seconds", "Time to combine the chapter files of a batch")
+COMBINE_BYTES = registry.counter(
+    "combine_bytes_total", "Bytes of combined batch files written")
+COMBINE_FRAMES = registry.counter(
+    "combine_frames_total", "MP3 frames copied into combined batch files")
+COMBINE_FAILURES = registry.counter(
+    "combine_failures_total", "Batches that failed to combine")
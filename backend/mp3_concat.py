@@ -0,0 +1,265 @@
+"""
+MP3 concatenation - join MP3 files frame by frame, without decoding or re-encoding
+"""
+
+import struct
+from pathlib import Path
+from typing import BinaryIO, List, Optional
+
+from id3_chapters import chapter_tag
+
+# Bitrates in kbps by (MPEG-1?, layer), index 1..14
+BITRATES = {
+    (True, 1): [32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (True, 2): [32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (True, 3): [32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (False, 1): [32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (False, 2): [8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (False, 3): [8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+
+# Sample rates by version bits (0 = MPEG-2.5, 2 = MPEG-2, 3 = MPEG-1)
+SAMPLE_RATES = {0: (11025, 12000, 8000), 2: (22050, 24000, 16000), 3: (44100, 48000, 32000)}
+
+# Frame offsets sampled for the Xing seek table (halved whenever it fills up)
+MAX_TOC_SAMPLES = 2048
+
+# Bytes read at a time while searching for the next frame after junk
+RESYNC_CHUNK = 4096
+
+class FrameHeader:
+    """A parsed 4-byte MPEG audio frame header"""
+    
+    __slots__ = ("raw", "version", "layer", "bitrate_index", "sample_rate", "padding", "channel_mode", "protected")
+    
+    def __init__(self, raw: bytes):
+        self.raw = raw
+        value = struct.unpack(">I", raw)[0]
+        self.version = (value >> 19) & 0x3
+        self.layer = 4 - ((value >> 17) & 0x3)
+        self.protected = not (value >> 16) & 0x1
+        self.bitrate_index = (value >> 12) & 0xF
+        self.sample_rate = SAMPLE_RATES[self.version][(value >> 10) & 0x3]
+        self.padding = (value >> 9) & 0x1
+        self.channel_mode = (value >> 6) & 0x3
+    
+    @property
+    def mpeg1(self) -> bool:
+        return self.version == 3
+    
+    @property
+    def bitrate(self) -> int:
+        return BITRATES[(self.mpeg1, self.layer)][self.bitrate_index - 1] * 1000
+    
+    @property
+    def samples(self) -> int:
+        if self.layer == 1:
+            return 384
+        if self.layer == 3 and not self.mpeg1:
+            return 576
+        return 1152
+    
+    @property
+    def length(self) -> int:
+        if self.layer == 1:
+            return (12 * self.bitrate // self.sample_rate + self.padding) * 4
+        return self.samples // 8 * self.bitrate // self.sample_rate + self.padding
+    
+    @property
+    def side_info_end(self) -> int:
+        """Offset of the first byte after the Layer III side info (where a Xing/Info tag sits)"""
+        mono = self.channel_mode == 3
+        if self.mpeg1:
+            side_info = 17 if mono else 32
+        else:
+            side_info = 9 if mono else 17
+        return 4 + (2 if self.protected else 0) + side_info
+
+def parse_header(raw: bytes) -> Optional[FrameHeader]:
+    """FrameHeader for 4 bytes that look like a valid frame header, else None"""
+    if len(raw) < 4 or raw[0] != 0xFF or (raw[1] & 0xE0) != 0xE0:
+        return None
+    version = (raw[1] >> 3) & 0x3
+    layer = (raw[1] >> 1) & 0x3
+    bitrate_index = raw[2] >> 4
+    sample_rate_index = (raw[2] >> 2) & 0x3
+    if version == 1 or layer == 0 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None  # Reserved values (or free format, which we cannot size)
+    return FrameHeader(raw[:4])
+
+def id3v2_size(head: bytes) -> int:
+    """Total size of an ID3v2 tag starting at head[0], or 0"""
+    if len(head) < 10 or head[:3] != b"ID3":
+        return 0
+    size = (head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9]
+    return 10 + size + (10 if head[5] & 0x10 else 0)
+
+def is_info_frame(header: FrameHeader, frame: bytes) -> bool:
+    """True for a Xing/Info/VBRI metadata frame (silent frame carrying the old file's totals)"""
+    offset = header.side_info_end
+    return frame[offset:offset + 4] in (b"Xing", b"Info") or frame[36:40] == b"VBRI"
+
+def iter_frames(stream: BinaryIO):
+    """Yield (header, frame bytes) for each audio frame, skipping tags and junk between frames"""
+    head = stream.read(10)
+    tag_size = id3v2_size(head)
+    if tag_size:
+        stream.seek(tag_size)
+        head = b""
+    buffer = head
+    while True:
+        if len(buffer) < 4:
+            buffer += stream.read(4 - len(buffer))
+            if len(buffer) < 4:
+                return
+        header = parse_header(buffer)
+        if header is None:
+            if buffer[:3] in (b"TAG", b"ID3", b"APE"):
+                return  # Trailing ID3v1/ID3v2/APE tag
+            # Resynchronize on the next 0xFF byte
+            index = buffer.find(b"\xff", 1)
+            buffer = buffer[index:] if index > 0 else stream.read(RESYNC_CHUNK)
+            if not buffer:
+                return
+            continue
+        if len(buffer) < header.length:
+            buffer += stream.read(header.length - len(buffer))
+            if len(buffer) < header.length:
+                return  # Truncated last frame
+        frame, buffer = buffer[:header.length], buffer[header.length:]
+        yield header, frame
+
+def mp3_duration(path: Path) -> float:
+    """Duration in seconds from the first frame alone: the Xing/Info frame count, or size / bitrate for CBR"""
+    with open(path, "rb") as stream:
+        for header, frame in iter_frames(stream):
+            offset = header.side_info_end
+            if frame[offset:offset + 4] in (b"Xing", b"Info"):
+                flags = struct.unpack(">I", frame[offset + 4:offset + 8])[0]
+                if flags & 0x1:
+                    frames = struct.unpack(">I", frame[offset + 8:offset + 12])[0]
+                    return frames * header.samples / header.sample_rate
+            audio_bytes = Path(path).stat().st_size - stream.tell() + len(frame)
+            return audio_bytes * 8 / header.bitrate
+    return 0.0
+
+def xing_frame(template: FrameHeader, frames: int, total_bytes: int, toc: bytes, vbr: bool) -> bytes:
+    """A silent frame in template's format carrying a Xing/Info tag (frame count, byte count, TOC)"""
+    payload = (b"Xing" if vbr else b"Info") + struct.pack(">III", 0x7, frames, total_bytes) + toc
+    needed = template.side_info_end + len(payload)
+    bitrates = BITRATES[(template.mpeg1, template.layer)]
+    for index in range(1, 15):
+        raw = bytearray(template.raw)
+        raw[1] |= 0x01  # No CRC
+        raw[2] = (index << 4) | (raw[2] & 0x0C)  # Bitrate index, keep sample rate, no padding
+        header = FrameHeader(bytes(raw))
+        if header.length >= needed:
+            frame = bytearray(header.length)
+            frame[:4] = raw
+            frame[header.side_info_end:header.side_info_end + len(payload)] = payload
+            return bytes(frame)
+    raise ValueError(f"No {bitrates[-1]} kbps frame can hold a Xing tag")
+
+class FrameSampler:
+    """Byte offsets of every Nth frame, with N doubling to keep memory bounded"""
+    
+    def __init__(self):
+        self.stride = 1
+        self.offsets: List[int] = []
+    
+    def add(self, frame_index: int, offset: int):
+        if frame_index % self.stride:
+            return
+        self.offsets.append(offset)
+        if len(self.offsets) >= MAX_TOC_SAMPLES:
+            self.offsets = self.offsets[::2]
+            self.stride *= 2
+    
+    def toc(self, frames: int, total_bytes: int) -> bytes:
+        """The 100-entry Xing seek table (byte position at each percent of the duration, scaled to 256)"""
+        if not frames or not total_bytes or not self.offsets:
+            return bytes(100)
+        entries = []
+        for percent in range(100):
+            sample = min(percent * frames // 100 // self.stride, len(self.offsets) - 1)
+            entries.append(min(255, self.offsets[sample] * 256 // total_bytes))
+        return bytes(entries)
+
+def concat_mp3(sources: List[Path], destination: Path, chapter_titles: Optional[List[str]] = None,
+               title: Optional[str] = None) -> dict:
+    """Concatenate MP3 files into destination, copying frames as they are
+    
+    ID3 tags and each file's Xing/Info frame are dropped, and a new Xing/Info
+    frame describing the whole result is written first, so players see the
+    right duration and can seek. Memory use does not depend on file size.
+    
+    With chapter_titles (one per source), the file starts with an ID3v2 tag
+    holding a CHAP frame per source (times from frame counts) and a CTOC. The
+    tag's size is known from the titles alone, so it is reserved up front and
+    filled in after the copy. Sources without audio get no chapter.
+    Returns {"frames", "duration", "sources": [{"path", "frames", "duration"}]}.
+    """
+    template: Optional[FrameHeader] = None
+    sampler = FrameSampler()
+    bitrates = set()
+    frames = 0
+    samples = 0
+    audio_bytes = 0
+    per_source = []
+    
+    with open(destination, "wb") as out:
+        tag_size = 0
+        if chapter_titles is not None:
+            tag_size = len(chapter_tag([(t, 0, 0) for t in chapter_titles], title))
+            out.write(bytes(tag_size))
+        
+        xing_size = 0
+        for source in sources:
+            source = Path(source)
+            source_frames = 0
+            source_samples = 0
+            if source.exists():
+                with open(source, "rb") as stream:
+                    for header, frame in iter_frames(stream):
+                        if source_frames == 0 and is_info_frame(header, frame):
+                            continue
+                        if template is None:
+                            template = header
+                            # Reserve room for the Xing frame; it is filled in once the totals are known
+                            xing_size = len(xing_frame(template, 0, 0, bytes(100), True))
+                            out.write(bytes(xing_size))
+                        sampler.add(frames, xing_size + audio_bytes)
+                        out.write(frame)
+                        bitrates.add(header.bitrate_index)
+                        frames += 1
+                        samples += header.samples
+                        audio_bytes += len(frame)
+                        source_frames += 1
+                        source_samples += header.samples
+            per_source.append({
+                "path": str(source),
+                "frames": source_frames,
+                "duration": source_samples / template.sample_rate if template else 0.0,
+            })
+        
+        if chapter_titles is not None:
+            # Chapter bounds come from the running sample count, so they line up exactly with frame boundaries
+            chapters = []
+            elapsed = 0.0
+            for chapter_title, source in zip(chapter_titles, per_source):
+                if source["frames"]:
+                    chapters.append((chapter_title, round(elapsed * 1000), round((elapsed + source["duration"]) * 1000)))
+                elapsed += source["duration"]
+            out.seek(0)
+            out.write(chapter_tag(chapters, title, size=tag_size))  # Skipped chapters leave ID3 padding
+        
+        if template is not None:
+            total_bytes = xing_size + audio_bytes
+            out.seek(tag_size)
+            out.write(xing_frame(template, frames, total_bytes, sampler.toc(frames, total_bytes), len(bitrates) > 1))
+    
+    return {
+        "frames": frames,
+        "duration": samples / template.sample_rate if template else 0.0,
+        "sources": per_source,
+    }
@@ -0,0 +1,241 @@
+"""
+HTTP page cache - persistent, compressed response cache for scraped pages with conditional revalidation
+"""
+
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Optional
+
+# Entries dropped per query while evicting
+EVICT_BATCH = 64
+
+# Default time-to-live per kind of page (seconds)
+CHAPTER_PAGE_TTL = 7 * 24 * 3600  # Published chapters rarely change
+TOC_PAGE_TTL = 3600  # Tables of contents grow while a novel is ongoing
+
+class CachedResponse:
+    """Minimal stand-in for requests.Response built from a cache entry"""
+    
+    def __init__(self, url: str, status_code: int, content: bytes, headers: dict):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+        self.from_cache = True
+    
+    @property
+    def text(self) -> str:
+        encoding = 'utf-8'
+        content_type = self.headers.get('Content-Type') or self.headers.get('content-type') or ''
+        if 'charset=' in content_type:
+            encoding = content_type.split('charset=', 1)[1].split(';', 1)[0].strip() or encoding
+        return self.content.decode(encoding, errors='replace')
+
+class PageCache:
+    """SQLite-backed page store keyed by the final (post-redirect) URL.
+    
+    Bodies are zlib-compressed. Requested URLs that redirected are recorded as
+    aliases of their final URL, so a later lookup by either hits the same entry.
+    Each entry has its own expiry; stale entries keep their ETag/Last-Modified
+    validators for conditional revalidation. When the stored size exceeds
+    max_bytes the least recently accessed entries are evicted; the total size
+    and entry count are kept as running totals, so a store never scans the table.
+    """
+    
+    def __init__(self, db_path: Path, max_bytes: int):
+        self.db_path = Path(db_path)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self._lock = threading.Lock()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                status INTEGER NOT NULL,
+                headers TEXT NOT NULL,
+                body BLOB NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                size INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS pages_last_access ON pages(last_access);
+            CREATE TABLE IF NOT EXISTS aliases (
+                request_url TEXT PRIMARY KEY,
+                final_url TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS aliases_final_url ON aliases(final_url);
+        """)
+        self._conn.commit()
+        self._entries, self._size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages").fetchone()
+    
+    def count(self, counter: str):
+        """Increment one of the hits / misses / revalidated counters (called from many threads)"""
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+    
+    def _resolve(self, url: str) -> str:
+        row = self._conn.execute("SELECT final_url FROM aliases WHERE request_url = ?", (url,)).fetchone()
+        return row[0] if row else url
+    
+    def lookup(self, url: str) -> Optional[dict]:
+        """Return the entry for url (fresh or stale), or None"""
+        with self._lock:
+            final_url = self._resolve(url)
+            row = self._conn.execute(
+                "SELECT url, status, headers, body, etag, last_modified, expires_at FROM pages WHERE url = ?",
+                (final_url,),
+            ).fetchone()
+            if not row:
+                return None
+            self._conn.execute("UPDATE pages SET last_access = ? WHERE url = ?", (time.time(), final_url))
+            self._conn.commit()
+        return {
+            "url": row[0],
+            "status": row[1],
+            "headers": json.loads(row[2]),
+            "body": zlib.decompress(row[3]),
+            "etag": row[4],
+            "last_modified": row[5],
+            "fresh": row[6] > time.time(),
+        }
+    
+    def is_fresh(self, url: str) -> bool:
+        """True if url has an unexpired entry (no network needed)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT expires_at FROM pages WHERE url = ?", (self._resolve(url),)
+            ).fetchone()
+        return bool(row) and row[0] > time.time()
+    
+    def store(self, request_url: str, final_url: str, status: int, headers: dict, body: bytes, ttl: float):
+        """Store a response body under its final URL"""
+        compressed = zlib.compress(body, 6)
+        now = time.time()
+        headers = {k: v for k, v in headers.items() if k.lower() in ('content-type', 'etag', 'last-modified')}
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM pages WHERE url = ?", (final_url,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (final_url, status, json.dumps(headers), compressed,
+                 headers.get('ETag') or headers.get('etag'),
+                 headers.get('Last-Modified') or headers.get('last-modified'),
+                 now, now + ttl, now, len(compressed)),
+            )
+            if old:
+                self._size -= old[0]
+            else:
+                self._entries += 1
+            self._size += len(compressed)
+            if request_url != final_url:
+                self._conn.execute("INSERT OR REPLACE INTO aliases VALUES (?, ?)", (request_url, final_url))
+            self._evict()
+            self._conn.commit()
+    
+    def refresh(self, url: str, ttl: float):
+        """Extend an entry's lifetime after a 304 Not Modified"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE pages SET fetched_at = ?, expires_at = ?, last_access = ? WHERE url = ?",
+                (now, now + ttl, now, url),
+            )
+            self._conn.commit()
+    
+    def _evict(self):
+        # Drop the least recently accessed entries (a few at a time, via the last_access index) until under budget
+        while self._size > self.max_bytes:
+            oldest = self._conn.execute(
+                "SELECT url, size FROM pages ORDER BY last_access LIMIT ?", (EVICT_BATCH,)
+            ).fetchall()
+            if not oldest:
+                break
+            for url, size in oldest:
+                self._conn.execute("DELETE FROM pages WHERE url = ?", (url,))
+                self._conn.execute("DELETE FROM aliases WHERE final_url = ?", (url,))
+                self._size -= size
+                self._entries -= 1
+                if self._size <= self.max_bytes:
+                    break
+    
+    def stats(self) -> dict:
+        """Hit/miss counters and stored size"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "revalidated": self.revalidated,
+                "entries": self._entries,
+                "size_bytes": self._size,
+                "max_bytes": self.max_bytes,
+            }
+
+class CachedSession:
+    """Wraps a requests/cloudscraper session so GETs go through a PageCache.
+    
+    Fresh entries are served without touching the network. Stale entries are
+    revalidated with If-None-Match / If-Modified-Since when the server gave us
+    validators, and a 304 just extends the entry. Everything else (cookies,
+    headers, post, ...) is delegated to the wrapped session.
+    
+    With store=False a 200 is not cached by get(); the caller passes it to
+    store_response() once it knows the page is the real thing (a challenge or
+    interstitial page also comes back as 200).
+    """
+    
+    def __init__(self, session, cache: PageCache, default_ttl: float = CHAPTER_PAGE_TTL):
+        self.session = session
+        self.cache = cache
+        self.default_ttl = default_ttl
+    
+    def __getattr__(self, name):
+        return getattr(self.session, name)
+    
+    def is_fresh(self, url: str) -> bool:
+        return self.cache.is_fresh(url)
+    
+    def get(self, url: str, ttl: Optional[float] = None, cache: bool = True, store: bool = True, **kwargs):
+        if not cache:
+            return self.session.get(url, **kwargs)
+        ttl = self.default_ttl if ttl is None else ttl
+        
+        entry = self.cache.lookup(url)
+        if entry and entry["fresh"]:
+            self.cache.count("hits")
+            return CachedResponse(entry["url"], entry["status"], entry["body"], entry["headers"])
+        
+        headers = dict(kwargs.pop('headers', None) or {})
+        if entry:
+            if entry["etag"]:
+                headers['If-None-Match'] = entry["etag"]
+            if entry["last_modified"]:
+                headers['If-Modified-Since'] = entry["last_modified"]
+        
+        response = self.session.get(url, headers=headers or None, **kwargs)
+        
+        if response.status_code == 304 and entry:
+            self.cache.count("revalidated")
+            self.cache.refresh(entry["url"], ttl)
+            return CachedResponse(entry["url"], entry["status"], entry["body"], entry["headers"])
+        
+        self.cache.count("misses")
+        if store:
+            self.store_response(url, response, ttl)
+        return response
+    
+    def store_response(self, url: str, response, ttl: Optional[float] = None):
+        """Cache a 200 fetched from the network (responses served from the cache are left alone)"""
+        if getattr(response, 'from_cache', False) or response.status_code != 200 or not response.content:
+            return
+        ttl = self.default_ttl if ttl is None else ttl
+        self.cache.store(url, response.url or url, response.status_code, dict(response.headers), response.content, ttl)
@@ -0,0 +1,210 @@
+"""
+Range file responses - byte ranges, ETag validation and zero-copy sends for large downloads
+"""
+
+import asyncio
+import os
+import secrets
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import List, Optional, Tuple
+from urllib.parse import quote
+
+from starlette.datastructures import Headers
+from starlette.responses import Response
+
+# More ranges than this in one request are ignored and the whole file is sent
+MAX_RANGES = 100
+
+# Read size when the server offers no zero-copy send
+CHUNK_SIZE = 1024 * 1024
+
+class RangeNotSatisfiable(Exception):
+    """No requested range overlaps the file"""
+
+def file_etag(stat_result: os.stat_result) -> str:
+    """Strong validator from size and modification time (batch files are replaced, never edited in place)"""
+    return f'"{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"'
+
+def parse_ranges(header: str, size: int) -> Optional[List[Tuple[int, int]]]:
+    """Parse a Range header into sorted, merged [start, end) pairs
+    
+    Returns None when the header should be ignored (not bytes, malformed or too
+    many ranges), raises RangeNotSatisfiable when no range overlaps the file.
+    """
+    unit, _, specs = header.partition("=")
+    if unit.strip().lower() != "bytes" or not specs:
+        return None
+    ranges = []
+    for spec in specs.split(","):
+        start_text, dash, end_text = spec.strip().partition("-")
+        if not dash:
+            return None
+        try:
+            if not start_text:
+                suffix = int(end_text)
+                start, end = max(0, size - suffix), size
+            else:
+                start = int(start_text)
+                end = min(size, int(end_text) + 1) if end_text else size
+        except ValueError:
+            return None
+        if start < 0 or (end_text and start_text and int(end_text) < start):
+            return None
+        if start < end:
+            ranges.append((start, end))
+    if len(ranges) > MAX_RANGES:
+        return None
+    if not ranges:
+        raise RangeNotSatisfiable()
+    
+    ranges.sort()
+    merged = [ranges[0]]
+    for start, end in ranges[1:]:
+        if start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+def etag_matches(header: str, etag: str) -> bool:
+    """If-None-Match comparison (weak, as RFC 9110 requires for that header)"""
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+class RangeFileResponse(Response):
+    """Sends a file with Range/multi-range (206), If-Range, If-None-Match/If-Modified-Since (304) support.
+    
+    The body goes out through the server's zero-copy extension when offered
+    (http.response.zerocopysend, i.e. os.sendfile, or http.response.pathsend for
+    whole files); otherwise it is read in large chunks off the event loop.
+    Transfers stop as soon as the client disconnects.
+    """
+    
+    def __init__(self, path: Path, media_type: str, filename: Optional[str] = None):
+        self.path = Path(path)
+        self.filename = filename
+        super().__init__(media_type=media_type)
+    
+    async def __call__(self, scope, receive, send):
+        stat_result = await asyncio.to_thread(os.stat, self.path)
+        size = stat_result.st_size
+        etag = file_etag(stat_result)
+        last_modified = formatdate(stat_result.st_mtime, usegmt=True)
+        request_headers = Headers(scope=scope)
+        
+        headers = {
+            "accept-ranges": "bytes",
+            "etag": etag,
+            "last-modified": last_modified,
+        }
+        if self.filename:
+            quoted = quote(self.filename)
+            if quoted == self.filename:
+                headers["content-disposition"] = f'attachment; filename="{self.filename}"'
+            else:
+                headers["content-disposition"] = f"attachment; filename*=utf-8''{quoted}"
+        
+        if self.not_modified(request_headers, etag, stat_result.st_mtime):
+            await self.start(send, 304, headers)
+            await send({"type": "http.response.body", "body": b""})
+            return
+        
+        ranges = None
+        range_header = request_headers.get("range")
+        if_range = request_headers.get("if-range")
+        if range_header and (if_range is None or if_range in (etag, last_modified)):
+            try:
+                ranges = parse_ranges(range_header, size)
+            except RangeNotSatisfiable:
+                headers["content-range"] = f"bytes */{size}"
+                await self.start(send, 416, headers)
+                await send({"type": "http.response.body", "body": b""})
+                return
+        
+        head_only = scope["method"].upper() == "HEAD"
+        trailer = b""
+        if not ranges:
+            headers["content-type"] = self.media_type
+            headers["content-length"] = str(size)
+            await self.start(send, 200, headers)
+            parts = [(b"", 0, size)]
+        elif len(ranges) == 1:
+            start, end = ranges[0]
+            headers["content-type"] = self.media_type
+            headers["content-range"] = f"bytes {start}-{end - 1}/{size}"
+            headers["content-length"] = str(end - start)
+            await self.start(send, 206, headers)
+            parts = [(b"", start, end)]
+        else:
+            boundary = secrets.token_hex(13)
+            parts = [(
+                f"--{boundary}\r\nContent-Type: {self.media_type}\r\nContent-Range: bytes {start}-{end - 1}/{size}\r\n\r\n".encode("latin-1"),
+                start,
+                end,
+            ) for start, end in ranges]
+            trailer = f"--{boundary}--\r\n".encode("latin-1")
+            headers["content-type"] = f"multipart/byteranges; boundary={boundary}"
+            headers["content-length"] = str(sum(len(prefix) + end - start + 2 for prefix, start, end in parts) + len(trailer))
+            await self.start(send, 206, headers)
+        
+        if head_only:
+            await send({"type": "http.response.body", "body": b""})
+            return
+        
+        extensions = scope.get("extensions") or {}
+        if not ranges and "http.response.pathsend" in extensions:
+            await send({"type": "http.response.pathsend", "path": str(self.path)})
+            return
+        
+        disconnect = asyncio.ensure_future(self.wait_for_disconnect(receive))
+        try:
+            with open(self.path, "rb") as file:
+                for prefix, start, end in parts:
+                    if prefix:
+                        await send({"type": "http.response.body", "body": prefix, "more_body": True})
+                    if "http.response.zerocopysend" in extensions:
+                        await send({"type": "http.response.zerocopysend", "file": file,
+                                    "offset": start, "count": end - start, "more_body": True})
+                    else:
+                        while start < end and not disconnect.done():
+                            await asyncio.to_thread(file.seek, start)
+                            chunk = await asyncio.to_thread(file.read, min(CHUNK_SIZE, end - start))
+                            if not chunk:
+                                raise RuntimeError(f"{self.path} is shorter than expected")
+                            start += len(chunk)
+                            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+                    if disconnect.done():
+                        return
+                    if len(parts) > 1:
+                        await send({"type": "http.response.body", "body": b"\r\n", "more_body": True})
+            await send({"type": "http.response.body", "body": trailer, "more_body": False})
+        finally:
+            disconnect.cancel()
+    
+    @staticmethod
+    async def start(send, status: int, headers: dict):
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(name.encode("latin-1"), value.encode("latin-1")) for name, value in headers.items()],
+        })
+    
+    @staticmethod
+    async def wait_for_disconnect(receive):
+        while (await receive())["type"] != "http.disconnect":
+            pass
+    
+    @staticmethod
+    def not_modified(request_headers: Headers, etag: str, mtime: float) -> bool:
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match is not None:
+            return etag_matches(if_none_match, etag)
+        if_modified_since = request_headers.get("if-modified-since")
+        if if_modified_since:
+            try:
+                return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
@@ -0,0 +1,190 @@
+"""
+Session pool - long-lived scraper sessions per host, shared by every endpoint and job
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+import requests
+
+from fetch_engine import AdaptiveRateLimiter, host_of
+
+# Sessions per host (requests on one host beyond this wait for a session to come back)
+DEFAULT_SESSIONS_PER_HOST = 8
+
+# Idle sessions older than this are closed instead of reused (their connections are long gone)
+DEFAULT_SESSION_IDLE_TTL = 15 * 60
+
+# Statuses that mean the site rejected this session (failed or expired challenge), not just the request
+BLOCKED_STATUSES = (403,)
+
+# Connection errors in a row before a session is replaced
+MAX_CONSECUTIVE_ERRORS = 3
+
+class PooledSession:
+    """A session plus its health record"""
+    
+    def __init__(self, host: str, session):
+        self.host = host
+        self.session = session
+        self.created = time.monotonic()
+        self.last_used = self.created
+        self.requests = 0
+        self.consecutive_errors = 0
+        self.blocked = False
+    
+    def record(self, status_code: Optional[int] = None, error: bool = False):
+        """Note the outcome of one request made with this session"""
+        self.requests += 1
+        self.last_used = time.monotonic()
+        if error:
+            self.consecutive_errors += 1
+            return
+        self.consecutive_errors = 0
+        if status_code in BLOCKED_STATUSES:
+            self.blocked = True
+    
+    @property
+    def healthy(self) -> bool:
+        return not self.blocked and self.consecutive_errors < MAX_CONSECUTIVE_ERRORS
+
+class SessionPool:
+    """Per-host pool of cloudscraper sessions with checkout/return and health tracking.
+    
+    Keeping sessions alive keeps their keep-alive connections and solved
+    challenge cookies, so later requests skip the TLS handshake and the
+    challenge. Sessions are handed out most recently used first. A session is
+    only replaced when it is actually blocked (403) or keeps failing to
+    connect; a new session for a host starts with the User-Agent and cookies of
+    the last session that succeeded there, unless that identity was blocked.
+    """
+    
+    def __init__(self, factory: Callable[[], object], max_per_host: int = DEFAULT_SESSIONS_PER_HOST,
+                 idle_ttl: float = DEFAULT_SESSION_IDLE_TTL):
+        self.factory = factory
+        self.max_per_host = max(1, max_per_host)
+        self.idle_ttl = idle_ttl
+        self._idle: Dict[str, List[PooledSession]] = {}
+        self._in_use: Dict[str, int] = {}
+        self._identity: Dict[str, tuple] = {}  # host -> (User-Agent, cookie jar) of the last good session
+        self._created: Dict[str, int] = {}
+        self._rotated: Dict[str, int] = {}
+        self._condition = threading.Condition()
+    
+    def checkout(self, host: str) -> PooledSession:
+        """Take a session for host, creating one if the host has room, else waiting for one"""
+        with self._condition:
+            while True:
+                idle = self._idle.setdefault(host, [])
+                while idle:
+                    pooled = idle.pop()
+                    if time.monotonic() - pooled.last_used <= self.idle_ttl:
+                        self._in_use[host] = self._in_use.get(host, 0) + 1
+                        return pooled
+                    self._close(pooled)
+                if self._in_use.get(host, 0) < self.max_per_host:
+                    self._in_use[host] = self._in_use.get(host, 0) + 1
+                    identity = self._identity.get(host)
+                    break
+                self._condition.wait()
+        
+        # Creating a session (cloudscraper builds its TLS context) happens outside the lock
+        try:
+            pooled = PooledSession(host, self.factory())
+        except Exception:
+            with self._condition:
+                self._in_use[host] -= 1
+                self._condition.notify()
+            raise
+        if identity:
+            user_agent, cookies = identity
+            pooled.session.headers["User-Agent"] = user_agent
+            pooled.session.cookies.update(cookies)
+        with self._condition:
+            self._created[host] = self._created.get(host, 0) + 1
+        return pooled
+    
+    def checkin(self, pooled: PooledSession):
+        """Return a session: healthy ones go back to the pool, blocked or failing ones are closed"""
+        host = pooled.host
+        with self._condition:
+            self._in_use[host] -= 1
+            if pooled.healthy:
+                if pooled.requests and not pooled.consecutive_errors:
+                    self._identity[host] = (pooled.session.headers.get("User-Agent"), pooled.session.cookies.copy())
+                self._idle.setdefault(host, []).append(pooled)
+            else:
+                if pooled.blocked:
+                    # Its cookies are what got blocked: the next session starts from scratch
+                    self._identity.pop(host, None)
+                self._rotated[host] = self._rotated.get(host, 0) + 1
+                self._close(pooled)
+            self._condition.notify()
+    
+    @contextmanager
+    def session(self, host: str):
+        """with pool.session(host) as pooled: ... (always returned, even on errors)"""
+        pooled = self.checkout(host)
+        try:
+            yield pooled
+        finally:
+            self.checkin(pooled)
+    
+    @staticmethod
+    def _close(pooled: PooledSession):
+        try:
+            pooled.session.close()
+        except Exception:
+            pass
+    
+    def stats(self) -> Dict[str, dict]:
+        with self._condition:
+            hosts = set(self._idle) | set(self._in_use)
+            return {host: {
+                "idle": len(self._idle.get(host, [])),
+                "in_use": self._in_use.get(host, 0),
+                "created": self._created.get(host, 0),
+                "rotated": self._rotated.get(host, 0),
+            } for host in sorted(hosts)}
+
+class PooledScraper:
+    """requests-style facade over a SessionPool: every request runs on a session checked out for its host
+    
+    With a limiter, the outcome of every request (status, latency, Retry-After,
+    timeouts) is fed back to it so the host's pace adapts.
+    """
+    
+    def __init__(self, pool: SessionPool, limiter: Optional[AdaptiveRateLimiter] = None):
+        self.pool = pool
+        self.limiter = limiter
+    
+    def request(self, method: str, url: str, **kwargs):
+        host = host_of(url)
+        with self.pool.session(host) as pooled:
+            started = time.monotonic()
+            try:
+                response = pooled.session.request(method, url, **kwargs)
+            except Exception as e:
+                pooled.record(error=True)
+                if self.limiter is not None:
+                    self.limiter.record(host, timed_out=isinstance(e, requests.exceptions.Timeout))
+                raise
+            # Some sites refuse HEAD with a 403; only a refused GET says the session is blocked
+            status = response.status_code if method == "GET" or response.status_code not in BLOCKED_STATUSES else None
+            pooled.record(status)
+            if self.limiter is not None:
+                self.limiter.record(host, status, time.monotonic() - started, response.headers.get("Retry-After"))
+            return response
+    
+    def get(self, url: str, **kwargs):
+        kwargs.setdefault("allow_redirects", True)
+        return self.request("GET", url, **kwargs)
+    
+    def head(self, url: str, **kwargs):
+        kwargs.setdefault("allow_redirects", False)
+        return self.request("HEAD", url, **kwargs)
+    
+    def post(self, url: str, **kwargs):
+        return self.request("POST", url, **kwargs)
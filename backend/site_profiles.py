@@ -0,0 +1,98 @@
+"""
+Site profiles - per-domain extraction selectors learned from the selector cascade
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Optional, Tuple
+from urllib.parse import urlsplit
+
+from extraction import extract_page
+
+def novel_key(url: str) -> str:
+    """Key identifying the novel a chapter URL belongs to (the URL minus its last path segment)"""
+    parts = urlsplit(url)
+    path = parts.path.rstrip('/').rsplit('/', 1)[0]
+    return f"{parts.hostname or ''}{path}"
+
+class SiteProfileStore:
+    """Learned extraction profiles, one per domain, persisted as JSON.
+    
+    A profile holds the title and content selectors that won the cascade on a
+    site, plus the novel titles seen under it (keyed by novel_key). Profiles are
+    only written when something new is learned; hit/miss counters live in memory.
+    """
+    
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self.profiles: dict = {}
+        self.fast_path_hits = 0
+        self.cascade_runs = 0
+        try:
+            self.profiles = json.loads(self.path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            pass
+    
+    def _save(self):
+        tmp_path = self.path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps(self.profiles, indent=2, ensure_ascii=False), encoding='utf-8')
+        os.replace(tmp_path, self.path)
+    
+    def lookup(self, url: str) -> Tuple[Optional[dict], Optional[str]]:
+        """Return (profile for url's domain, known novel title for url's novel)"""
+        domain = (urlsplit(url).hostname or '').lower()
+        with self._lock:
+            profile = self.profiles.get(domain)
+            if not profile:
+                return None, None
+            return profile, profile.get("novel_titles", {}).get(novel_key(url))
+    
+    def record(self, url: str, content: str, info: dict):
+        """Update the domain's profile from an extract_page() result"""
+        domain = (urlsplit(url).hostname or '').lower()
+        with self._lock:
+            if info.get("fast_path"):
+                self.fast_path_hits += 1
+            else:
+                self.cascade_runs += 1
+            
+            changed = False
+            profile = self.profiles.get(domain)
+            if not info.get("fast_path") and content and info.get("content_selector"):
+                # (Re)learn the winning selectors from a successful cascade
+                selectors = {"title_selector": info.get("title_selector"), "content_selector": info["content_selector"]}
+                if not profile or any(profile.get(k) != v for k, v in selectors.items()):
+                    profile = {**(profile or {"novel_titles": {}}), **selectors}
+                    self.profiles[domain] = profile
+                    changed = True
+            
+            novel_title = info.get("novel_title")
+            if profile and novel_title:
+                key = novel_key(url)
+                if profile.setdefault("novel_titles", {}).get(key) != novel_title:
+                    profile["novel_titles"][key] = novel_title
+                    changed = True
+            
+            if changed:
+                try:
+                    self._save()
+                except OSError as e:
+                    print(f"Could not save site profiles: {e}")
+    
+    def extract(self, html: bytes, url: str) -> Tuple[str, Optional[str]]:
+        """Extract (content, title), taking the domain's fast path when a profile exists"""
+        profile, novel_title = self.lookup(url)
+        content, chapter_title, info = extract_page(html, url, profile, novel_title)
+        self.record(url, content, info)
+        return content, chapter_title
+    
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "domains": len(self.profiles),
+                "fast_path_hits": self.fast_path_hits,
+                "cascade_runs": self.cascade_runs,
+            }
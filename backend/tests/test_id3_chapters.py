@@ -0,0 +1,109 @@
+import io
+import struct
+
+import pytest
+
+from id3_chapters import NO_OFFSET, chapter_tag, syncsafe
+from mp3_concat import FrameHeader, concat_mp3, id3v2_size, iter_frames
+
+def unsyncsafe(raw: bytes) -> int:
+    assert all(byte < 0x80 for byte in raw)
+    return (raw[0] << 21) | (raw[1] << 14) | (raw[2] << 7) | raw[3]
+
+def read_frames(data: bytes) -> list:
+    """(frame id, body) of each ID3v2.3 frame in data, stopping at padding"""
+    frames = []
+    offset = 0
+    while offset + 10 <= len(data) and data[offset:offset + 4] != bytes(4):
+        frame_id = data[offset:offset + 4]
+        size, flags = struct.unpack(">IH", data[offset + 4:offset + 10])
+        assert flags == 0
+        frames.append((frame_id, data[offset + 10:offset + 10 + size]))
+        offset += 10 + size
+    assert not any(data[offset:])  # Only zero padding after the last frame
+    return frames
+
+def read_text(body: bytes) -> str:
+    assert body[0] == 0x01  # UTF-16 with BOM
+    return body[1:].decode("utf-16")
+
+def parse_tag(tag: bytes) -> dict:
+    assert tag[:6] == b"ID3\x03\x00\x00"
+    assert unsyncsafe(tag[6:10]) == len(tag) - 10
+    result = {"title": None, "toc": None, "chapters": []}
+    for frame_id, body in read_frames(tag[10:]):
+        if frame_id == b"TIT2":
+            result["title"] = read_text(body)
+        elif frame_id == b"CTOC":
+            element_id, body = body.split(b"\x00", 1)
+            assert element_id == b"toc"
+            flags, count = body[0], body[1]
+            assert flags == 0x03  # Top level, ordered
+            children = body[2:].split(b"\x00")
+            assert children[-1] == b""
+            assert len(children) - 1 == count
+            result["toc"] = children[:-1]
+        elif frame_id == b"CHAP":
+            element_id, body = body.split(b"\x00", 1)
+            start_ms, end_ms, start_offset, end_offset = struct.unpack(">IIII", body[:16])
+            assert (start_offset, end_offset) == (NO_OFFSET, NO_OFFSET)
+            (sub_id, sub_body), = read_frames(body[16:])
+            assert sub_id == b"TIT2"
+            result["chapters"].append((element_id, read_text(sub_body), start_ms, end_ms))
+    return result
+
+@pytest.mark.parametrize("value", [0, 1, 127, 128, 300, 2 ** 21 + 5, 2 ** 28 - 1])
+def test_syncsafe_round_trip(value):
+    assert unsyncsafe(syncsafe(value)) == value
+
+def test_chapter_tag_round_trip():
+    chapters = [("Chapter 1: Départ", 0, 61250), ("Chapter 2 — 北", 61250, 125000), ("Epilogue", 125000, 130500)]
+    tag = chapter_tag(chapters, "Novel Batch 1")
+    
+    parsed = parse_tag(tag)
+    
+    assert parsed["title"] == "Novel Batch 1"
+    assert parsed["toc"] == [b"ch0", b"ch1", b"ch2"]
+    assert parsed["chapters"] == [
+        (b"ch0", "Chapter 1: Départ", 0, 61250),
+        (b"ch1", "Chapter 2 — 北", 61250, 125000),
+        (b"ch2", "Epilogue", 125000, 130500),
+    ]
+
+def test_chapter_tag_padding_keeps_size():
+    titles = ["One", "Two", "Three"]
+    placeholder = chapter_tag([(title, 0, 0) for title in titles])
+    final = chapter_tag([(title, index * 1000, (index + 1) * 1000) for index, title in enumerate(titles)],
+                        size=len(placeholder))
+    assert len(final) == len(placeholder)
+    
+    padded = chapter_tag([("One", 0, 1000)], size=4096)
+    assert len(padded) == 4096
+    assert unsyncsafe(padded[6:10]) == 4096 - 10
+    assert parse_tag(padded)["chapters"] == [(b"ch0", "One", 0, 1000)]
+
+def test_concat_writes_chapters_at_frame_boundaries(tmp_path):
+    header = bytes([0xFF, 0xFB, 0x90, 0xC0])  # MPEG-1 Layer III, 128 kbps, 44.1 kHz, mono
+    frame = header + bytes(FrameHeader(header).length - 4)
+    sources = []
+    for index, frame_count in enumerate([3, 0, 5]):
+        source = tmp_path / f"chapter_{index}.mp3"
+        source.write_bytes(frame * frame_count)
+        sources.append(source)
+    destination = tmp_path / "batch.mp3"
+    
+    concat_mp3(sources, destination, ["First", "Empty", "Third"], "Batch")
+    
+    data = destination.read_bytes()
+    tag_size = id3v2_size(data)
+    parsed = parse_tag(data[:tag_size])
+    frame_ms = 1152 / 44100 * 1000
+    assert parsed["title"] == "Batch"
+    # A source without audio gets no chapter; the tag keeps its reserved size as padding
+    assert parsed["toc"] == [b"ch0", b"ch1"]
+    assert parsed["chapters"] == [
+        (b"ch0", "First", 0, round(3 * frame_ms)),
+        (b"ch1", "Third", round(3 * frame_ms), round(8 * frame_ms)),
+    ]
+    # The audio still parses after the tag: the Xing frame plus 8 frames
+    assert len(list(iter_frames(io.BytesIO(data)))) == 9
@@ -0,0 +1,127 @@
+import io
+import struct
+
+import pytest
+
+from mp3_concat import (FrameHeader, concat_mp3, id3v2_size, is_info_frame, iter_frames, mp3_duration,
+                        parse_header, xing_frame)
+
+# MPEG-1 Layer III, no CRC, 44.1 kHz, mono; the third byte's high nibble is the bitrate index
+HEADER_128K = bytes([0xFF, 0xFB, 0x90, 0xC0])  # 128 kbps: 417-byte frames
+HEADER_64K = bytes([0xFF, 0xFB, 0x50, 0xC0])  # 64 kbps: 208-byte frames
+SAMPLES_PER_FRAME = 1152
+SAMPLE_RATE = 44100
+
+def make_frame(header: bytes = HEADER_128K, fill: int = 0x55) -> bytes:
+    return header + bytes([fill]) * (FrameHeader(header).length - 4)
+
+def id3v2_tag(body: bytes) -> bytes:
+    size = len(body)
+    return b"ID3\x03\x00\x00" + bytes([(size >> 21) & 0x7F, (size >> 14) & 0x7F, (size >> 7) & 0x7F, size & 0x7F]) + body
+
+def info_frame(frames: int, vbr: bool = False) -> bytes:
+    """An Info/Xing frame claiming a (wrong) frame count, as a single-file encoder writes it"""
+    return xing_frame(FrameHeader(HEADER_128K), frames, 123456, bytes(100), vbr)
+
+def xing_fields(frame: bytes):
+    offset = FrameHeader(frame[:4]).side_info_end
+    tag = frame[offset:offset + 4]
+    flags, frames, total_bytes = struct.unpack(">III", frame[offset + 4:offset + 16])
+    return tag, flags, frames, total_bytes
+
+def test_parse_header_fields():
+    header = parse_header(HEADER_128K)
+    assert header.mpeg1 and header.layer == 3 and not header.protected
+    assert header.bitrate == 128000
+    assert header.sample_rate == SAMPLE_RATE
+    assert header.samples == SAMPLES_PER_FRAME
+    assert header.length == 417
+    assert parse_header(HEADER_128K[:2] + bytes([0x92, 0xC0])).length == 418  # Padding bit
+
+@pytest.mark.parametrize("raw", [
+    b"\xff\xfb\x90",  # Too short
+    b"\xfe\xfb\x90\xc0",  # No frame sync
+    b"\xff\x1b\x90\xc0",  # Sync bits incomplete
+    b"\xff\xeb\x90\xc0",  # Reserved MPEG version
+    b"\xff\xf9\x90\xc0",  # Reserved layer
+    b"\xff\xfb\xf0\xc0",  # Bad bitrate index
+    b"\xff\xfb\x00\xc0",  # Free format
+    b"\xff\xfb\x9c\xc0",  # Reserved sample rate
+])
+def test_parse_header_rejects_invalid(raw):
+    assert parse_header(raw) is None
+
+def test_iter_frames_yields_each_frame():
+    frames = [make_frame(fill=0x11), make_frame(HEADER_64K, fill=0x22), make_frame(fill=0x33)]
+    result = list(iter_frames(io.BytesIO(b"".join(frames))))
+    assert [frame for _, frame in result] == frames
+    assert [header.bitrate for header, _ in result] == [128000, 64000, 128000]
+
+def test_iter_frames_resyncs_after_junk():
+    first, second = make_frame(fill=0x11), make_frame(fill=0x22)
+    # Junk includes a lone 0xFF that is not a frame header
+    data = b"\x00\x01junk\xff\x00" + first + b"\xff\x00garbage\xff" + second
+    assert [frame for _, frame in iter_frames(io.BytesIO(data))] == [first, second]
+
+def test_iter_frames_skips_id3v2_tag():
+    # The tag body contains a valid-looking frame header, which must not be taken for audio
+    tag = id3v2_tag(b"TIT2" + make_frame(fill=0x44)[:40] + bytes(300))
+    frame = make_frame(fill=0x11)
+    assert id3v2_size(tag + frame) == len(tag)
+    assert [f for _, f in iter_frames(io.BytesIO(tag + frame))] == [frame]
+
+def test_id3v2_size_counts_footer():
+    tag = bytearray(id3v2_tag(bytes(20)))
+    tag[5] = 0x10  # Footer present
+    assert id3v2_size(bytes(tag)) == 10 + 20 + 10
+    assert id3v2_size(b"ID3") == 0
+    assert id3v2_size(make_frame()) == 0
+
+def test_iter_frames_stops_at_trailing_tag_and_truncated_frame():
+    frame = make_frame(fill=0x11)
+    tagged = frame + b"TAG" + bytes(125)
+    assert [f for _, f in iter_frames(io.BytesIO(tagged))] == [frame]
+    truncated = frame + make_frame(fill=0x22)[:100]
+    assert [f for _, f in iter_frames(io.BytesIO(truncated))] == [frame]
+
+def test_is_info_frame():
+    assert is_info_frame(FrameHeader(HEADER_128K), info_frame(10))
+    assert is_info_frame(FrameHeader(HEADER_128K), info_frame(10, vbr=True))
+    assert not is_info_frame(FrameHeader(HEADER_128K), make_frame())
+
+def test_concat_rewrites_frame_count(tmp_path):
+    # Each source carries an Info frame with its own, here deliberately wrong, count
+    first = tmp_path / "first.mp3"
+    second = tmp_path / "second.mp3"
+    first.write_bytes(id3v2_tag(bytes(64)) + info_frame(999) + make_frame(fill=0x11) * 3)
+    second.write_bytes(info_frame(777) + make_frame(fill=0x22) * 5)
+    destination = tmp_path / "combined.mp3"
+    
+    result = concat_mp3([first, second], destination)
+    
+    assert result["frames"] == 8
+    assert [source["frames"] for source in result["sources"]] == [3, 5]
+    data = destination.read_bytes()
+    frames = [frame for _, frame in iter_frames(io.BytesIO(data))]
+    assert len(frames) == 9  # New Info frame + audio; the sources' Info frames are dropped
+    tag, flags, frame_count, total_bytes = xing_fields(frames[0])
+    assert tag == b"Info"  # Constant bitrate
+    assert flags & 0x7 == 0x7
+    assert frame_count == 8
+    assert total_bytes == len(data)
+    assert frames[1:] == [make_frame(fill=0x11)] * 3 + [make_frame(fill=0x22)] * 5
+    assert mp3_duration(destination) == pytest.approx(8 * SAMPLES_PER_FRAME / SAMPLE_RATE)
+
+def test_concat_marks_mixed_bitrates_as_vbr(tmp_path):
+    first = tmp_path / "first.mp3"
+    second = tmp_path / "second.mp3"
+    first.write_bytes(make_frame() * 2)
+    second.write_bytes(make_frame(HEADER_64K) * 2)
+    destination = tmp_path / "combined.mp3"
+    
+    concat_mp3([first, second, tmp_path / "missing.mp3"], destination)
+    
+    first_frame = next(iter_frames(io.BytesIO(destination.read_bytes())))[1]
+    tag, _, frame_count, _ = xing_fields(first_frame)
+    assert tag == b"Xing"
+    assert frame_count == 4
@@ -0,0 +1,119 @@
+import pytest
+from starlette.applications import Starlette
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from range_file import MAX_RANGES, RangeFileResponse, RangeNotSatisfiable, parse_ranges
+
+SIZE = 1000
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", [(0, 100)]),
+    ("bytes=500-500", [(500, 501)]),
+    ("bytes=900-5000", [(900, 1000)]),  # End past the file is clamped
+    ("BYTES = 10-19", [(10, 20)]),
+])
+def test_closed_ranges(header, expected):
+    assert parse_ranges(header, SIZE) == expected
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=-100", [(900, 1000)]),
+    ("bytes=-1", [(999, 1000)]),
+    ("bytes=-5000", [(0, 1000)]),  # Suffix longer than the file means the whole file
+])
+def test_suffix_ranges(header, expected):
+    assert parse_ranges(header, SIZE) == expected
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=900-", [(900, 1000)]),
+    ("bytes=0-", [(0, 1000)]),
+    ("bytes=999-", [(999, 1000)]),
+])
+def test_open_ended_ranges(header, expected):
+    assert parse_ranges(header, SIZE) == expected
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99,50-149", [(0, 150)]),
+    ("bytes=0-99,100-199", [(0, 200)]),  # Adjacent ranges merge too
+    ("bytes=300-399,0-99,50-149,-50", [(0, 150), (300, 400), (950, 1000)]),  # Sorted
+    ("bytes=0-499,100-199", [(0, 500)]),  # Contained range
+    ("bytes=1500-1600,0-9", [(0, 10)]),  # Ranges past the end are dropped when another one is satisfiable
+])
+def test_multiple_and_overlapping_ranges(header, expected):
+    assert parse_ranges(header, SIZE) == expected
+
+@pytest.mark.parametrize("header", [
+    "bytes=1000-1100",
+    "bytes=1000-",
+    "bytes=-0",
+    "bytes=2000-3000,1000-",
+])
+def test_unsatisfiable_ranges(header):
+    with pytest.raises(RangeNotSatisfiable):
+        parse_ranges(header, SIZE)
+
+@pytest.mark.parametrize("header", [
+    "items=0-99",
+    "bytes=",
+    "bytes",
+    "bytes=100",
+    "bytes=abc-def",
+    "bytes=10-x",
+    "bytes=-",
+    "bytes=99-10",
+    "bytes=0-9,oops",
+    "bytes=" + ",".join(f"{start}-{start}" for start in range(MAX_RANGES + 1)),
+])
+def test_malformed_headers_are_ignored(header):
+    assert parse_ranges(header, SIZE) is None
+
+@pytest.fixture
+def client(tmp_path):
+    path = tmp_path / "audio.mp3"
+    path.write_bytes(bytes(range(256)) * 4)  # 1024 bytes
+    
+    async def download(request):
+        return RangeFileResponse(path, media_type="audio/mpeg", filename="audio.mp3")
+    
+    app = Starlette(routes=[Route("/audio", download, methods=["GET", "HEAD"])])
+    with TestClient(app) as test_client:
+        test_client.body = path.read_bytes()
+        yield test_client
+
+def test_single_range_response(client):
+    response = client.get("/audio", headers={"Range": "bytes=-24"})
+    assert response.status_code == 206
+    assert response.headers["content-range"] == "bytes 1000-1023/1024"
+    assert response.headers["content-length"] == "24"
+    assert response.content == client.body[1000:]
+
+def test_multi_range_response(client):
+    response = client.get("/audio", headers={"Range": "bytes=0-9,5-19,100-"})
+    assert response.status_code == 206
+    assert response.headers["content-type"].startswith("multipart/byteranges; boundary=")
+    assert int(response.headers["content-length"]) == len(response.content)
+    assert b"Content-Range: bytes 0-19/1024\r\n\r\n" + client.body[:20] in response.content
+    assert b"Content-Range: bytes 100-1023/1024\r\n\r\n" + client.body[100:] in response.content
+
+def test_unsatisfiable_range_is_416(client):
+    response = client.get("/audio", headers={"Range": "bytes=2000-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == "bytes */1024"
+    assert response.content == b""
+
+@pytest.mark.parametrize("header", ["bytes=oops", "lines=0-9", "bytes=50-10"])
+def test_malformed_range_falls_back_to_full_file(client, header):
+    response = client.get("/audio", headers={"Range": header})
+    assert response.status_code == 200
+    assert "content-range" not in response.headers
+    assert response.content == client.body
+
+def test_stale_if_range_sends_full_file(client):
+    response = client.get("/audio", headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+    assert response.status_code == 200
+    assert response.content == client.body
+    etag = response.headers["etag"]
+    
+    response = client.get("/audio", headers={"Range": "bytes=0-9", "If-Range": etag})
+    assert response.status_code == 206
+    assert response.content == client.body[:10]
@@ -0,0 +1,246 @@
+"""
+TOC crawler - follow table-of-contents pagination and keep a per-novel chapter index
+"""
+
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+from bs4 import BeautifulSoup
+
+from extraction import get_novel_title
+
+CHAPTER_NUM = re.compile(r'chapter[_-]?(\d+)', re.I)
+TITLE_NUM = re.compile(r'(?:chapter|ch\.?|episode)\s*(\d+)', re.I)
+PAGE_NUM = re.compile(r'([?&](?:page|p)=|/page[/-])(\d+)', re.I)
+
+MAX_TOC_PAGES = 500
+
+def toc_key(toc_url: str) -> str:
+    """Index key for a novel: its TOC URL without the fragment"""
+    return toc_url.split('#')[0].rstrip('/')
+
+def chapter_number(url: str, title: str = "") -> Optional[int]:
+    """Chapter number from the URL, or failing that from the link text"""
+    match = CHAPTER_NUM.search(url) or TITLE_NUM.search(title or "")
+    return int(match.group(1)) if match else None
+
+def extract_chapter_links(soup: BeautifulSoup, base_url: str) -> List[Tuple[str, str]]:
+    """(url, link text) of every chapter link on a TOC page, in page order"""
+    chapter_links = []
+    seen_urls = set()
+    
+    for link in soup.find_all('a', href=True):
+        href = link.get('href', '')
+        text = link.get_text(strip=True)
+        
+        is_chapter = False
+        if re.search(r'chapter|ch\.|episode', href, re.I) or \
+           re.search(r'chapter|ch\.|episode', text, re.I):
+            is_chapter = True
+        
+        if re.search(r'/chapter[_-]?\d+', href, re.I):
+            is_chapter = True
+        
+        if is_chapter:
+            if href.startswith('/'):
+                full_url = base_url + href
+            elif href.startswith('http'):
+                full_url = href
+            elif not href.startswith('#'):
+                full_url = base_url + '/' + href.lstrip('/')
+            else:
+                continue
+            
+            full_url = full_url.split('#')[0].split('?')[0]
+            if full_url not in seen_urls and 'chapter' in full_url.lower():
+                seen_urls.add(full_url)
+                chapter_links.append((full_url, text))
+    
+    return chapter_links
+
+def find_pagination(soup: BeautifulSoup, page_url: str) -> dict:
+    """Describe the TOC pagination on a page
+    
+    Returns {"template": URL with {n} for the page number or None,
+    "last_page": highest page number linked or None, "next_url": rel=next/"Next" link or None}.
+    """
+    template = None
+    last_page = None
+    for link in soup.select('.pagination a[href], .page-nav a[href], .pager a[href], nav a[href], a[href*="page"]'):
+        href = urljoin(page_url, link['href'])
+        match = PAGE_NUM.search(href)
+        if not match:
+            continue
+        number = int(match.group(2))
+        if last_page is None or number > last_page:
+            last_page = number
+        if template is None:
+            template = href[:match.start(2)] + '{n}' + href[match.end(2):]
+    
+    next_url = None
+    next_link = soup.select_one('link[rel~="next"][href], a[rel~="next"][href], li.next a[href], a.next[href]')
+    if not next_link:
+        for link in soup.select('.pagination a[href], .page-nav a[href], .pager a[href]'):
+            if re.fullmatch(r'next\W*|[›»>]+', link.get_text(strip=True), re.I):
+                next_link = link
+                break
+    if next_link:
+        next_url = urljoin(page_url, next_link['href'])
+    
+    return {"template": template, "last_page": last_page, "next_url": next_url}
+
+def find_ajax_archive(soup: BeautifulSoup, page_url: str) -> Optional[str]:
+    """URL of an AJAX chapter list (NovelBin-style data-novel-id), if the page uses one"""
+    holder = soup.select_one('[data-novel-id]')
+    if holder and holder.get('data-novel-id'):
+        parts = urlsplit(page_url)
+        return f"{parts.scheme}://{parts.netloc}/ajax/chapter-archive?novelId={holder['data-novel-id']}"
+    return None
+
+class ChapterIndex:
+    """SQLite store of every chapter seen per novel (number, URL, title, first-seen time)
+    
+    Also remembers how far the TOC pagination went, so a refresh can start at
+    the last known page instead of page 2.
+    """
+    
+    def __init__(self, db_path: Path):
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS novels (
+                novel_key TEXT PRIMARY KEY,
+                toc_url TEXT NOT NULL,
+                title TEXT,
+                last_page INTEGER,
+                last_page_url TEXT,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS chapters (
+                novel_key TEXT NOT NULL,
+                url TEXT NOT NULL,
+                number INTEGER,
+                title TEXT,
+                first_seen REAL NOT NULL,
+                PRIMARY KEY (novel_key, url)
+            );
+        """)
+        self._conn.commit()
+    
+    def get_novel(self, novel_key: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT toc_url, title, last_page, last_page_url, updated_at FROM novels WHERE novel_key = ?",
+                (novel_key,),
+            ).fetchone()
+        if not row:
+            return None
+        return {"toc_url": row[0], "title": row[1], "last_page": row[2], "last_page_url": row[3], "updated_at": row[4]}
+    
+    def update_novel(self, novel_key: str, toc_url: str, title: Optional[str], last_page: Optional[int], last_page_url: Optional[str]):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO novels VALUES (?, ?, ?, ?, ?, ?)",
+                (novel_key, toc_url, title, last_page, last_page_url, time.time()),
+            )
+            self._conn.commit()
+    
+    def add_chapters(self, novel_key: str, links: List[Tuple[str, str]]) -> int:
+        """Insert chapters not seen before; returns how many were new"""
+        now = time.time()
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO chapters VALUES (?, ?, ?, ?, ?)",
+                [(novel_key, url, chapter_number(url, title), title, now) for url, title in links],
+            )
+            self._conn.commit()
+            return self._conn.total_changes - before
+    
+    def chapters(self, novel_key: str) -> List[dict]:
+        """Every indexed chapter, ordered by chapter number (unnumbered ones last, in discovery order)"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT number, url, title, first_seen FROM chapters WHERE novel_key = ? "
+                "ORDER BY number IS NULL, number, rowid",
+                (novel_key,),
+            ).fetchall()
+        return [{"number": r[0], "url": r[1], "title": r[2], "first_seen": r[3]} for r in rows]
+
+def crawl_toc(fetch_page: Callable[[str], Optional[bytes]], toc_url: str, base_url: str,
+              index: ChapterIndex, max_pages: int = MAX_TOC_PAGES) -> dict:
+    """Crawl (or incrementally refresh) a novel's TOC into the index
+    
+    fetch_page(url) returns the page body or None. The first TOC page is always
+    fetched, since it tells us the current last page (and holds the newest
+    chapters on newest-first sites). An AJAX chapter archive replaces pagination
+    entirely. Otherwise only pages from the last one seen on the previous crawl
+    onwards are fetched, so refreshing an ongoing novel usually costs one or two
+    requests.
+    """
+    key = toc_key(toc_url)
+    known = index.get_novel(key)
+    pages_fetched = 0
+    new_chapters = 0
+    
+    body = fetch_page(toc_url)
+    pages_fetched += 1
+    if body is None:
+        raise ValueError(f"Could not fetch table of contents: {toc_url}")
+    soup = BeautifulSoup(body, 'html.parser')
+    novel_title = get_novel_title(soup, toc_url)
+    new_chapters += index.add_chapters(key, extract_chapter_links(soup, base_url))
+    
+    last_page = known["last_page"] if known else None
+    last_page_url = known["last_page_url"] if known else None
+    
+    ajax_url = find_ajax_archive(soup, toc_url)
+    ajax_body = fetch_page(ajax_url) if ajax_url else None
+    if ajax_url:
+        pages_fetched += 1
+    
+    if ajax_body is not None:
+        new_chapters += index.add_chapters(key, extract_chapter_links(BeautifulSoup(ajax_body, 'html.parser'), base_url))
+    else:
+        pagination = find_pagination(soup, toc_url)
+        if pagination["template"] and pagination["last_page"]:
+            # Numbered pages: re-read from the last page we had (it may have grown) to the current last page
+            first = max(2, last_page or 2)
+            final = min(pagination["last_page"], first + max_pages - 1)
+            for number in range(first, final + 1):
+                page_url = pagination["template"].format(n=number)
+                page_body = fetch_page(page_url)
+                pages_fetched += 1
+                if page_body is None:
+                    break
+                new_chapters += index.add_chapters(key, extract_chapter_links(BeautifulSoup(page_body, 'html.parser'), base_url))
+                last_page, last_page_url = number, page_url
+        elif pagination["next_url"]:
+            # Only "next" links: resume from the last page we reached before
+            page_url = last_page_url or pagination["next_url"]
+            visited = {toc_key(toc_url)}
+            while page_url and toc_key(page_url) not in visited and len(visited) <= max_pages:
+                visited.add(toc_key(page_url))
+                page_body = fetch_page(page_url)
+                pages_fetched += 1
+                if page_body is None:
+                    break
+                page_soup = BeautifulSoup(page_body, 'html.parser')
+                new_chapters += index.add_chapters(key, extract_chapter_links(page_soup, base_url))
+                last_page_url = page_url
+                page_url = find_pagination(page_soup, page_url)["next_url"]
+    
+    index.update_novel(key, toc_url, novel_title, last_page, last_page_url)
+    return {
+        "novel_title": novel_title,
+        "chapters": index.chapters(key),
+        "new_chapters": new_chapters,
+        "pages_fetched": pages_fetched,
+    }
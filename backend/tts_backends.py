@@ -0,0 +1,197 @@
+"""
+TTS backends - one interface (stream / list voices) over Edge TTS and a local offline engine
+"""
+
+import asyncio
+import importlib.util
+from abc import ABC, abstractmethod
+import io
+import os
+import tempfile
+import threading
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import AsyncIterator, List, Optional
+
+import edge_tts
+
+from mp3_concat import is_info_frame, iter_frames
+
+DEFAULT_TTS_BACKEND = "edge"
+
+# Worker processes for the local engine (one synthesis per core)
+DEFAULT_LOCAL_TTS_WORKERS = os.cpu_count() or 1
+
+# The local engine's output is encoded to the same format Edge returns, so files from either backend combine alike
+LOCAL_MP3_BITRATE = 48
+LOCAL_BASE_WORDS_PER_MINUTE = 200
+
+# Pitch is requested in percent (like rate and volume) but edge_tts only takes a shift in Hz;
+# percentages are taken of a typical speaking pitch
+EDGE_PITCH_REFERENCE_HZ = 200
+
+def edge_pitch(pitch: int) -> str:
+    """edge_tts pitch argument ("+20Hz") for a pitch change in percent"""
+    return f"{round(pitch * EDGE_PITCH_REFERENCE_HZ / 100):+d}Hz"
+
+class TTSBackend(ABC):
+    """A speech engine producing headerless MP3 frames (so chunks can be joined byte for byte)"""
+    
+    name = ""
+    
+    def unavailable_reason(self) -> Optional[str]:
+        """Why the backend cannot be used here (missing dependency...), or None"""
+        return None
+    
+    @abstractmethod
+    def stream(self, text: str, voice: str, rate: int = 0, pitch: int = 0, volume: int = 0) -> AsyncIterator[bytes]:
+        """Synthesize one chunk of text, yielding MP3 data as it arrives"""
+    
+    @abstractmethod
+    async def list_voices(self) -> List[dict]:
+        """Voices in Edge's format (ShortName, FriendlyName, Locale, Gender)"""
+
+class EdgeBackend(TTSBackend):
+    """Microsoft Edge online TTS (edge_tts)"""
+    
+    name = "edge"
+    
+    async def stream(self, text: str, voice: str, rate: int = 0, pitch: int = 0, volume: int = 0) -> AsyncIterator[bytes]:
+        # Prosody goes in Communicate's own arguments: it escapes text and builds the SSML itself
+        communicate = edge_tts.Communicate(text=text, voice=voice, rate=f"{rate:+d}%", volume=f"{volume:+d}%",
+                                           pitch=edge_pitch(pitch))
+        async for chunk in communicate.stream():
+            if chunk["type"] == "audio":
+                yield chunk["data"]
+    
+    async def list_voices(self) -> List[dict]:
+        return await edge_tts.list_voices()
+
+# Per-process pyttsx3 engine (and its voice list) of the local backend's workers
+_local_engine = None
+_local_voices: Optional[List[dict]] = None
+
+def _get_local_engine():
+    global _local_engine
+    if _local_engine is None:
+        import pyttsx3
+        _local_engine = pyttsx3.init()
+    return _local_engine
+
+def _local_voice_list() -> List[dict]:
+    global _local_voices
+    if _local_voices is not None:
+        return _local_voices
+    voices = []
+    for voice in _get_local_engine().getProperty('voices'):
+        languages = [language.decode('utf-8', 'ignore') if isinstance(language, bytes) else str(language)
+                     for language in (voice.languages or [])]
+        locale = languages[0].lstrip('\x05').replace('_', '-') if languages else ""
+        voices.append({
+            "ShortName": voice.id,
+            "FriendlyName": voice.name,
+            "Locale": locale,
+            "Gender": (voice.gender or "").title(),
+        })
+    _local_voices = voices
+    return voices
+
+def _resolve_local_voice(voice: str) -> Optional[str]:
+    """Engine voice id for voice: an exact id or name, else the first voice of the same language"""
+    voices = _local_voice_list()
+    for entry in voices:
+        if voice in (entry["ShortName"], entry["FriendlyName"]):
+            return entry["ShortName"]
+    language = voice.split('-', 1)[0].lower()
+    for entry in voices:
+        if entry["Locale"].lower().startswith(language):
+            return entry["ShortName"]
+    return None
+
+def _encode_mp3(wav_path: str) -> bytes:
+    import lameenc
+    with wave.open(wav_path, 'rb') as wav:
+        encoder = lameenc.Encoder()
+        encoder.set_bit_rate(LOCAL_MP3_BITRATE)
+        encoder.set_in_sample_rate(wav.getframerate())
+        encoder.set_channels(wav.getnchannels())
+        encoder.set_quality(2)
+        pcm = wav.readframes(wav.getnframes())
+    mp3 = bytes(encoder.encode(pcm) + encoder.flush())
+    # Drop LAME's placeholder Info frame: chunks are joined byte for byte like Edge's
+    return b"".join(frame for header, frame in iter_frames(io.BytesIO(mp3)) if not is_info_frame(header, frame))
+
+def _synthesize_local(text: str, voice: str, rate: int, volume: int) -> bytes:
+    """Runs in a worker process: pyttsx3 to WAV, then LAME to MP3"""
+    engine = _get_local_engine()
+    voice_id = _resolve_local_voice(voice)
+    if voice_id:
+        engine.setProperty('voice', voice_id)
+    engine.setProperty('rate', int(LOCAL_BASE_WORDS_PER_MINUTE * (1 + rate / 100)))
+    engine.setProperty('volume', max(0.0, min(1.0, 1 + volume / 100)))
+    
+    handle, wav_path = tempfile.mkstemp(suffix='.wav')
+    os.close(handle)
+    try:
+        engine.save_to_file(text, wav_path)
+        engine.runAndWait()
+        return _encode_mp3(wav_path)
+    finally:
+        os.unlink(wav_path)
+
+class LocalBackend(TTSBackend):
+    """Offline synthesis with the system speech engine (pyttsx3: SAPI5, NSSpeechSynthesizer or eSpeak)
+    
+    Each chunk is synthesized in a process pool with one worker per core, so a
+    bulk job runs as fast as the machine allows instead of at the online
+    service's pace. Needs the optional pyttsx3 and lameenc packages. Pitch is
+    not supported by the engines and is ignored.
+    """
+    
+    name = "local"
+    
+    def __init__(self, workers: int = DEFAULT_LOCAL_TTS_WORKERS):
+        self.workers = max(1, workers)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._voices: Optional[List[dict]] = None
+    
+    def unavailable_reason(self) -> Optional[str]:
+        missing = [module for module in ("pyttsx3", "lameenc") if importlib.util.find_spec(module) is None]
+        if missing:
+            return f"missing optional dependencies: {', '.join(missing)} (pip install {' '.join(missing)})"
+        return None
+    
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._executor
+    
+    async def _run(self, func, *args):
+        executor = self._get_executor()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+        except BrokenProcessPool:
+            print("Local TTS worker died, restarting the pool")
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+    
+    async def stream(self, text: str, voice: str, rate: int = 0, pitch: int = 0, volume: int = 0) -> AsyncIterator[bytes]:
+        # The engines render a whole chunk at once, so the "stream" is a single piece
+        yield await self._run(_synthesize_local, text, voice, rate, volume)
+    
+    async def list_voices(self) -> List[dict]:
+        if self._voices is None:
+            self._voices = await self._run(_local_voice_list)
+        return self._voices
+    
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,134 @@
+"""
+TTS audio cache - content-addressed MP3 store on disk with a size budget and LRU eviction
+"""
+
+import hashlib
+import json
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+class TTSCache:
+    """Disk cache for synthesized audio keyed on (text, voice, rate, pitch, volume).
+    
+    Entries are stored as <dir>/<key[:2]>/<key>.mp3. Recency is kept in an
+    in-memory LRU index that is rebuilt from file mtimes on startup (a hit
+    touches the file), and the least recently used entries are evicted once
+    the total size exceeds max_bytes. Writes go through a temp file and
+    os.replace, so concurrent readers never see a partial entry.
+    """
+    
+    def __init__(self, cache_dir: Path, max_bytes: int):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._index: "OrderedDict[str, int]" = OrderedDict()  # key -> size, oldest first
+        self._size = 0
+        self._load_index()
+    
+    @staticmethod
+    def make_key(text: str, voice: str, rate: int = 0, pitch: int = 0, volume: int = 0, backend: str = "edge") -> str:
+        """Hash the synthesis parameters into a cache key (Edge keys leave the backend out, as before backends existed)"""
+        params = [text, voice, rate, pitch, volume] + ([backend] if backend != "edge" else [])
+        payload = json.dumps(params, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.mp3"
+    
+    def _load_index(self):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        entries = []
+        for path in self.cache_dir.glob("*/*.mp3"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, path.stem, stat.st_size))
+        entries.sort()
+        for _, key, size in entries:
+            self._index[key] = size
+            self._size += size
+    
+    def get(self, key: str) -> Optional[bytes]:
+        """Return cached audio for key, or None on a miss
+        
+        Only the index lookup and LRU update hold the lock; the file is read
+        outside it so concurrent lookups don't queue behind each other's disk reads.
+        """
+        with self._lock:
+            if key not in self._index:
+                self.misses += 1
+                return None
+            self._index.move_to_end(key)
+            path = self._path(key)
+        try:
+            data = path.read_bytes()
+            os.utime(path)
+        except OSError:
+            # Evicted meanwhile or removed behind our back
+            with self._lock:
+                if key in self._index and not path.exists():
+                    self._size -= self._index.pop(key)
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return data
+    
+    def put(self, key: str, data: bytes):
+        """Store audio for key and evict least recently used entries over the budget"""
+        if not data or len(data) > self.max_bytes:
+            return
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex[:8]}.tmp")
+        tmp_path.write_bytes(data)
+        with self._lock:
+            os.replace(tmp_path, path)
+            if key in self._index:
+                self._size -= self._index.pop(key)
+            self._index[key] = len(data)
+            self._size += len(data)
+            self._evict()
+    
+    def _evict(self):
+        while self._size > self.max_bytes and self._index:
+            key, size = self._index.popitem(last=False)
+            self._size -= size
+            self.evictions += 1
+            try:
+                self._path(key).unlink()
+            except OSError:
+                pass
+    
+    def clear(self):
+        """Remove every entry (counters are kept)"""
+        with self._lock:
+            for key in list(self._index):
+                try:
+                    self._path(key).unlink()
+                except OSError:
+                    pass
+            self._index.clear()
+            self._size = 0
+    
+    def stats(self) -> dict:
+        """Hit/miss counters and disk usage"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._index),
+                "size_bytes": self._size,
+                "max_bytes": self.max_bytes,
+            }
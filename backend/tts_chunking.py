@@ -0,0 +1,188 @@
+"""
+TTS chunking - split long chapters at sentence/paragraph boundaries and synthesize the pieces in parallel
+"""
+
+import asyncio
+import random
+import re
+from collections import deque
+from typing import AsyncIterator, Awaitable, Callable, List
+
+# Defaults (overridable per request)
+DEFAULT_CHUNK_CHARS = 3000
+DEFAULT_CHUNK_CONCURRENCY = 4
+DEFAULT_CHUNK_RETRIES = 3
+
+# A sentence ends with . ! ? or … optionally followed by closing quotes/brackets
+SENTENCE_END = re.compile(r'(?<=[.!?…])["\'”’)\]]*\s+')
+PARAGRAPH_BREAK = re.compile(r'\n\s*\n')
+
+class ChunkSynthesisError(Exception):
+    """Raised when a chunk still fails after all retries"""
+
+def split_sentences(text: str) -> List[str]:
+    """Split text into sentences, keeping the closing punctuation with each sentence"""
+    sentences = []
+    start = 0
+    for match in SENTENCE_END.finditer(text):
+        sentence = text[start:match.end()].strip()
+        if sentence:
+            sentences.append(sentence)
+        start = match.end()
+    tail = text[start:].strip()
+    if tail:
+        sentences.append(tail)
+    return sentences
+
+def split_long_sentence(sentence: str, max_chars: int) -> List[str]:
+    """Hard-split a sentence longer than max_chars at the last whitespace before the limit"""
+    pieces = []
+    while len(sentence) > max_chars:
+        cut = sentence.rfind(' ', 0, max_chars)
+        if cut <= 0:
+            cut = max_chars
+        pieces.append(sentence[:cut].strip())
+        sentence = sentence[cut:].strip()
+    if sentence:
+        pieces.append(sentence)
+    return pieces
+
+def split_text_into_chunks(text: str, max_chars: int = DEFAULT_CHUNK_CHARS) -> List[str]:
+    """Split text into chunks of at most max_chars.
+    
+    Chunks end on paragraph boundaries when possible, otherwise on sentence
+    boundaries; only a single sentence longer than max_chars is cut mid-sentence.
+    """
+    text = text.strip()
+    if not text:
+        return []
+    if len(text) <= max_chars:
+        return [text]
+    
+    chunks = []
+    current: List[str] = []
+    current_len = 0
+    
+    def flush():
+        nonlocal current, current_len
+        if current:
+            chunks.append(' '.join(current))
+        current = []
+        current_len = 0
+    
+    for paragraph in PARAGRAPH_BREAK.split(text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        
+        # A whole paragraph that fits goes in as one unit
+        if len(paragraph) <= max_chars:
+            units = [paragraph]
+        else:
+            units = []
+            for sentence in split_sentences(paragraph):
+                units.extend(split_long_sentence(sentence, max_chars))
+        
+        for unit in units:
+            if current and current_len + 1 + len(unit) > max_chars:
+                flush()
+            current.append(unit)
+            current_len += len(unit) + (1 if current_len else 0)
+    
+    flush()
+    return chunks
+
+async def synthesize_with_retry(
+    index: int,
+    chunks: List[str],
+    synthesize_chunk: Callable[[str], Awaitable[bytes]],
+    semaphore: asyncio.Semaphore,
+    retries: int = DEFAULT_CHUNK_RETRIES,
+) -> bytes:
+    """Synthesize chunks[index], retrying just this chunk with exponential backoff"""
+    last_error = None
+    for attempt in range(max(1, retries)):
+        if attempt:
+            await asyncio.sleep(min(8.0, 2 ** (attempt - 1)) + random.uniform(0, 0.5))
+        async with semaphore:
+            try:
+                audio = await synthesize_chunk(chunks[index])
+                if audio:
+                    return audio
+                last_error = "no audio received"
+            except Exception as e:
+                last_error = str(e)
+        print(f"TTS chunk {index + 1}/{len(chunks)} failed (attempt {attempt + 1}): {last_error}")
+    raise ChunkSynthesisError(f"Chunk {index + 1}/{len(chunks)} failed after {retries} attempts: {last_error}")
+
+async def synthesize_chunks(
+    chunks: List[str],
+    synthesize_chunk: Callable[[str], Awaitable[bytes]],
+    concurrency: int = DEFAULT_CHUNK_CONCURRENCY,
+    retries: int = DEFAULT_CHUNK_RETRIES,
+) -> List[bytes]:
+    """Synthesize chunks concurrently and return their audio in chunk order.
+    
+    Each chunk is retried on its own (with exponential backoff), so a transient
+    failure only redoes that chunk. Raises ChunkSynthesisError if a chunk keeps failing.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    tasks = [
+        asyncio.ensure_future(synthesize_with_retry(i, chunks, synthesize_chunk, semaphore, retries))
+        for i in range(len(chunks))
+    ]
+    try:
+        return await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+async def stream_chunks(
+    chunks: List[str],
+    stream_chunk: Callable[[str], AsyncIterator[bytes]],
+    synthesize_chunk: Callable[[str], Awaitable[bytes]],
+    concurrency: int = DEFAULT_CHUNK_CONCURRENCY,
+    retries: int = DEFAULT_CHUNK_RETRIES,
+) -> AsyncIterator[bytes]:
+    """Yield the audio of chunks in order, as early as possible.
+    
+    The first chunk is streamed live so playback can start right away, while
+    the following chunks are synthesized concurrently in a bounded window
+    behind it. If the live stream fails before sending anything, the first
+    chunk falls back to the retrying path.
+    """
+    if not chunks:
+        return
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    window = max(1, concurrency) * 2
+    pending: deque = deque()
+    next_index = 1
+    
+    def fill():
+        nonlocal next_index
+        while len(pending) < window and next_index < len(chunks):
+            pending.append(asyncio.ensure_future(
+                synthesize_with_retry(next_index, chunks, synthesize_chunk, semaphore, retries)
+            ))
+            next_index += 1
+    
+    try:
+        fill()
+        sent = False
+        try:
+            async for data in stream_chunk(chunks[0]):
+                sent = True
+                yield data
+        except Exception as e:
+            if sent:
+                raise
+            print(f"Live TTS stream failed, retrying first chunk: {e}")
+            yield await synthesize_with_retry(0, chunks, synthesize_chunk, semaphore, retries)
+        
+        while pending:
+            audio = await pending.popleft()
+            fill()
+            yield audio
+    finally:
+        for task in pending:
+            task.cancel()
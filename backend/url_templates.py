@@ -0,0 +1,75 @@
+"""
+Chapter URL templates - find which URL pattern a site uses by extracting its first chapters
+"""
+
+import hashlib
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Patterns tried when no chapter list is available ({url} = start URL, {base} = its parent)
+CHAPTER_URL_TEMPLATES = [
+    "{url}/{n}",
+    "{url}-{n}",
+    "{url}-chapter-{n}",
+    "{url}/chapter-{n}",
+    "{base}/{n}",
+    "{base}/chapter-{n}",
+]
+
+def candidate_urls(url: str, base_url: str, chapter_num: int) -> List[str]:
+    """Every templated URL for one chapter number"""
+    return [template.format(url=url, base=base_url, n=chapter_num) for template in CHAPTER_URL_TEMPLATES]
+
+def find_chapter_template(fetch_chapter: Callable[[str], tuple], url: str, base_url: str,
+                          first_chapter: int) -> Optional[str]:
+    """Return the first template whose URLs are real chapter pages for the first chapter(s) of a range, or None
+    
+    fetch_chapter(url) returns (content, title) with content None/empty when the
+    page is missing or extraction finds no chapter text in it. A template is
+    accepted when chapter N has chapter text and chapter N+1 either has none yet
+    or has different text. This rejects sites that answer 200 with a listing or
+    index page for unknown paths, and patterns that redirect every number to the
+    same page.
+    """
+    for template in CHAPTER_URL_TEMPLATES:
+        first, _ = fetch_chapter(template.format(url=url, base=base_url, n=first_chapter))
+        if not first:
+            continue
+        second, _ = fetch_chapter(template.format(url=url, base=base_url, n=first_chapter + 1))
+        if second != first:
+            return template
+    return None
+
+def generate_chapter_urls(fetch_chapter: Callable[[str], tuple], url: str, base_url: str,
+                          start_chapter: int, end_chapter: int) -> List[str]:
+    """Chapter URLs for a numeric range: one per chapter if a template's pages extract, all candidates otherwise"""
+    template = find_chapter_template(fetch_chapter, url, base_url, start_chapter)
+    if template:
+        print(f"Using chapter URL template {template}")
+        return [template.format(url=url, base=base_url, n=n) for n in range(start_chapter, end_chapter + 1)]
+    
+    print("No chapter URL template matched, trying every candidate")
+    chapter_urls = []
+    for chapter_num in range(start_chapter, end_chapter + 1):
+        chapter_urls.extend(candidate_urls(url, base_url, chapter_num))
+    return chapter_urls
+
+def content_digest(content: str) -> str:
+    """Hex digest identifying a chapter's text"""
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+class ChapterDeduper:
+    """Spots chapters whose text was already seen (e.g. two candidate URLs redirecting to one page)"""
+    
+    def __init__(self, seen: Iterable[Tuple[str, str]] = ()):
+        # content_digest() -> URL of the chapter kept with that text (including ones kept before a job resumed)
+        self._seen: Dict[str, str] = dict(seen)
+    
+    def duplicate_of(self, content: Optional[str], url: str) -> Optional[str]:
+        """URL of an earlier chapter with the same text, or None (and content is remembered as url's)"""
+        if not content:
+            return None
+        digest = content_digest(content)
+        if digest in self._seen:
+            return self._seen[digest]
+        self._seen[digest] = url
+        return None
@@ -0,0 +1,104 @@
+"""
+Voice catalogue - in-memory + on-disk cache of the TTS voice list with locale indexes
+"""
+
+import asyncio
+import json
+import os
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
+
+DEFAULT_VOICE_TTL = 24 * 3600  # The voice list changes a few times a year
+RETRY_AFTER_FAILURE = 300  # Don't hammer the service while offline
+
+class VoiceCatalog:
+    """Serves the voice list from memory, refreshing it in the background.
+    
+    The catalogue is loaded from the last disk snapshot when available, so the
+    endpoint keeps working offline. Once the data is older than ttl, callers
+    still get the cached list immediately while a single background task fetches
+    a new one. Locale and language-prefix indexes are built once per refresh, so
+    a filtered request is a dict lookup.
+    """
+    
+    def __init__(self, fetch_voices: Callable[[], Awaitable[List[dict]]], snapshot_path: Path, ttl: float = DEFAULT_VOICE_TTL):
+        self.fetch_voices = fetch_voices
+        self.snapshot_path = Path(snapshot_path)
+        self.ttl = ttl
+        self.voices: List[dict] = []
+        self.fetched_at = 0.0
+        self.by_locale: Dict[str, List[dict]] = {}
+        self.by_language: Dict[str, List[dict]] = {}
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._next_attempt = 0.0
+        self._load_snapshot()
+    
+    def _build_indexes(self, voices: List[dict]):
+        by_locale: Dict[str, List[dict]] = {}
+        by_language: Dict[str, List[dict]] = {}
+        for voice in voices:
+            locale = voice.get("Locale", "")
+            by_locale.setdefault(locale, []).append(voice)
+            by_language.setdefault(locale.split('-', 1)[0], []).append(voice)
+        # Swap in all at once so readers never see a half-built index
+        self.voices, self.by_locale, self.by_language = voices, by_locale, by_language
+    
+    def _load_snapshot(self):
+        try:
+            snapshot = json.loads(self.snapshot_path.read_text(encoding='utf-8'))
+            self._build_indexes(snapshot["voices"])
+            self.fetched_at = snapshot.get("fetched_at", 0.0)
+        except (OSError, ValueError, KeyError):
+            pass
+    
+    def _save_snapshot(self):
+        tmp_path = self.snapshot_path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps({"fetched_at": self.fetched_at, "voices": self.voices}), encoding='utf-8')
+        os.replace(tmp_path, self.snapshot_path)
+    
+    @property
+    def is_stale(self) -> bool:
+        return time.time() - self.fetched_at > self.ttl
+    
+    async def refresh(self):
+        """Fetch the voice list now and update memory and the disk snapshot"""
+        voices = await self.fetch_voices()
+        self.fetched_at = time.time()
+        self._build_indexes(voices)
+        try:
+            await asyncio.to_thread(self._save_snapshot)
+        except OSError as e:
+            print(f"Could not save voice snapshot: {e}")
+    
+    async def _background_refresh(self):
+        try:
+            await self.refresh()
+        except Exception as e:
+            # Offline or service error: keep serving the last snapshot
+            self._next_attempt = time.time() + RETRY_AFTER_FAILURE
+            print(f"Voice list refresh failed, serving cached list: {e}")
+    
+    def refresh_in_background(self):
+        """Start a background refresh unless one is already running"""
+        if time.time() < self._next_attempt:
+            return
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.ensure_future(self._background_refresh())
+    
+    async def get_voices(self, locale: Optional[str] = None) -> List[dict]:
+        """Return all voices, or the voices for a locale ("en-US") or language ("en")"""
+        if not self.voices:
+            # Nothing cached yet: this request has to wait for the network
+            await self.refresh()
+        elif self.is_stale:
+            self.refresh_in_background()
+        
+        if not locale:
+            return self.voices
+        # "en-US" and "en-GB" have always meant "all English voices"
+        if locale in ("en-US", "en-GB"):
+            locale = "en"
+        if '-' not in locale:
+            return self.by_language.get(locale, [])
+        return self.by_locale.get(locale, [])
@@ -299,9 +299,9 @@ function AllInOneView({ onBack }) {
             // Reload projects
             loadProjects()
             
-            // Get list of generated files
+            // Get list of the files this job generated (the library may hold thousands)
             try {
-              const filesResponse = await fetch('http://127.0.0.1:8000/api/list-audio-files')
+              const filesResponse = await fetch(`http://127.0.0.1:8000/api/list-audio-files?job_id=${encodeURIComponent(status.job_id)}`)
               if (filesResponse.ok) {
                 const files = await filesResponse.json()
                 setAudioFiles(files.files || [])
@@ -199,6 +199,7 @@ function ScraperView({ onBack }) {
       }
 
       const data = await response.json()
+      const scrapeId = response.headers.get('X-Scrape-Id')
       setChapters(data)
       
       if (data.length > 0) {
@@ -216,7 +217,8 @@ function ScraperView({ onBack }) {
                 'Content-Type': 'application/json',
               },
               body: JSON.stringify({
-                chapters: data,
+                // The server kept the scrape results: send their id, not every chapter back
+                ...(scrapeId ? { scrape_id: scrapeId } : { chapters: data }),
                 batch_size: batch,
                 output_folder: outputFolder,
               }),